@@ -1,11 +1,31 @@
 from django.contrib import admin
+from django.db.models import Q
 from django.utils.html import format_html
-from django.urls import reverse
-from django.http import HttpResponse
-from .models import Association, SpecialAssessment, Unit, UnitAssessment, AdditionalFee, Payment
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
+from django.urls import reverse, path
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from .models import Association, SpecialAssessment, Unit, UnitAssessment, AdditionalFee, Payment, ArchivedAdditionalFee, ArchivedPayment, StatementMailing, StatementDelivery, SearchEntry, LateFeeRule, LateFee
+from .scenarios import AssessmentSnapshot, run_scenarios, parse_scenarios
+from .allocation import allocate_assessment
+from .renderers import RENDERERS, render
+from . import search
 from decimal import Decimal
+from hoa_management.routers import reporting_reads
+
+
+class IndexedSearchMixin:
+    """Resolve changelist searches through the search index instead of icontains joins"""
+    # {lookup on the model: kind of indexed document it points at}; a row matches when any of them is a hit
+    indexed_search_fields = {}
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not self.indexed_search_fields:
+            return super().get_search_results(request, queryset, search_term)
+        matches = Q()
+        for lookup, kind in self.indexed_search_fields.items():
+            matches |= Q(**{f'{lookup}__in': search.matching_ids(kind, search_term, using=queryset.db)})
+        return queryset.filter(matches), False
 
 
 class AdditionalFeeInline(admin.TabularInline):
@@ -22,6 +42,44 @@ class PaymentInline(admin.TabularInline):
     ordering = ['-payment_date']
 
 
+class ArchivedFeeInline(admin.TabularInline):
+    model = ArchivedAdditionalFee
+    extra = 0
+    fields = ('fee_type', 'fee_amount', 'monthly_payment', 'description')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedPaymentInline(admin.TabularInline):
+    model = ArchivedPayment
+    extra = 0
+    fields = ('payment_date', 'amount', 'payment_method', 'reference_number', 'notes')
+    readonly_fields = fields
+    ordering = ['-payment_date']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class LateFeeInline(admin.TabularInline):
+    model = LateFee
+    extra = 0
+    fields = ('period', 'amount_past_due', 'amount', 'waived')
+    readonly_fields = ('period', 'amount_past_due')
+    ordering = ['-period']
+
+
+class LateFeeRuleInline(admin.StackedInline):
+    model = LateFeeRule
+    extra = 0
+    max_num = 1
+    fields = ('is_active', 'grace_days', 'flat_fee', 'percent_of_past_due', 'maximum_fee', 'minimum_past_due')
+
+
 @admin.register(Association)
 class AssociationAdmin(admin.ModelAdmin):
     list_display = ('name', 'management_company', 'unit_count', 'created_at')
@@ -36,9 +94,10 @@ class AssociationAdmin(admin.ModelAdmin):
 @admin.register(SpecialAssessment)
 class SpecialAssessmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'association', 'total_loan_amount', 'interest_rate', 'start_date', 'loan_period_months')
-    list_filter = ('association', 'start_date')
+    list_filter = ('association', 'start_date', ('archived_at', admin.EmptyFieldListFilter))
     search_fields = ('name', 'association__name')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('archived_at', 'created_at', 'updated_at')
+    inlines = [LateFeeRuleInline]
     fieldsets = (
         ('Basic Information', {
             'fields': ('association', 'name', 'description', 'start_date')
@@ -50,102 +109,135 @@ class SpecialAssessmentAdmin(admin.ModelAdmin):
             'fields': ('total_base_assessment', 'total_lce_assessments')
         }),
         ('Timestamps', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('archived_at', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
-    actions = ['export_to_excel']
+    actions = ['export_to_excel', 'export_to_csv', 'allocate_base_assessment']
+
+    def get_urls(self):
+        urls = [
+            path('<path:object_id>/scenarios/', self.admin_site.admin_view(self.scenario_view), name='assessments_specialassessment_scenarios'),
+        ]
+        return urls + super().get_urls()
+
+    @reporting_reads()
+    def scenario_view(self, request, object_id):
+        """Compare the assessment under alternative rates, terms and lump-sum shares"""
+        assessment = get_object_or_404(SpecialAssessment, pk=object_id)
+        if not self.has_view_permission(request, assessment):
+            return HttpResponse(status=403)
+
+        snapshot = AssessmentSnapshot.load(assessment)
+        current = snapshot.current_scenario()
+        default_text = '\n'.join([
+            f'{current.interest_rate}, {current.loan_period_months}, 0',
+            f'{current.interest_rate - 1}, {current.loan_period_months}, 0',
+            f'{current.interest_rate}, {current.loan_period_months // 2}, 0',
+            f'{current.interest_rate}, {current.loan_period_months}, 25',
+        ])
+        scenario_text = request.GET.get('scenarios', default_text)
+
+        error = None
+        results = []
+        try:
+            results = run_scenarios(assessment, parse_scenarios(scenario_text), snapshot=snapshot)
+        except ValueError as exc:
+            error = str(exc)
+
+        if request.GET.get('format') == 'json':
+            if error:
+                return JsonResponse({'error': error}, status=400)
+            return JsonResponse({
+                'assessment': assessment.pk,
+                'units': [u.unit_number for u in snapshot.units],
+                'scenarios': [{
+                    'interest_rate': str(r.scenario.interest_rate),
+                    'loan_period_months': r.scenario.loan_period_months,
+                    'lump_sum_share': str(r.scenario.lump_sum_share),
+                    'total_principal': round(r.total_principal, 2),
+                    'lump_sum_collected': round(r.lump_sum_collected, 2),
+                    'financed_principal': round(r.financed_principal, 2),
+                    'monthly_collections': round(r.monthly_collections, 2),
+                    'association_loan_payment': round(r.association_loan_payment, 2),
+                    'total_interest': round(r.total_interest, 2),
+                    'unit_payments': r.unit_payments,
+                } for r in results],
+            })
+
+        unit_rows = [
+            (unit.unit_number, [r.unit_payments[i] for r in results])
+            for i, unit in enumerate(snapshot.units)
+        ]
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': assessment,
+            'title': f'What-if scenarios: {assessment}',
+            'scenario_text': scenario_text,
+            'results': results,
+            'unit_rows': unit_rows,
+            'error': error,
+        }
+        return TemplateResponse(request, 'admin/assessments/specialassessment/scenarios.html', context)
 
-    def export_to_excel(self, request, queryset):
-        """Export selected special assessment(s) to Excel"""
+    def export_report(self, request, queryset, format):
+        """Render the summary of one selected special assessment as a download"""
         if queryset.count() != 1:
             self.message_user(request, "Please select exactly one special assessment to export.", level='error')
             return
 
-        assessment = queryset.first()
-
-        # Create workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Assessment Summary"
-
-        # Header styling
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-
-        # Assessment Information
-        ws['A1'] = assessment.association.name
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A2'] = assessment.name
-        ws['A2'].font = Font(bold=True, size=12)
-
-        ws['A4'] = "Loan Amount:"
-        ws['B4'] = float(assessment.total_loan_amount)
-        ws['B4'].number_format = '"$"#,##0.00'
-
-        ws['A5'] = "Interest Rate:"
-        ws['B5'] = float(assessment.interest_rate) / 100
-        ws['B5'].number_format = '0.00%'
-
-        ws['A6'] = "Loan Period:"
-        ws['B6'] = f"{assessment.loan_period_months} months"
-
-        ws['A7'] = "Monthly Loan Payment:"
-        ws['B7'] = float(assessment.monthly_loan_payment)
-        ws['B7'].number_format = '"$"#,##0.00'
-
-        # Unit Assessment Table
-        row = 10
-        headers = ['Unit', 'Base Assessment', 'LCE Fees', 'Total Assessment', 'Monthly Base', 'Monthly LCE', 'Total Monthly', 'Total Paid', 'Balance', 'Status']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=row, column=col, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-
-        row += 1
-        for unit_assessment in assessment.unit_assessments.all():
-            ws.cell(row=row, column=1, value=unit_assessment.unit.unit_number)
-            ws.cell(row=row, column=2, value=float(unit_assessment.base_assessment_amount)).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=3, value=float(unit_assessment.total_lce_fees())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=4, value=float(unit_assessment.total_assessment_amount())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=5, value=float(unit_assessment.monthly_base_payment)).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=6, value=float(unit_assessment.total_lce_monthly_payment())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=7, value=float(unit_assessment.total_monthly_payment())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=8, value=float(unit_assessment.total_paid())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=9, value=float(unit_assessment.remaining_balance())).number_format = '"$"#,##0.00'
-            ws.cell(row=row, column=10, value=unit_assessment.payment_status())
-            row += 1
-
-        # Adjust column widths
-        for col in range(1, 11):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 15
-
-        # Create response
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="{assessment.name.replace(" ", "_")}.xlsx"'
-        wb.save(response)
+        assessment = queryset.select_related('association').first()
+        renderer = RENDERERS['assessment_summary', format]
+        response = HttpResponse(content_type=renderer.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{assessment.name.replace(" ", "_")}.{renderer.extension}"'
+        with reporting_reads():
+            render('assessment_summary', format, assessment, output=response)
         return response
 
+    def export_to_excel(self, request, queryset):
+        """Export selected special assessment(s) to Excel"""
+        return self.export_report(request, queryset, 'xlsx')
+
     export_to_excel.short_description = "Export to Excel"
 
+    def export_to_csv(self, request, queryset):
+        """Export selected special assessment(s) to CSV"""
+        return self.export_report(request, queryset, 'csv')
+
+    export_to_csv.short_description = "Export to CSV"
+
+    def allocate_base_assessment(self, request, queryset):
+        """Split each selected assessment's total base assessment across its units"""
+        for special_assessment in queryset.select_related('association'):
+            try:
+                result = allocate_assessment(special_assessment)
+            except ValueError as exc:
+                self.message_user(request, f"{special_assessment}: {exc}", level='error')
+                continue
+            self.message_user(request, f"{special_assessment}: allocated ${result.total:,.2f} "
+                                       f"({result.created} created, {result.updated} updated, {result.unchanged} unchanged)")
+    allocate_base_assessment.short_description = "Allocate total base assessment by common expense allocation"
+
 
 @admin.register(Unit)
-class UnitAdmin(admin.ModelAdmin):
+class UnitAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('unit_number', 'association', 'owner_name', 'common_expense_allocation')
     list_filter = ('association',)
     search_fields = ('unit_number', 'owner_name', 'owner_email')
+    indexed_search_fields = {'pk': SearchEntry.KIND_UNIT}
     readonly_fields = ('created_at', 'updated_at')
 
-
 @admin.register(UnitAssessment)
-class UnitAssessmentAdmin(admin.ModelAdmin):
-    list_display = ('unit_number', 'special_assessment', 'total_assessment_display', 'total_monthly_display', 'total_paid_display', 'balance_display', 'status_display')
-    list_filter = ('special_assessment', 'payment_option', 'unit__association')
+class UnitAssessmentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ('unit_number', 'special_assessment', 'total_assessment_display', 'total_monthly_display', 'total_paid_display', 'balance_display', 'status_display', 'days_delinquent', 'amount_past_due')
+    list_filter = ('status', 'special_assessment', 'payment_option', 'unit__association')
     search_fields = ('unit__unit_number', 'unit__owner_name')
-    readonly_fields = ('monthly_base_payment', 'total_assessment_display', 'total_monthly_display', 'total_paid_display', 'balance_display', 'created_at', 'updated_at')
-    inlines = [AdditionalFeeInline, PaymentInline]
+    indexed_search_fields = {'unit': SearchEntry.KIND_UNIT}
+    readonly_fields = ('monthly_base_payment', 'total_assessment_display', 'total_monthly_display', 'total_paid_display', 'balance_display',
+                       'status', 'days_delinquent', 'amount_past_due', 'status_updated_on', 'created_at', 'updated_at')
+    inlines = [AdditionalFeeInline, PaymentInline, LateFeeInline]
 
     fieldsets = (
         ('Unit and Assessment', {
@@ -158,37 +250,63 @@ class UnitAssessmentAdmin(admin.ModelAdmin):
             'fields': ('total_assessment_display', 'total_monthly_display', 'total_paid_display', 'balance_display'),
             'classes': ('wide',)
         }),
+        ('Delinquency', {
+            'fields': ('status', 'days_delinquent', 'amount_past_due', 'status_updated_on'),
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_inlines(self, request, obj):
+        # An archived assessment's fees and payments are in the archive tables, shown read-only
+        if obj is not None and obj.special_assessment.is_archived:
+            return [ArchivedFeeInline, ArchivedPaymentInline, LateFeeInline]
+        return self.inlines
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'special_assessment':
+            kwargs['queryset'] = SpecialAssessment.objects.select_related('association')
+        elif db_field.name == 'unit':
+            kwargs['queryset'] = Unit.objects.select_related('association')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def save_formset(self, request, form, formset, change):
+        # Hand every inline row the already-saved parent so AdditionalFee.save()
+        # prices from the loaded assessment instead of re-fetching it per row.
+        for inline_form in formset.forms:
+            setattr(inline_form.instance, formset.fk.name, form.instance)
+        super().save_formset(request, form, formset, change)
+
     def unit_number(self, obj):
         return obj.unit.unit_number
     unit_number.short_description = 'Unit'
     unit_number.admin_order_field = 'unit__unit_number'
 
     def total_assessment_display(self, obj):
-        return format_html('<strong>${:,.2f}</strong>', obj.total_assessment_amount())
+        return format_html('<strong>${}</strong>', f'{obj.total_assessment_amount():,.2f}')
     total_assessment_display.short_description = 'Total Assessment'
 
     def total_monthly_display(self, obj):
-        return format_html('${:,.2f}', obj.total_monthly_payment())
+        return format_html('${}', f'{obj.total_monthly_payment():,.2f}')
     total_monthly_display.short_description = 'Total Monthly Payment'
 
     def total_paid_display(self, obj):
-        return format_html('<span style="color: green;">${:,.2f}</span>', obj.total_paid())
+        return format_html('<span style="color: green;">${}</span>', f'{obj.total_paid():,.2f}')
     total_paid_display.short_description = 'Total Paid'
 
     def balance_display(self, obj):
         balance = obj.remaining_balance()
         color = 'red' if balance > 0 else 'green'
-        return format_html('<span style="color: {};">${:,.2f}</span>', color, balance)
+        return format_html('<span style="color: {};">${}</span>', color, f'{balance:,.2f}')
     balance_display.short_description = 'Balance'
 
     def status_display(self, obj):
-        status = obj.payment_status()
+        status = obj.status
         colors = {
             'Paid in Full': 'green',
             'Current': 'blue',
@@ -200,6 +318,7 @@ class UnitAssessmentAdmin(admin.ModelAdmin):
         color = colors.get(status, 'black')
         return format_html('<span style="color: {}; font-weight: bold;">{}</span>', color, status)
     status_display.short_description = 'Status'
+    status_display.admin_order_field = 'status'
 
 
 @admin.register(AdditionalFee)
@@ -209,16 +328,22 @@ class AdditionalFeeAdmin(admin.ModelAdmin):
     search_fields = ('unit_assessment__unit__unit_number', 'fee_type')
     readonly_fields = ('monthly_payment', 'created_at', 'updated_at')
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'unit_assessment':
+            kwargs['queryset'] = UnitAssessment.objects.select_related('unit', 'special_assessment')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def unit_number(self, obj):
         return obj.unit_assessment.unit.unit_number
     unit_number.short_description = 'Unit'
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('unit_number', 'payment_date', 'amount', 'payment_method', 'reference_number')
     list_filter = ('payment_date', 'payment_method', 'unit_assessment__special_assessment')
     search_fields = ('unit_assessment__unit__unit_number', 'reference_number')
+    indexed_search_fields = {'pk': SearchEntry.KIND_PAYMENT, 'unit_assessment__unit': SearchEntry.KIND_UNIT}
     date_hierarchy = 'payment_date'
     readonly_fields = ('created_at', 'updated_at')
 
@@ -226,3 +351,99 @@ class PaymentAdmin(admin.ModelAdmin):
         return obj.unit_assessment.unit.unit_number
     unit_number.short_description = 'Unit'
     unit_number.admin_order_field = 'unit_assessment__unit__unit_number'
+
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Read-only view of rows moved out by archive_assessments; restore an assessment to edit them"""
+    list_select_related = ('unit_assessment__unit', 'unit_assessment__special_assessment')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def unit_number(self, obj):
+        return obj.unit_assessment.unit.unit_number
+    unit_number.short_description = 'Unit'
+    unit_number.admin_order_field = 'unit_assessment__unit__unit_number'
+
+    def special_assessment(self, obj):
+        return obj.unit_assessment.special_assessment
+    special_assessment.admin_order_field = 'unit_assessment__special_assessment'
+
+
+@admin.register(ArchivedPayment)
+class ArchivedPaymentAdmin(ArchiveAdmin):
+    list_display = ('unit_number', 'special_assessment', 'payment_date', 'amount', 'payment_method', 'reference_number')
+    list_filter = ('unit_assessment__special_assessment',)
+    search_fields = ('unit_assessment__unit__unit_number', 'reference_number')
+    date_hierarchy = 'payment_date'
+
+
+@admin.register(ArchivedAdditionalFee)
+class ArchivedAdditionalFeeAdmin(ArchiveAdmin):
+    list_display = ('unit_number', 'special_assessment', 'fee_type', 'fee_amount', 'monthly_payment')
+    list_filter = ('fee_type', 'unit_assessment__special_assessment')
+    search_fields = ('unit_assessment__unit__unit_number', 'fee_type')
+
+
+@admin.register(LateFee)
+class LateFeeAdmin(admin.ModelAdmin):
+    list_display = ('unit_number', 'special_assessment', 'period', 'amount_past_due', 'amount', 'waived')
+    list_filter = ('waived', 'period', 'unit_assessment__special_assessment')
+    search_fields = ('unit_assessment__unit__unit_number',)
+    date_hierarchy = 'period'
+    readonly_fields = ('unit_assessment', 'period', 'amount_past_due', 'created_at')
+    list_select_related = ('unit_assessment__unit', 'unit_assessment__special_assessment')
+
+    def unit_number(self, obj):
+        return obj.unit_assessment.unit.unit_number
+    unit_number.short_description = 'Unit'
+    unit_number.admin_order_field = 'unit_assessment__unit__unit_number'
+
+    def special_assessment(self, obj):
+        return obj.unit_assessment.special_assessment
+    special_assessment.admin_order_field = 'unit_assessment__special_assessment'
+
+
+class StatementDeliveryInline(admin.TabularInline):
+    model = StatementDelivery
+    extra = 0
+    can_delete = False
+    fields = ('unit_assessment', 'email', 'status', 'attempts', 'sent_at', 'error')
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StatementMailing)
+class StatementMailingAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'special_assessment', 'created_at', 'completed_at', 'sent_count', 'failed_count')
+    list_filter = ('special_assessment',)
+    readonly_fields = ('created_at', 'completed_at')
+    inlines = [StatementDeliveryInline]
+
+    def sent_count(self, obj):
+        return obj.deliveries.filter(status=StatementDelivery.STATUS_SENT).count()
+    sent_count.short_description = 'Sent'
+
+    def failed_count(self, obj):
+        return obj.deliveries.filter(status=StatementDelivery.STATUS_FAILED).count()
+    failed_count.short_description = 'Failed'
+
+
+@admin.register(StatementDelivery)
+class StatementDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('unit_number', 'email', 'mailing', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'mailing')
+    search_fields = ('email', 'unit_assessment__unit__unit_number')
+    readonly_fields = ('mailing', 'unit_assessment', 'email', 'attempts', 'sent_at', 'error')
+
+    def unit_number(self, obj):
+        return obj.unit_assessment.unit.unit_number
+    unit_number.short_description = 'Unit'
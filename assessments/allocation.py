@@ -0,0 +1,104 @@
+"""
+Allocation of a special assessment's base total across units.
+
+Each unit's share is its common_expense_allocation over the association's
+total allocation. Shares are computed in integer cents with the largest
+remainder method, so the parts always add up to the target to the penny. The
+monthly payment of each part is priced from the cached annuity factor in the
+same pass, as is the stored payment status, and all rows are written with
+bulk_create and bulk_update_rows.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+
+from .amortization import CENTS, monthly_payment
+from .bulk import bulk_update_rows
+from .models import UnitAssessment
+from .statuses import STATUS_FIELDS, apply_status
+
+
+BATCH_SIZE = 2000
+
+AllocationResult = namedtuple('AllocationResult', ['total', 'created', 'updated', 'unchanged'])
+
+
+def largest_remainder(total, weights):
+    """Split total (Decimal) into cent amounts proportional to weights that sum exactly to total"""
+    total_cents = int((Decimal(total) / CENTS).to_integral_value())
+    # Allocation percentages have two decimal places, so scale them to integers
+    scaled = [int((Decimal(weight) * 100).to_integral_value()) for weight in weights]
+    weight_sum = sum(scaled)
+    if weight_sum <= 0:
+        raise ValueError("Units have no common expense allocation to split by")
+
+    shares = []
+    remainders = []
+    for index, weight in enumerate(scaled):
+        share, remainder = divmod(total_cents * weight, weight_sum)
+        shares.append(share)
+        remainders.append((remainder, -index))
+
+    # Hand the leftover cents to the largest remainders, earlier units first on ties
+    leftover = total_cents - sum(shares)
+    for remainder, negative_index in sorted(remainders, reverse=True)[:leftover]:
+        shares[-negative_index] += 1
+    return [Decimal(share) * CENTS for share in shares]
+
+
+def allocate_assessment(special_assessment, total=None, dry_run=False):
+    """Set every unit's base assessment from its allocation share of total; returns AllocationResult"""
+    total = Decimal(total if total is not None else special_assessment.total_base_assessment).quantize(CENTS)
+    if total <= 0:
+        raise ValueError("The base assessment total to allocate must be positive")
+
+    units = list(special_assessment.association.units.order_by('unit_number').values_list('pk', 'common_expense_allocation'))
+    if not units:
+        raise ValueError(f"{special_assessment.association} has no units")
+    amounts = largest_remainder(total, [allocation for unit_id, allocation in units])
+
+    # Plain rows are enough here: skip the joined unit and the timestamp columns
+    today = date.today()
+    existing = {}
+    for ua in special_assessment.unit_assessments.with_totals(today).select_related(None).defer('created_at', 'updated_at'):
+        ua.special_assessment = special_assessment
+        existing[ua.unit_id] = ua
+    rate, months = special_assessment.interest_rate, special_assessment.loan_period_months
+
+    to_create, to_update = [], []
+    unchanged = 0
+    for (unit_id, allocation), amount in zip(units, amounts):
+        ua = existing.get(unit_id)
+        if ua is None:
+            ua = UnitAssessment(unit_id=unit_id, special_assessment=special_assessment, base_assessment_amount=amount)
+            # Nothing paid and no fees yet, which is what with_totals would annotate
+            ua.annotated_lce_fees = ua.annotated_lce_monthly = ua.annotated_paid = Decimal('0.00')
+            ua.annotated_as_of = today
+            to_create.append(ua)
+        elif ua.base_assessment_amount == amount and ua.monthly_base_payment == _monthly(ua, amount, rate, months):
+            unchanged += 1
+            continue
+        else:
+            ua.base_assessment_amount = amount
+            to_update.append(ua)
+        ua.monthly_base_payment = _monthly(ua, amount, rate, months)
+        apply_status(ua, today)
+
+    if not dry_run:
+        with transaction.atomic():
+            UnitAssessment.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+            bulk_update_rows(to_update, ['base_assessment_amount', 'monthly_base_payment'] + STATUS_FIELDS)
+            special_assessment.total_base_assessment = total
+            # Saving the assessment bumps its rollup version for the bulk writes too
+            special_assessment.save(update_fields=['total_base_assessment', 'updated_at'])
+
+    return AllocationResult(total=total, created=len(to_create), updated=len(to_update), unchanged=unchanged)
+
+
+def _monthly(unit_assessment, amount, rate, months):
+    """The monthly base payment UnitAssessment.save() would price for this amount"""
+    if unit_assessment.payment_option == UnitAssessment.PAYMENT_OPTION_MONTHLY:
+        return monthly_payment(amount, rate, months)
+    return Decimal('0.00')
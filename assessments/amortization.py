@@ -0,0 +1,85 @@
+"""
+Loan amortization helpers shared by the models, reports and batch jobs.
+
+Every unit in a special assessment shares the same (monthly rate, months) pair,
+so the annuity factor is computed once per pair and memoized process-wide.
+Interest schedules follow the rounded installment, so they are memoized per
+(principal, installment) as well; units with the same amounts share one.
+"""
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from functools import lru_cache
+
+
+CENTS = Decimal('0.01')
+
+# Enough distinct (rate, term) pairs for every assessment plus what-if runs
+ANNUITY_CACHE_SIZE = 1024
+
+
+def monthly_rate(annual_rate):
+    """Convert an annual percentage rate (e.g. 8.38) to a monthly decimal rate"""
+    return (Decimal(annual_rate) / 100) / 12
+
+
+@lru_cache(maxsize=ANNUITY_CACHE_SIZE)
+def annuity_factor(rate, months):
+    """Monthly payment per dollar of principal: r(1+r)^n / ((1+r)^n - 1)"""
+    months = int(months)
+    with localcontext() as ctx:
+        ctx.prec = 40
+        if rate == 0:
+            return Decimal(1) / months
+        growth = (1 + rate) ** months
+        return rate * growth / (growth - 1)
+
+
+def monthly_payment(principal, annual_rate, months):
+    """Decimal-exact monthly payment for a principal, rounded half-up to the cent"""
+    if not principal:
+        return Decimal('0.00')
+    factor = annuity_factor(monthly_rate(annual_rate), months)
+    return (Decimal(principal) * factor).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+@lru_cache(maxsize=ANNUITY_CACHE_SIZE)
+def interest_schedule(principal, installment, rate, months):
+    """(amount paid before, interest before, interest) of each installment repaying principal
+
+    Interest accrues on the balance each month, rounded half-up to the cent.
+    Every installment is the rounded installment except the last, which is
+    whatever clears the balance, so the schedule repays principal plus its
+    interest exactly.
+    """
+    starts, before, interest = [], [], []
+    balance = principal
+    paid = total = Decimal('0.00')
+    for number in range(1, months + 1):
+        due = (balance * rate).quantize(CENTS, rounding=ROUND_HALF_UP)
+        amount = balance + due if number == months or installment - due >= balance else installment
+        starts.append(paid)
+        before.append(total)
+        interest.append(due)
+        paid += amount
+        total += due
+        balance -= amount - due
+        if balance <= 0:
+            break
+    return tuple(starts), tuple(before), tuple(interest)
+
+
+def interest_paid(paid, principal, installment, annual_rate, months):
+    """Interest share of the first `paid` dollars paid against an amortized principal
+
+    Payments are applied to the schedule's installments in order, and to each
+    installment's interest before its principal. Whatever is paid beyond the
+    scheduled installments counts as principal.
+    """
+    rate = monthly_rate(annual_rate)
+    if not paid or not principal or not installment or rate == 0:
+        return Decimal('0.00')
+    starts, before, interest = interest_schedule(
+        Decimal(principal).quantize(CENTS), Decimal(installment).quantize(CENTS), rate, int(months))
+    paid = Decimal(paid)
+    current = bisect_right(starts, paid) - 1
+    return before[current] + min(paid - starts[current], interest[current])
@@ -0,0 +1,277 @@
+"""
+Typed, columnar exports of the whole dataset for pandas and DuckDB.
+
+Each table is read with a chunked values_list() iterator and written
+chunk_rows rows at a time, so memory is bounded by one chunk whatever the
+table size. Money is exported as integer cents and two-decimal percentages as
+integer hundredths (basis points), computed by the database so no Decimal is
+built per row. Formats, best first:
+
+- parquet: one <table>.parquet per table, one row group per chunk (pyarrow)
+- npz: <table>/part-NNNNN.npz per chunk, one array per column (numpy)
+- csv: one gzip-compressed <table>.csv.gz per table
+
+Every export also writes schema.json with the column types, row counts and
+files of each table.
+"""
+import csv
+import gzip
+import importlib.util
+import json
+import os
+from collections import namedtuple
+
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from hoa_management.routers import reporting_reads
+
+from .models import (Association, SpecialAssessment, Unit, UnitAssessment, AdditionalFee, Payment, LateFee,
+                     ArchivedAdditionalFee, ArchivedPayment)
+
+
+CHUNK_ROWS = 100000
+
+ITERATOR_CHUNK_SIZE = 5000
+
+# int64 and hundredths (cents / basis points) are 64-bit integers, date is a
+# calendar date, string is UTF-8 text and bool is a boolean
+Column = namedtuple('Column', ['name', 'lookup', 'type'])
+Table = namedtuple('Table', ['name', 'model', 'association_lookup', 'columns'])
+
+TABLES = [
+    Table('associations', Association, 'pk', [
+        Column('id', 'id', 'int64'),
+        Column('name', 'name', 'string'),
+        Column('management_company', 'management_company', 'string'),
+    ]),
+    Table('special_assessments', SpecialAssessment, 'association_id', [
+        Column('id', 'id', 'int64'),
+        Column('association_id', 'association_id', 'int64'),
+        Column('name', 'name', 'string'),
+        Column('total_loan_amount_cents', 'total_loan_amount', 'hundredths'),
+        Column('interest_rate_bp', 'interest_rate', 'hundredths'),
+        Column('loan_period_months', 'loan_period_months', 'int64'),
+        Column('monthly_loan_payment_cents', 'monthly_loan_payment', 'hundredths'),
+        Column('start_date', 'start_date', 'date'),
+        Column('total_base_assessment_cents', 'total_base_assessment', 'hundredths'),
+        Column('total_lce_assessments_cents', 'total_lce_assessments', 'hundredths'),
+    ]),
+    Table('units', Unit, 'association_id', [
+        Column('id', 'id', 'int64'),
+        Column('association_id', 'association_id', 'int64'),
+        Column('unit_number', 'unit_number', 'string'),
+        Column('owner_name', 'owner_name', 'string'),
+        Column('owner_email', 'owner_email', 'string'),
+        Column('common_expense_allocation_bp', 'common_expense_allocation', 'hundredths'),
+    ]),
+    Table('unit_assessments', UnitAssessment, 'special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_id', 'unit_id', 'int64'),
+        Column('special_assessment_id', 'special_assessment_id', 'int64'),
+        Column('base_assessment_amount_cents', 'base_assessment_amount', 'hundredths'),
+        Column('payment_option', 'payment_option', 'string'),
+        Column('monthly_base_payment_cents', 'monthly_base_payment', 'hundredths'),
+        Column('status', 'status', 'string'),
+        Column('days_delinquent', 'days_delinquent', 'int64'),
+        Column('amount_past_due_cents', 'amount_past_due', 'hundredths'),
+    ]),
+    Table('additional_fees', AdditionalFee, 'unit_assessment__special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_assessment_id', 'unit_assessment_id', 'int64'),
+        Column('fee_type', 'fee_type', 'string'),
+        Column('fee_amount_cents', 'fee_amount', 'hundredths'),
+        Column('monthly_payment_cents', 'monthly_payment', 'hundredths'),
+    ]),
+    Table('payments', Payment, 'unit_assessment__special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_assessment_id', 'unit_assessment_id', 'int64'),
+        Column('payment_date', 'payment_date', 'date'),
+        Column('amount_cents', 'amount', 'hundredths'),
+        Column('payment_method', 'payment_method', 'string'),
+        Column('reference_number', 'reference_number', 'string'),
+    ]),
+    Table('late_fees', LateFee, 'unit_assessment__special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_assessment_id', 'unit_assessment_id', 'int64'),
+        Column('period', 'period', 'date'),
+        Column('amount_past_due_cents', 'amount_past_due', 'hundredths'),
+        Column('amount_cents', 'amount', 'hundredths'),
+        Column('waived', 'waived', 'bool'),
+    ]),
+    Table('archived_additional_fees', ArchivedAdditionalFee, 'unit_assessment__special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_assessment_id', 'unit_assessment_id', 'int64'),
+        Column('fee_type', 'fee_type', 'string'),
+        Column('fee_amount_cents', 'fee_amount', 'hundredths'),
+        Column('monthly_payment_cents', 'monthly_payment', 'hundredths'),
+    ]),
+    Table('archived_payments', ArchivedPayment, 'unit_assessment__special_assessment__association_id', [
+        Column('id', 'id', 'int64'),
+        Column('unit_assessment_id', 'unit_assessment_id', 'int64'),
+        Column('payment_date', 'payment_date', 'date'),
+        Column('amount_cents', 'amount', 'hundredths'),
+        Column('payment_method', 'payment_method', 'string'),
+        Column('reference_number', 'reference_number', 'string'),
+    ]),
+]
+
+
+def available_formats():
+    """Formats whose libraries are installed, best first"""
+    formats = []
+    if importlib.util.find_spec('pyarrow'):
+        formats.append('parquet')
+    if importlib.util.find_spec('numpy'):
+        formats.append('npz')
+    formats.append('csv')
+    return formats
+
+
+def table_rows(table, association_id=None):
+    """Tuples of the table's columns in primary key order, with scaled amounts computed in SQL"""
+    rows = table.model.objects.all()
+    if association_id:
+        rows = rows.filter(**{table.association_lookup: association_id})
+    scaled = {
+        f'_{column.name}': Cast(Round(F(column.lookup) * 100), BigIntegerField())
+        for column in table.columns if column.type == 'hundredths'
+    }
+    lookups = [f'_{column.name}' if column.type == 'hundredths' else column.lookup for column in table.columns]
+    return rows.annotate(**scaled).order_by('pk').values_list(*lookups).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CsvTableWriter:
+    """Append chunks to one gzip-compressed CSV with a header row"""
+
+    def __init__(self, directory, table):
+        self.path = os.path.join(directory, f'{table.name}.csv.gz')
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8', newline='', compresslevel=1)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([column.name for column in table.columns])
+
+    def write(self, chunk):
+        self.writer.writerows(chunk)
+
+    def close(self):
+        self.file.close()
+        return [self.path]
+
+
+class NpzTableWriter:
+    """Write each chunk as a compressed .npz with one typed array per column"""
+
+    def __init__(self, directory, table):
+        import numpy
+
+        self.numpy = numpy
+        self.directory = os.path.join(directory, table.name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.columns = table.columns
+        self.paths = []
+
+    def _array(self, column, values):
+        numpy = self.numpy
+        if column.type == 'date':
+            return numpy.array(values, dtype='datetime64[D]')
+        if column.type == 'string':
+            return numpy.array(values, dtype=str)
+        if column.type == 'bool':
+            return numpy.array(values, dtype=bool)
+        return numpy.array(values, dtype=numpy.int64)
+
+    def write(self, chunk):
+        path = os.path.join(self.directory, f'part-{len(self.paths):05d}.npz')
+        arrays = {column.name: self._array(column, values) for column, values in zip(self.columns, zip(*chunk))}
+        self.numpy.savez_compressed(path, **arrays)
+        self.paths.append(path)
+
+    def close(self):
+        return self.paths
+
+
+class ParquetTableWriter:
+    """Append each chunk to one Parquet file as a row group"""
+
+    def __init__(self, directory, table):
+        import pyarrow
+        import pyarrow.parquet
+
+        types = {
+            'int64': pyarrow.int64(),
+            'hundredths': pyarrow.int64(),
+            'date': pyarrow.date32(),
+            'string': pyarrow.string(),
+            'bool': pyarrow.bool_(),
+        }
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(column.name, types[column.type]) for column in table.columns])
+        self.path = os.path.join(directory, f'{table.name}.parquet')
+        self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression='zstd')
+
+    def write(self, chunk):
+        arrays = [
+            self.pyarrow.array(values, type=field.type)
+            for field, values in zip(self.schema, zip(*chunk))
+        ]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        return [self.path]
+
+
+WRITERS = {
+    'parquet': ParquetTableWriter,
+    'npz': NpzTableWriter,
+    'csv': CsvTableWriter,
+}
+
+
+@reporting_reads()
+def export_dataset(directory, format=None, association_id=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """Export every table into directory; returns the schema.json manifest"""
+    format = format or available_formats()[0]
+    if format not in available_formats():
+        raise ValueError(f'{format} export needs {"pyarrow" if format == "parquet" else "numpy"} installed')
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {
+        'format': format,
+        'exported_at': timezone.now().isoformat(),
+        'association_id': association_id,
+        'encoding': 'Money columns (_cents) are integer cents; percentages (_bp) are integer hundredths of a percent',
+        'tables': {},
+    }
+    for table in TABLES:
+        writer = WRITERS[format](directory, table)
+        count = 0
+        try:
+            for chunk in chunked(table_rows(table, association_id), chunk_rows):
+                writer.write(chunk)
+                count += len(chunk)
+        finally:
+            files = writer.close()
+        manifest['tables'][table.name] = {
+            'rows': count,
+            'files': [os.path.relpath(path, directory) for path in files],
+            'columns': [{'name': column.name, 'type': column.type} for column in table.columns],
+        }
+        if progress:
+            progress(table.name, count)
+
+    with open(os.path.join(directory, 'schema.json'), 'w') as schema:
+        json.dump(manifest, schema, indent=2)
+    return manifest
@@ -0,0 +1,108 @@
+"""
+Archival of closed special assessments, to keep the hot tables small.
+
+A closed assessment (term ended, every unit paid off) has its Payment and
+AdditionalFee rows moved into ArchivedPayment and ArchivedAdditionalFee with
+one INSERT ... SELECT and one DELETE per table, keeping their ids. The unit
+assessments stay in place. with_totals, the unit statement and the unit page
+read the archive tables once the assessment is archived, so statements and
+audits still see every row, read-only. Restoring moves the rows back.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import search
+from .models import SpecialAssessment, UnitAssessment, AdditionalFee, Payment, ArchivedAdditionalFee, ArchivedPayment, SearchEntry
+from .rollups import bump_assessment_version
+
+
+# (live model, archive model); both tables have the same columns
+ARCHIVES = [
+    (Payment, ArchivedPayment),
+    (AdditionalFee, ArchivedAdditionalFee),
+]
+
+
+def is_closed(special_assessment, today=None):
+    """Its term has ended and no unit owes anything"""
+    today = today or date.today()
+    if special_assessment.installments_due(today) < special_assessment.loan_period_months:
+        return False
+    return not any(
+        ua.remaining_balance() > Decimal('0.00')
+        for ua in special_assessment.unit_assessments.with_totals()
+    )
+
+
+def closed_assessments(today=None):
+    """Unarchived special assessments that are closed and can be archived"""
+    candidates = SpecialAssessment.objects.filter(archived_at__isnull=True).select_related('association').order_by('pk')
+    return [sa for sa in candidates if is_closed(sa, today)]
+
+
+def _move_rows(source, destination, special_assessment, using):
+    """Copy one assessment's rows from source to destination in one statement, then delete them; returns the count"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in source._meta.concrete_fields]
+    assert columns == [field.column for field in destination._meta.concrete_fields]
+    column_list = ', '.join(quote(column) for column in columns)
+    unit_assessments = UnitAssessment._meta
+    owned = (f'{quote(source._meta.get_field("unit_assessment").column)} IN '
+             f'(SELECT {quote(unit_assessments.pk.column)} FROM {quote(unit_assessments.db_table)} '
+             f'WHERE {quote(unit_assessments.get_field("special_assessment").column)} = %s)')
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(destination._meta.db_table)} ({column_list}) '
+            f'SELECT {column_list} FROM {quote(source._meta.db_table)} WHERE {owned}',
+            [special_assessment.pk],
+        )
+        cursor.execute(f'DELETE FROM {quote(source._meta.db_table)} WHERE {owned}', [special_assessment.pk])
+        return cursor.rowcount
+
+
+def archive_assessment(special_assessment, using=DEFAULT_DB_ALIAS):
+    """Move a special assessment's payments and fees into the archive tables; returns {model name: rows}"""
+    if special_assessment.is_archived:
+        raise ValueError(f'{special_assessment} is already archived')
+
+    with transaction.atomic(using=using):
+        payment_ids = list(Payment.objects.using(using)
+                           .filter(unit_assessment__special_assessment=special_assessment)
+                           .values_list('pk', flat=True))
+        moved = {
+            source._meta.verbose_name_plural: _move_rows(source, destination, special_assessment, using)
+            for source, destination in ARCHIVES
+        }
+        # Archived payments are found through the archive admin, not the live search
+        search.remove_documents(SearchEntry.KIND_PAYMENT, payment_ids, using=using)
+        special_assessment.archived_at = timezone.now()
+        SpecialAssessment.objects.using(using).filter(pk=special_assessment.pk).update(
+            archived_at=special_assessment.archived_at)
+    bump_assessment_version(special_assessment.pk)
+    return moved
+
+
+def restore_assessment(special_assessment, using=DEFAULT_DB_ALIAS):
+    """Move an archived special assessment's payments and fees back; returns {model name: rows}"""
+    if not special_assessment.is_archived:
+        raise ValueError(f'{special_assessment} is not archived')
+
+    with transaction.atomic(using=using):
+        moved = {
+            source._meta.verbose_name_plural: _move_rows(destination, source, special_assessment, using)
+            for source, destination in ARCHIVES
+        }
+        search.index_payments(
+            Payment.objects.using(using).filter(unit_assessment__special_assessment=special_assessment)
+            .only('pk', 'reference_number'),
+            using=using,
+        )
+        special_assessment.archived_at = None
+        SpecialAssessment.objects.using(using).filter(pk=special_assessment.pk).update(archived_at=None)
+    bump_assessment_version(special_assessment.pk)
+    return moved
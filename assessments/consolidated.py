@@ -0,0 +1,79 @@
+"""
+Consolidated owner statements covering every active assessment of a unit.
+
+The data for any set of units is loaded in four queries: the units, their unit
+assessments with totals annotated, and the fees and payments of those unit
+assessments. This is true however many assessments each unit carries. Fees and
+payments are filtered by subquery rather than by lists of ids, so a whole
+association's statements come from one dataset.
+"""
+from collections import defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal
+
+from .models import Unit, UnitAssessment, AdditionalFee, Payment
+
+
+CENTS = Decimal('0.01')
+
+StatementLine = namedtuple('StatementLine', ['unit_assessment', 'fees', 'payments'])
+
+ConsolidatedStatement = namedtuple('ConsolidatedStatement', [
+    'unit', 'lines', 'total_assessment', 'total_paid', 'remaining_balance', 'monthly_total', 'late_fees', 'statement_date',
+])
+
+
+def is_active(unit_assessment, today):
+    """Still being paid: a balance is left or the term has not ended"""
+    special_assessment = unit_assessment.special_assessment
+    return (unit_assessment.remaining_balance() > 0
+            or special_assessment.installments_due(today) < special_assessment.loan_period_months)
+
+
+def consolidated_statements(units, today=None):
+    """Statements for a queryset of units, in its order, from one four-query dataset"""
+    today = today or date.today()
+    unit_ids = units.order_by().values('pk')
+    all_unit_assessments = UnitAssessment.objects.filter(unit__in=unit_ids).values('pk')
+
+    units = list(units.select_related('association'))
+    unit_assessments = (
+        UnitAssessment.objects.with_totals()
+        .filter(unit__in=unit_ids, special_assessment__archived_at__isnull=True)
+        .select_related('special_assessment__association')
+        .order_by('unit_id', 'special_assessment__start_date', 'pk')
+    )
+    fees = defaultdict(list)
+    for fee in AdditionalFee.objects.filter(unit_assessment__in=all_unit_assessments).order_by('pk'):
+        fees[fee.unit_assessment_id].append(fee)
+    payments = defaultdict(list)
+    for payment in Payment.objects.filter(unit_assessment__in=all_unit_assessments).order_by('payment_date', 'pk'):
+        payments[payment.unit_assessment_id].append(payment)
+
+    lines = defaultdict(list)
+    for ua in unit_assessments:
+        if is_active(ua, today):
+            lines[ua.unit_id].append(StatementLine(ua, fees[ua.pk], payments[ua.pk]))
+
+    return [_statement(unit, lines[unit.pk], today) for unit in units]
+
+
+def consolidated_statement(unit_id, today=None):
+    """The consolidated statement of one unit, or None if there is no such unit"""
+    statements = consolidated_statements(Unit.objects.filter(pk=unit_id), today)
+    return statements[0] if statements else None
+
+
+def _statement(unit, lines, today):
+    total = paid = remaining = monthly = late_fees = Decimal('0.00')
+    for line in lines:
+        ua = line.unit_assessment
+        total += ua.total_assessment_amount()
+        paid += ua.total_paid()
+        remaining += ua.remaining_balance()
+        monthly += ua.total_monthly_payment()
+        late_fees += ua.total_late_fees()
+    # Annotated sums can carry float noise on SQLite
+    total, paid, remaining, monthly, late_fees = (
+        amount.quantize(CENTS) for amount in (total, paid, remaining, monthly, late_fees))
+    return ConsolidatedStatement(unit, lines, total, paid, remaining, monthly, late_fees, today)
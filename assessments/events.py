@@ -0,0 +1,178 @@
+"""
+Live payment and status events for dashboards, streamed as Server-Sent Events.
+
+Events are rows of AssessmentEvent, written by the Payment signal handlers and
+by refresh_statuses, so every web worker sees them. Each open stream polls the
+table for rows after the last id it sent. The broadcaster wakes streams in the
+same process as soon as an event commits. Streams in other workers find the
+event on their next poll, within POLL_SECONDS.
+
+Streams are async generators and are only served under ASGI. Each stream
+closes after STREAM_MAX_SECONDS and the browser reconnects with Last-Event-ID,
+so it resumes without gaps. Under WSGI a stream would hold a sync worker for
+its whole life, so pages served there poll events_after through a short JSON
+request instead.
+"""
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AssessmentEvent, UnitAssessment
+
+
+POLL_SECONDS = 2
+
+KEEPALIVE_SECONDS = 15
+
+STREAM_MAX_SECONDS = 300
+
+# Browser reconnect delay
+RETRY_MILLISECONDS = 3000
+
+EVENTS_PER_POLL = 200
+
+EVENT_RETENTION_DAYS = 7
+
+
+class Broadcaster:
+    """Wake the event streams of this process, from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def subscribe(self):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            self._waiters.discard(waiter)
+
+    def notify(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The stream's loop has closed
+                self.unsubscribe((loop, event))
+
+
+broadcaster = Broadcaster()
+
+
+def publish(events):
+    """Save events and wake this process's streams once the transaction commits"""
+    if events:
+        AssessmentEvent.objects.bulk_create(events, batch_size=2000)
+        transaction.on_commit(broadcaster.notify)
+
+
+def payment_posted_event(payment):
+    """Event for a new payment, carrying the unit's updated totals and how much its balance moved"""
+    ua = UnitAssessment.objects.with_totals().get(pk=payment.unit_assessment_id)
+    remaining = ua.remaining_balance()
+    # A monthly unit's balance is its payoff, which does not fall by the amount paid
+    ua.annotated_paid -= payment.amount
+    previous_remaining = ua.remaining_balance()
+    ua.annotated_paid += payment.amount
+    return AssessmentEvent(
+        kind=AssessmentEvent.KIND_PAYMENT_POSTED,
+        association_id=ua.special_assessment.association_id,
+        special_assessment_id=ua.special_assessment_id,
+        unit_assessment=ua,
+        payload={
+            'unit_assessment_id': ua.pk,
+            'unit': ua.unit.unit_number,
+            'payment_id': payment.pk,
+            'payment_date': str(payment.payment_date),
+            'amount': str(payment.amount),
+            'total_paid': f'{ua.total_paid():.2f}',
+            'remaining_balance': f'{remaining:.2f}',
+            'remaining_change': f'{remaining - previous_remaining:.2f}',
+        },
+    )
+
+
+def status_changed_event(unit_assessment, previous_status):
+    """Event for a stored status change; the instance must have unit and special_assessment loaded"""
+    return AssessmentEvent(
+        kind=AssessmentEvent.KIND_STATUS_CHANGED,
+        association_id=unit_assessment.special_assessment.association_id,
+        special_assessment_id=unit_assessment.special_assessment_id,
+        unit_assessment_id=unit_assessment.pk,
+        payload={
+            'unit_assessment_id': unit_assessment.pk,
+            'unit': unit_assessment.unit.unit_number,
+            'previous_status': previous_status,
+            'status': unit_assessment.status,
+            'days_delinquent': unit_assessment.days_delinquent,
+            'amount_past_due': str(unit_assessment.amount_past_due),
+        },
+    )
+
+
+def prune_events(days=EVENT_RETENTION_DAYS):
+    """Delete events older than the retention window; returns how many"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return AssessmentEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+
+
+def latest_event_id(**filters):
+    """Id of the newest event matching filters, or 0"""
+    latest = AssessmentEvent.objects.filter(**filters).order_by('-id').values_list('id', flat=True).first()
+    return latest or 0
+
+
+def events_after(last_event_id, limit=EVENTS_PER_POLL, **filters):
+    """Up to limit events matching filters after last_event_id, oldest first"""
+    return list(AssessmentEvent.objects.filter(id__gt=last_event_id, **filters).order_by('id')[:limit])
+
+
+def format_event(event):
+    return f'id: {event.pk}\nevent: {event.kind}\ndata: {json.dumps(event.payload)}\n\n'
+
+
+async def event_stream(last_event_id=None, poll_seconds=POLL_SECONDS, max_seconds=STREAM_MAX_SECONDS, **filters):
+    """Yield Server-Sent Events for the events matching filters, after last_event_id or from now"""
+    events = AssessmentEvent.objects.filter(**filters).order_by('id')
+    if last_event_id is None:
+        latest = await events.alast()
+        last_event_id = latest.pk if latest else 0
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    quiet_since = loop.time()
+    waiter = broadcaster.subscribe()
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while loop.time() < deadline:
+            # Clear before querying so a notify during the query is not lost
+            waiter[1].clear()
+            sent = 0
+            async for event in events.filter(id__gt=last_event_id)[:EVENTS_PER_POLL]:
+                last_event_id = event.pk
+                sent += 1
+                yield format_event(event)
+            if sent:
+                quiet_since = loop.time()
+                if sent == EVENTS_PER_POLL:
+                    continue
+
+            if loop.time() - quiet_since >= KEEPALIVE_SECONDS:
+                quiet_since = loop.time()
+                yield ': keepalive\n\n'
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout=min(poll_seconds, max(deadline - loop.time(), 0)))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        broadcaster.unsubscribe(waiter)
@@ -0,0 +1,148 @@
+"""
+Set-based checks of the stored totals and monthly payments against their rows.
+
+The assessment totals are compared with grouped sums of the unit assessments
+and fees, three queries for the whole portfolio. Every stored monthly payment
+is then repriced in one pass over plain value rows, with the annuity factor
+cached per (rate, term), so no model instances are built. Fixes are written
+with bulk_update_rows, after which the stored statuses of the repriced units
+are refreshed and the cached rollups dropped.
+
+Only derived values are fixed. total_loan_amount and monthly_loan_payment
+come from the loan agreement, so mismatches there are reported only, as are
+monthly rows that together collect less than the loan payment. Archived fees
+are read-only, so they count towards the totals and the loan payment check but
+their own mismatches are reported only.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .amortization import CENTS, monthly_payment
+from .bulk import bulk_update_rows
+from .models import SpecialAssessment, UnitAssessment, AdditionalFee, ArchivedAdditionalFee
+from .rollups import bump_assessment_version
+from .statuses import refresh_unit_statuses
+
+
+ITERATOR_CHUNK_SIZE = 5000
+
+ZERO = Decimal('0.00')
+
+# Each monthly payment is rounded to the cent, so a sum of n of them can be
+# off by up to half a cent per row from the payment on their summed principal
+ROUNDING_PER_ROW = Decimal('0.005')
+
+Discrepancy = namedtuple('Discrepancy', ['special_assessment_id', 'model', 'object_id', 'field', 'stored', 'expected', 'fixable'])
+
+# priced is the sum of the stored monthly payments of monthly rows, exact the
+# payment on their combined principal, loan the stored monthly_loan_payment
+Drift = namedtuple('Drift', ['special_assessment', 'rows', 'priced', 'exact', 'loan'])
+
+Report = namedtuple('Report', ['assessments', 'unit_assessments', 'fees', 'discrepancies', 'drifts'])
+
+
+def _grouped(queryset, group, **aggregates):
+    return {row.pop(group): row for row in queryset.order_by().values(group).annotate(**aggregates)}
+
+
+def check_assessments(assessments=None):
+    """Compare every stored total and monthly payment with its rows; returns a Report"""
+    if assessments is None:
+        assessments = SpecialAssessment.objects.all()
+    assessments = {sa.pk: sa for sa in assessments.select_related('association').order_by('pk')}
+    ids = list(assessments)
+    discrepancies = []
+
+    # Assessment totals: three grouped queries
+    units = _grouped(UnitAssessment.objects.filter(special_assessment__in=ids), 'special_assessment',
+                     base=Sum('base_assessment_amount'), count=Count('pk'))
+    fees = defaultdict(lambda: ZERO)
+    for model in (AdditionalFee, ArchivedAdditionalFee):
+        for sa_id, row in _grouped(model.objects.filter(unit_assessment__special_assessment__in=ids),
+                                   'unit_assessment__special_assessment', total=Sum('fee_amount')).items():
+            fees[sa_id] += row['total']
+
+    for sa_id, sa in assessments.items():
+        if sa_id not in units:
+            # Not allocated yet, so the totals are targets rather than sums
+            continue
+        base, lce = units[sa_id]['base'].quantize(CENTS), fees[sa_id].quantize(CENTS)
+        for field, expected in [('total_base_assessment', base), ('total_lce_assessments', lce)]:
+            if getattr(sa, field) != expected:
+                discrepancies.append(Discrepancy(sa_id, 'SpecialAssessment', sa_id, field, getattr(sa, field), expected, True))
+        if sa.total_loan_amount != base + lce:
+            discrepancies.append(Discrepancy(sa_id, 'SpecialAssessment', sa_id, 'total_loan_amount',
+                                             sa.total_loan_amount, base + lce, False))
+
+    # One repricing pass over the stored monthly payments
+    principal = defaultdict(lambda: ZERO)
+    priced = defaultdict(lambda: ZERO)
+    rows = defaultdict(int)
+    monthly = UnitAssessment.PAYMENT_OPTION_MONTHLY
+    sources = [
+        ('UnitAssessment', 'monthly_base_payment', True,
+         UnitAssessment.objects.filter(special_assessment__in=ids).values_list(
+             'pk', 'special_assessment_id', 'payment_option', 'base_assessment_amount', 'monthly_base_payment')),
+    ] + [
+        (model.__name__, 'monthly_payment', model is AdditionalFee,
+         model.objects.filter(unit_assessment__special_assessment__in=ids).values_list(
+             'pk', 'unit_assessment__special_assessment_id', 'unit_assessment__payment_option', 'fee_amount', 'monthly_payment'))
+        for model in (AdditionalFee, ArchivedAdditionalFee)
+    ]
+    counts = {}
+    for model, field, fixable, values in sources:
+        count = 0
+        for pk, sa_id, option, amount, stored in values.order_by().iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            count += 1
+            sa = assessments[sa_id]
+            expected = monthly_payment(amount, sa.interest_rate, sa.loan_period_months) if option == monthly else ZERO
+            if stored != expected:
+                discrepancies.append(Discrepancy(sa_id, model, pk, field, stored, expected, fixable))
+            if option == monthly:
+                principal[sa_id] += amount
+                priced[sa_id] += stored
+                rows[sa_id] += 1
+        counts[model] = count
+
+    drifts = []
+    for sa_id, sa in assessments.items():
+        if not rows[sa_id]:
+            continue
+        exact = monthly_payment(principal[sa_id], sa.interest_rate, sa.loan_period_months)
+        drift = Drift(sa, rows[sa_id], priced[sa_id], exact, sa.monthly_loan_payment)
+        drifts.append(drift)
+        if abs(drift.priced - drift.exact) > ROUNDING_PER_ROW * drift.rows:
+            discrepancies.append(Discrepancy(sa_id, 'SpecialAssessment', sa_id, 'rounding drift', drift.priced, drift.exact, False))
+        if drift.loan - drift.priced > ROUNDING_PER_ROW * drift.rows:
+            discrepancies.append(Discrepancy(sa_id, 'SpecialAssessment', sa_id, 'loan payment shortfall', drift.priced, drift.loan, False))
+
+    return Report(len(assessments), counts['UnitAssessment'], counts['AdditionalFee'] + counts['ArchivedAdditionalFee'],
+                  discrepancies, drifts)
+
+
+def fix_discrepancies(discrepancies):
+    """Write the expected value of every fixable discrepancy; returns the number of rows updated"""
+    models = {'SpecialAssessment': SpecialAssessment, 'UnitAssessment': UnitAssessment, 'AdditionalFee': AdditionalFee}
+    updates = defaultdict(dict)
+    for discrepancy in discrepancies:
+        if discrepancy.fixable:
+            updates[discrepancy.model, discrepancy.field][discrepancy.object_id] = discrepancy.expected
+
+    updated = 0
+    with transaction.atomic():
+        for (model, field), values in updates.items():
+            objs = [models[model](pk=pk, **{field: value}) for pk, value in values.items()]
+            updated += bulk_update_rows(objs, [field])
+        # Repriced installments change what is past due
+        repriced = set(updates.get(('UnitAssessment', 'monthly_base_payment'), {}))
+        fee_ids = updates.get(('AdditionalFee', 'monthly_payment'), {})
+        repriced.update(AdditionalFee.objects.filter(pk__in=list(fee_ids)).values_list('unit_assessment_id', flat=True))
+        if repriced:
+            refresh_unit_statuses(repriced)
+
+    for sa_id in {discrepancy.special_assessment_id for discrepancy in discrepancies if discrepancy.fixable}:
+        bump_assessment_version(sa_id)
+    return updated
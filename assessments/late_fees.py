@@ -0,0 +1,103 @@
+"""
+Set-based late fee accrual.
+
+For each special assessment with an active LateFeeRule, the latest installment
+whose grace period has ended decides the period being charged and how many
+installments should have been paid. One aggregate query over every unit then
+returns only the delinquent units that have not yet been charged for their
+period, and the fees are written with a single bulk_create. LateFee is unique
+per (unit assessment, period), so re-running for the same day is a no-op.
+
+Late fees are a receivable of their own, kept out of the assessment balance:
+payments go to the loan and remaining_balance is its payoff, while
+UnitAssessment.total_late_fees (annotated by with_totals) is shown next to it
+on the unit and assessment pages, the statements and the rollups.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+
+from .models import LateFee, LateFeeRule, UnitAssessment
+from .rollups import bump_assessment_version
+
+
+CENTS = Decimal('0.01')
+
+
+def late_periods(rules, run_date):
+    """{special assessment id: (installments late-eligible, due date charged)} for rules with a late installment"""
+    periods = {}
+    for rule in rules:
+        special_assessment = rule.special_assessment
+        # An installment is late once run_date is past its due date plus the grace days
+        count = special_assessment.installments_due(run_date - timedelta(days=rule.grace_days + 1))
+        if count:
+            periods[special_assessment.pk] = (count, special_assessment.installment_dates()[count - 1])
+    return periods
+
+
+def delinquent_units(periods, run_date):
+    """Uncharged unit assessments past due for their assessment's period, with the amount past due annotated as overdue"""
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def per_assessment(index, output_field):
+        return Case(
+            *[When(special_assessment_id=pk, then=Value(period[index], output_field=output_field))
+              for pk, period in periods.items()],
+            default=None,
+            output_field=output_field,
+        )
+
+    queryset = (UnitAssessment.objects.filter(special_assessment_id__in=list(periods))
+                .with_totals(run_date)
+                .annotate(installments_late=per_assessment(0, models.IntegerField()),
+                          late_period=per_assessment(1, models.DateField())))
+    queryset = queryset.annotate(
+        expected_paid=Case(
+            When(payment_option=UnitAssessment.PAYMENT_OPTION_LUMP,
+                 then=F('base_assessment_amount') + F('annotated_lce_fees')),
+            default=(F('monthly_base_payment') + F('annotated_lce_monthly')) * F('installments_late'),
+            output_field=money,
+        ),
+        already_charged=Exists(LateFee.objects.filter(unit_assessment=OuterRef('pk'), period=OuterRef('late_period'))),
+    )
+    # Not amount_past_due: that is the stored status field, which may be stale for run_date
+    return (queryset.annotate(overdue=F('expected_paid') - F('annotated_paid'))
+            .filter(overdue__gt=0, already_charged=False))
+
+
+def accrue_late_fees(run_date=None, special_assessments=None, dry_run=False):
+    """Charge this period's late fee to every delinquent unit; returns the LateFee objects"""
+    run_date = run_date or date.today()
+    rules = LateFeeRule.objects.filter(is_active=True).select_related('special_assessment')
+    if special_assessments is not None:
+        rules = rules.filter(special_assessment__in=special_assessments)
+    rules = {rule.special_assessment_id: rule for rule in rules}
+
+    periods = late_periods(rules.values(), run_date)
+    if not periods:
+        return []
+
+    fees = []
+    charged = set()
+    for ua in delinquent_units(periods, run_date).iterator(chunk_size=2000):
+        rule = rules[ua.special_assessment_id]
+        past_due = Decimal(ua.overdue).quantize(CENTS)
+        if past_due < rule.minimum_past_due:
+            continue
+        fees.append(LateFee(
+            unit_assessment_id=ua.pk,
+            period=ua.late_period,
+            amount_past_due=past_due,
+            amount=rule.fee_for(past_due),
+        ))
+        charged.add(ua.special_assessment_id)
+
+    if not dry_run:
+        # ignore_conflicts keeps a concurrent or repeated run from double charging
+        LateFee.objects.bulk_create(fees, batch_size=2000, ignore_conflicts=True)
+        for special_assessment_id in charged:
+            bump_assessment_version(special_assessment_id)
+    return fees
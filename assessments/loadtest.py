@@ -0,0 +1,190 @@
+"""
+Concurrent load tests of the web views against a seeded scratch database.
+
+Requests are sent from a pool of threads, either through the Django test
+client (in process, with per-request query counts) or over HTTP to a live
+server thread started on a free local port. The scratch database is a
+temporary SQLite file so every thread has its own connection, like separate
+web workers. Each endpoint is driven on its own so its latency percentiles,
+throughput and query counts are not mixed with the others.
+"""
+import math
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Association, SpecialAssessment, UnitAssessment
+
+
+ENDPOINTS = [
+    'home',
+    'association_detail',
+    'assessment_detail',
+    'unit_assessment_detail',
+    'download_assessment_pdf',
+    'download_unit_statement_pdf',
+]
+
+# Unit pages are sampled rather than all visited
+UNIT_SAMPLE = 500
+
+EndpointStats = namedtuple('EndpointStats', ['endpoint', 'requests', 'errors', 'p50', 'p95', 'p99', 'throughput', 'queries'])
+
+
+def endpoint_urls(seed=0):
+    """Paths to request for each endpoint, spread over the seeded objects"""
+    rng = random.Random(seed)
+    association_ids = list(Association.objects.values_list('pk', flat=True))
+    assessment_ids = list(SpecialAssessment.objects.values_list('pk', flat=True))
+    unit_ids = list(UnitAssessment.objects.values_list('pk', flat=True))
+    unit_ids = rng.sample(unit_ids, min(len(unit_ids), UNIT_SAMPLE))
+
+    urls = {
+        'home': [reverse('assessments:home')],
+        'association_detail': [reverse('assessments:association_detail', args=[pk]) for pk in association_ids],
+        'assessment_detail': [reverse('assessments:assessment_detail', args=[pk]) for pk in assessment_ids],
+        'unit_assessment_detail': [reverse('assessments:unit_assessment_detail', args=[pk]) for pk in unit_ids],
+        'download_assessment_pdf': [reverse('assessments:download_assessment_pdf', args=[pk]) for pk in assessment_ids],
+        'download_unit_statement_pdf': [reverse('assessments:download_unit_statement_pdf', args=[pk]) for pk in unit_ids],
+    }
+    return {endpoint: paths for endpoint, paths in urls.items() if paths}
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ClientDriver:
+    """Send requests through a per-thread test client, counting queries on every database alias"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def get(self, path):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        with ExitStack() as stack:
+            # Reporting reads may be routed to the replica
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            response = client.get(path)
+            if response.streaming:
+                for chunk in response.streaming_content:
+                    pass
+            else:
+                response.content
+            response.close()
+        return response.status_code, sum(len(queries) for queries in captured)
+
+
+class LiveServerDriver:
+    """Send real HTTP requests to a live server thread on a local port"""
+
+    def __init__(self):
+        from django.contrib.staticfiles.handlers import StaticFilesHandler
+        from django.test.testcases import LiveServerThread
+
+        self.thread = LiveServerThread('localhost', StaticFilesHandler)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        self.thread.is_ready.wait()
+        if self.thread.error:
+            raise self.thread.error
+        self.base_url = f'http://localhost:{self.thread.port}'
+        return self
+
+    def __exit__(self, *exc_info):
+        self.thread.terminate()
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base_url + path) as response:
+                while response.read(64 * 1024):
+                    pass
+                return response.status, None
+        except urllib.error.HTTPError as exc:
+            return exc.code, None
+
+
+def drive_endpoint(driver, endpoint, paths, requests, concurrency):
+    """Send requests to an endpoint's paths from concurrency threads; returns EndpointStats"""
+    latencies = []
+    query_counts = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(path):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            status, queries = driver.get(path)
+        except Exception:
+            status, queries = None, None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed * 1000)
+            if queries is not None:
+                query_counts.append(queries)
+            if status != 200:
+                errors += 1
+
+    def run(path):
+        try:
+            worker(path)
+        finally:
+            connections.close_all()
+
+    batch = [paths[i % len(paths)] for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, batch))
+    wall = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return EndpointStats(
+        endpoint=endpoint,
+        requests=requests,
+        errors=errors,
+        p50=percentile(ordered, 0.50),
+        p95=percentile(ordered, 0.95),
+        p99=percentile(ordered, 0.99),
+        throughput=requests / wall if wall else 0,
+        queries=statistics.median(query_counts) if query_counts else None,
+    )
+
+
+def run_load_test(requests=100, concurrency=8, endpoints=None, live_server=False, progress=None):
+    """Drive each endpoint in turn against the current (seeded) database"""
+    urls = endpoint_urls()
+    endpoints = [endpoint for endpoint in (endpoints or ENDPOINTS) if endpoint in urls]
+    driver = LiveServerDriver() if live_server else ClientDriver()
+
+    results = []
+    with driver:
+        for endpoint in endpoints:
+            stats = drive_endpoint(driver, endpoint, urls[endpoint], requests, concurrency)
+            results.append(stats)
+            if progress:
+                progress(stats)
+    return results
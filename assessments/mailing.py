@@ -0,0 +1,126 @@
+"""
+Batched owner statement mailings.
+
+A mailing records one StatementDelivery per unit up front. Sending works through
+the pending deliveries over a single mail backend connection, renders one
+statement at a time and records each outcome as it goes, so an interrupted run
+can simply be resumed.
+"""
+import re
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import StatementMailing, StatementDelivery
+from .renderers import get_renderer
+from .streaming import spool_report
+
+
+DEFAULT_MESSAGE = (
+    "Dear {owner},\n\n"
+    "Attached is your current statement for {assessment}, Unit {unit}.\n\n"
+    "{company}"
+)
+
+# Only these placeholders are filled in; any other braces in a message are sent as written
+PLACEHOLDER_RE = re.compile(r'\{(owner|assessment|unit|company)\}')
+
+
+def fill_placeholders(message, **values):
+    """The message with each {name} placeholder replaced by its value"""
+    return PLACEHOLDER_RE.sub(lambda match: str(values[match.group(1)]), message)
+
+
+def create_mailing(special_assessment, subject, message=''):
+    """Create a mailing with one pending delivery per unit that has an owner email"""
+    mailing = StatementMailing.objects.create(special_assessment=special_assessment, subject=subject, message=message)
+    unit_assessments = special_assessment.unit_assessments.select_related('unit').order_by('unit__unit_number')
+    StatementDelivery.objects.bulk_create([
+        StatementDelivery(
+            mailing=mailing,
+            unit_assessment=ua,
+            email=ua.unit.owner_email,
+            status=StatementDelivery.STATUS_PENDING if ua.unit.owner_email else StatementDelivery.STATUS_SKIPPED,
+        )
+        for ua in unit_assessments
+    ])
+    return mailing
+
+
+def _statement_message(mailing, delivery, connection):
+    """Build the email for one delivery with its statement attached"""
+    ua = delivery.unit_assessment
+    body = fill_placeholders(
+        mailing.message or DEFAULT_MESSAGE,
+        owner=ua.unit.owner_name or 'Owner',
+        assessment=ua.special_assessment.name,
+        unit=ua.unit.unit_number,
+        company=ua.special_assessment.association.management_company,
+    )
+    email = EmailMessage(mailing.subject, body, settings.DEFAULT_FROM_EMAIL, [delivery.email], connection=connection)
+    with spool_report(get_renderer('unit_statement', 'pdf'), ua) as statement:
+        email.attach(f"Unit_{ua.unit.unit_number}_Statement.pdf", statement.read(), 'application/pdf')
+    return email
+
+
+def send_mailing(mailing, rate=None, batch_size=100, retry_failed=False, connection=None, progress=None):
+    """Send all pending deliveries of a mailing over one reused connection; returns (sent, failed)"""
+    statuses = [StatementDelivery.STATUS_PENDING]
+    if retry_failed:
+        statuses.append(StatementDelivery.STATUS_FAILED)
+
+    connection = connection or get_connection(fail_silently=False)
+    interval = 1.0 / rate if rate else 0
+    sent = failed = 0
+    last_id = 0
+
+    connection.open()
+    try:
+        while True:
+            # Page by id so memory stays bounded and resumed runs skip finished rows
+            batch = list(
+                mailing.deliveries
+                .filter(status__in=statuses, id__gt=last_id)
+                .select_related('unit_assessment__unit', 'unit_assessment__special_assessment__association')
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+
+            for delivery in batch:
+                last_id = delivery.id
+                started = time.monotonic()
+                delivery.attempts += 1
+                try:
+                    _statement_message(mailing, delivery, connection).send()
+                except Exception as exc:
+                    delivery.status = StatementDelivery.STATUS_FAILED
+                    delivery.error = str(exc)
+                    failed += 1
+                else:
+                    delivery.status = StatementDelivery.STATUS_SENT
+                    delivery.error = ''
+                    delivery.sent_at = timezone.now()
+                    sent += 1
+                delivery.save(update_fields=['status', 'error', 'attempts', 'sent_at'])
+
+                if delivery.status == StatementDelivery.STATUS_FAILED:
+                    # A broken SMTP session would fail every later message too
+                    connection.close()
+                    connection.open()
+
+                if progress:
+                    progress(delivery)
+                if interval:
+                    remaining = interval - (time.monotonic() - started)
+                    if remaining > 0:
+                        time.sleep(remaining)
+    finally:
+        connection.close()
+
+    if not mailing.deliveries.filter(status=StatementDelivery.STATUS_PENDING).exists():
+        mailing.completed_at = timezone.now()
+        mailing.save(update_fields=['completed_at'])
+    return sent, failed
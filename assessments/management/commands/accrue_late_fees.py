@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from assessments.late_fees import accrue_late_fees
+from assessments.models import SpecialAssessment
+
+
+class Command(BaseCommand):
+    help = 'Charge late fees to delinquent units under each active late fee rule (safe to re-run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Run as of this date (YYYY-MM-DD); default today')
+        parser.add_argument('--assessment', type=int, action='append', help='Only this special assessment ID (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report the fees without creating them')
+
+    def handle(self, *args, **options):
+        run_date = None
+        if options['date']:
+            run_date = parse_date(options['date'])
+            if run_date is None:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        special_assessments = None
+        if options['assessment']:
+            special_assessments = SpecialAssessment.objects.filter(pk__in=options['assessment'])
+
+        fees = accrue_late_fees(run_date=run_date, special_assessments=special_assessments, dry_run=options['dry_run'])
+        total = sum(fee.amount for fee in fees)
+        verb = 'Would charge' if options['dry_run'] else 'Charged'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(fees)} late fees totalling ${total:,.2f}'))
@@ -0,0 +1,38 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.allocation import allocate_assessment
+from assessments.models import SpecialAssessment
+
+
+class Command(BaseCommand):
+    help = "Split a special assessment's base total across its association's units by common expense allocation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assessment', type=int, required=True, help='Special assessment ID')
+        parser.add_argument('--total', help="Base total to allocate (default the assessment's total base assessment)")
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without saving them')
+
+    def handle(self, *args, **options):
+        special_assessment = SpecialAssessment.objects.select_related('association').filter(pk=options['assessment']).first()
+        if special_assessment is None:
+            raise CommandError(f"Special assessment {options['assessment']} does not exist")
+
+        total = None
+        if options['total']:
+            try:
+                total = Decimal(options['total'].replace(',', '').replace('$', ''))
+            except InvalidOperation:
+                raise CommandError(f"Invalid total: {options['total']}")
+
+        try:
+            result = allocate_assessment(special_assessment, total=total, dry_run=options['dry_run'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        verb = 'Would allocate' if options['dry_run'] else 'Allocated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} ${result.total:,.2f}: {result.created} unit assessments created, '
+            f'{result.updated} updated, {result.unchanged} unchanged'
+        ))
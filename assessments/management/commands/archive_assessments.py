@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.archive import archive_assessment, closed_assessments, is_closed, restore_assessment
+from assessments.models import SpecialAssessment
+
+
+class Command(BaseCommand):
+    help = 'Move the payments and fees of closed special assessments into the archive tables, or restore them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assessment', type=int, action='append', help='Special assessment ID (repeatable; default: every closed assessment)')
+        parser.add_argument('--restore', action='store_true', help='Move the given archived assessments back into the live tables')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be archived or restored')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            if not options['assessment']:
+                raise CommandError('--restore needs --assessment')
+            assessments = list(SpecialAssessment.objects.filter(pk__in=options['assessment'], archived_at__isnull=False)
+                               .select_related('association'))
+            action, verb = restore_assessment, 'Restored'
+        elif options['assessment']:
+            assessments = []
+            for sa in SpecialAssessment.objects.filter(pk__in=options['assessment'], archived_at__isnull=True).select_related('association'):
+                if not is_closed(sa):
+                    raise CommandError(f'{sa} is not closed: its term has not ended or a unit still owes a balance')
+                assessments.append(sa)
+            action, verb = archive_assessment, 'Archived'
+        else:
+            assessments = closed_assessments()
+            action, verb = archive_assessment, 'Archived'
+
+        if not assessments:
+            self.stdout.write('Nothing to do')
+            return
+
+        started = time.perf_counter()
+        for sa in assessments:
+            if options['dry_run']:
+                self.stdout.write(f'Would be {verb.lower()}: {sa}')
+                continue
+            moved = action(sa)
+            self.stdout.write(f"{verb} {sa}: " + ', '.join(f'{count} {name}' for name, count in moved.items()))
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} {len(assessments)} special assessments in {time.perf_counter() - started:.1f}s'
+            ))
@@ -0,0 +1,60 @@
+import csv
+import sys
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from assessments.models import UnitAssessment
+from hoa_management.routers import reporting_reads, unit_of_work
+
+
+CENTS = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Write every unit balance and payment status as of a date to CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', required=True, help='Audit date (YYYY-MM-DD), e.g. the fiscal year end')
+        parser.add_argument('--association', type=int, help='Only this association ID')
+        parser.add_argument('--output', help='CSV file to write (default stdout)')
+
+    @unit_of_work()
+    def handle(self, *args, **options):
+        as_of = parse_date(options['as_of'])
+        if as_of is None:
+            raise CommandError(f"Invalid date: {options['as_of']}")
+
+        unit_assessments = UnitAssessment.objects.select_related('special_assessment__association')
+        if options['association']:
+            unit_assessments = unit_assessments.filter(special_assessment__association_id=options['association'])
+        unit_assessments = unit_assessments.with_totals(as_of).order_by(
+            'special_assessment__association__name', 'special_assessment__name', 'unit__unit_number')
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['Association', 'Assessment', 'Unit', 'Owner', 'Payment Option', 'Total Assessment',
+                             'Paid Through As Of', 'Balance As Of', 'Status As Of'])
+            count = 0
+            with reporting_reads():
+                for ua in unit_assessments.iterator(chunk_size=2000):
+                    writer.writerow([
+                        ua.special_assessment.association.name,
+                        ua.special_assessment.name,
+                        ua.unit.unit_number,
+                        ua.unit.owner_name,
+                        ua.get_payment_option_display(),
+                        ua.total_assessment_amount(),
+                        ua.total_paid().quantize(CENTS),
+                        ua.remaining_balance().quantize(CENTS),
+                        ua.payment_status(),
+                    ])
+                    count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {count} units as of {as_of} to {options['output']}"))
@@ -0,0 +1,87 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Run in a fresh interpreter: set Django up, load the URLconf (and with it the
+# views and admin) the way a web worker does before its first request, then
+# optionally import every registered report backend.
+STARTUP_SCRIPT = '''
+import os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter()
+if {backends!r}:
+    from assessments.renderers import RENDERERS, get_renderer
+    for report, format in RENDERERS:
+        get_renderer(report, format)
+print((ready - started) * 1000, (time.perf_counter() - started) * 1000)
+'''
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+# Packages that should only be imported when a report is rendered
+HEAVY_PACKAGES = ['reportlab', 'openpyxl', 'pypdf']
+
+
+def run_startup(backends):
+    """One cold start; returns (startup ms, ms including backends, {top-level module: cumulative ms})"""
+    script = STARTUP_SCRIPT.format(settings_module=os.environ['DJANGO_SETTINGS_MODULE'], backends=backends)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            cwd=settings.BASE_DIR, capture_output=True, text=True)
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports[match.group(4)] = int(match.group(2)) / 1000
+    startup, total = (float(value) for value in result.stdout.split())
+    return startup, total, imports
+
+
+class Command(BaseCommand):
+    help = 'Measure cold worker startup with -X importtime, with and without the report backends imported'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts per scenario (default 5)')
+        parser.add_argument('--top', type=int, default=10, help='Slowest startup imports to list')
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        lazy = [run_startup(backends=False) for _ in range(repeat)]
+        eager = [run_startup(backends=True) for _ in range(repeat)]
+
+        startup = statistics.median(run[0] for run in lazy)
+        with_backends = statistics.median(run[1] for run in eager)
+
+        self.stdout.write(f'{"Scenario":<32} {"Median ms":>10} {"Min ms":>10}')
+        self.stdout.write(f'{"Worker startup":<32} {startup:>10.1f} {min(run[0] for run in lazy):>10.1f}')
+        self.stdout.write(f'{"Startup + report backends":<32} {with_backends:>10.1f} {min(run[1] for run in eager):>10.1f}')
+
+        imports = lazy[-1][2]
+        self.stdout.write(f'\nSlowest top-level imports at startup (cumulative ms):')
+        for name, elapsed in sorted(imports.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<40} {elapsed:>8.1f}')
+
+        backend_imports = {name: elapsed for name, elapsed in eager[-1][2].items() if name.split('.')[0] in HEAVY_PACKAGES}
+        self.stdout.write('\nReport backends, imported on first render (cumulative ms):')
+        for name, elapsed in sorted(backend_imports.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {name:<40} {elapsed:>8.1f}')
+
+        loaded = sorted(name for name in imports if name.split('.')[0] in HEAVY_PACKAGES)
+        if loaded:
+            raise CommandError(f'Report backends imported at startup: {", ".join(loaded)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Lazy backends keep {with_backends - startup:.0f} ms out of every cold start'
+        ))
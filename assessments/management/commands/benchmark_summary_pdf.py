@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from assessments.renderers import render
+from assessments.synthetic import scratch_database, seed_portfolio
+
+
+class Command(BaseCommand):
+    help = 'Benchmark assessment summary PDF rendering against synthetic assessments of increasing size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='500,1000,2000,5000', help='Comma-separated unit counts to render')
+        parser.add_argument('--months-paid', type=int, default=12, help='Monthly payments seeded per unit')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        # Seed and render in a throwaway test database, never the configured one
+        with scratch_database():
+            self.stdout.write(f'{"Units":>8} {"Seconds":>10} {"ms/unit":>10} {"KB":>10}')
+            for size in sizes:
+                special_assessment = seed_portfolio(units_per_association=size, months_paid=options['months_paid'])[0]
+
+                started = time.perf_counter()
+                pdf = render('assessment_summary', 'pdf', special_assessment)
+                elapsed = time.perf_counter() - started
+
+                kilobytes = len(pdf.getvalue()) / 1024
+                self.stdout.write(f'{size:>8} {elapsed:>10.2f} {elapsed * 1000 / size:>10.3f} {kilobytes:>10.0f}')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete; ms/unit should stay flat as size grows'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from assessments.models import BalanceSnapshot
+from assessments.snapshots import build_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Create the missing month-end balance snapshots used by as-of date queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', help='Snapshot through the month of this date (YYYY-MM-DD); default last complete month')
+        parser.add_argument('--rebuild', action='store_true', help='Delete all snapshots first')
+
+    def handle(self, *args, **options):
+        through = None
+        if options['through']:
+            through = parse_date(options['through'])
+            if through is None:
+                raise CommandError(f"Invalid date: {options['through']}")
+
+        if options['rebuild']:
+            deleted = BalanceSnapshot.objects.all().delete()[0]
+            self.stdout.write(f'Deleted {deleted} snapshots')
+
+        created = build_snapshots(through=through)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} balance snapshots'))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Association, SpecialAssessment
+from assessments.packets import build_packet
+
+
+class Command(BaseCommand):
+    help = 'Build one annual meeting PDF packet with the summary report of every selected special assessment'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--association', type=int, help='Association ID')
+        scope.add_argument('--company', help='Management company name (all of its associations)')
+        scope.add_argument('--all', action='store_true', help='Every special assessment')
+        parser.add_argument('--output', required=True, help='Path of the PDF to write')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        assessments = SpecialAssessment.objects.select_related('association').order_by('association__name', '-start_date')
+        if options['association']:
+            association = Association.objects.filter(pk=options['association']).first()
+            if association is None:
+                raise CommandError(f"Association {options['association']} does not exist")
+            assessments = assessments.filter(association=association)
+            title = f'{association.name} - Annual Meeting Packet'
+        elif options['company']:
+            assessments = assessments.filter(association__management_company=options['company'])
+            title = f"{options['company']} - Annual Meeting Packet"
+        else:
+            title = 'Annual Meeting Packet'
+
+        assessments = list(assessments)
+        if not assessments:
+            raise CommandError('No special assessments matched')
+
+        started = time.perf_counter()
+        with open(options['output'], 'wb') as output:
+            sections = build_packet(assessments, output, title=title, workers=options['workers'])
+        elapsed = time.perf_counter() - started
+
+        pages = sum(section.pages for section in sections)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(sections)} assessments ({pages} pages) to {options['output']} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.analytics import CHUNK_ROWS, WRITERS, available_formats, export_dataset
+
+
+class Command(BaseCommand):
+    help = 'Export associations, units, assessments, fees and payments as typed columnar files for pandas or DuckDB'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help='Directory to write the tables and schema.json into')
+        parser.add_argument('--format', choices=list(WRITERS), help='Default: parquet if pyarrow is installed, else npz if numpy is, else csv')
+        parser.add_argument('--association', type=int, help='Only this association ID')
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f'Rows per chunk / row group (default {CHUNK_ROWS})')
+
+    def handle(self, *args, **options):
+        if options['chunk_rows'] < 1:
+            raise CommandError('--chunk-rows must be at least 1')
+
+        def progress(table, rows):
+            self.stdout.write(f'{table}: {rows} rows')
+
+        started = time.perf_counter()
+        try:
+            manifest = export_dataset(
+                options['output'],
+                format=options['format'],
+                association_id=options['association'],
+                chunk_rows=options['chunk_rows'],
+                progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(f'{exc}; available: {", ".join(available_formats())}')
+        elapsed = time.perf_counter() - started
+
+        rows = sum(table['rows'] for table in manifest['tables'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rows as {manifest['format']} to {options['output']} in {elapsed:.1f}s"
+        ))
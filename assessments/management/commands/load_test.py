@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from assessments.loadtest import ENDPOINTS, run_load_test
+from assessments.synthetic import scratch_database, seed_portfolio
+
+
+# Keep the load test's cache entries away from the shared file cache
+LOAD_TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class Command(BaseCommand):
+    help = 'Load test the web views with concurrent requests against a seeded throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--associations', type=int, default=2, help='Synthetic associations (one assessment each)')
+        parser.add_argument('--units', type=int, default=200, help='Units per association')
+        parser.add_argument('--months-paid', type=int, default=12, help='Monthly payments seeded per unit')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Simultaneous requests')
+        parser.add_argument('--endpoints', help=f'Comma-separated subset of: {", ".join(ENDPOINTS)}')
+        parser.add_argument('--live-server', action='store_true',
+                            help='Send real HTTP requests to a local server thread instead of the test client (no query counts)')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'].split(',') if options['endpoints'] else ENDPOINTS
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(ALLOWED_HOSTS=['*'], CACHES=LOAD_TEST_CACHES), \
+                scratch_database(name=os.path.join(directory, 'load_test.sqlite3')):
+            seed_portfolio(associations=options['associations'], units_per_association=options['units'],
+                           months_paid=options['months_paid'])
+            self.stdout.write(
+                f"Seeded {options['associations']} x {options['units']} units; "
+                f"{options['requests']} requests per endpoint, {options['concurrency']} at a time"
+            )
+            self.stdout.write(f'{"Endpoint":<30} {"Reqs":>6} {"Errors":>6} {"p50 ms":>8} {"p95 ms":>8} '
+                              f'{"p99 ms":>8} {"req/s":>8} {"Queries":>8}')
+
+            def progress(stats):
+                queries = '-' if stats.queries is None else f'{stats.queries:g}'
+                self.stdout.write(
+                    f'{stats.endpoint:<30} {stats.requests:>6} {stats.errors:>6} {stats.p50:>8.1f} {stats.p95:>8.1f} '
+                    f'{stats.p99:>8.1f} {stats.throughput:>8.1f} {queries:>8}'
+                )
+
+            results = run_load_test(requests=options['requests'], concurrency=options['concurrency'],
+                                    endpoints=endpoints, live_server=options['live_server'], progress=progress)
+
+        errors = sum(stats.errors for stats in results)
+        if errors:
+            raise CommandError(f'{errors} requests failed')
+        self.stdout.write(self.style.SUCCESS('Load test complete; queries is the median per request'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.mailing import create_mailing, send_mailing
+from assessments.models import SpecialAssessment, StatementMailing, StatementDelivery
+
+
+class Command(BaseCommand):
+    help = 'Email each unit owner their statement for a special assessment over one SMTP connection'
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--assessment', type=int, help='Special assessment ID to start a new mailing for')
+        scope.add_argument('--resume', type=int, help='Mailing ID to resume')
+        parser.add_argument('--subject', default='Special Assessment Statement', help='Email subject for a new mailing')
+        parser.add_argument('--rate', type=float, default=None, help='Maximum messages per second')
+        parser.add_argument('--batch-size', type=int, default=100, help='Deliveries loaded per query')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry deliveries that failed before')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            mailing = StatementMailing.objects.filter(pk=options['resume']).first()
+            if mailing is None:
+                raise CommandError(f"Mailing {options['resume']} does not exist")
+            self.stdout.write(f'Resuming mailing {mailing.pk}: {mailing}')
+        else:
+            special_assessment = SpecialAssessment.objects.filter(pk=options['assessment']).first()
+            if special_assessment is None:
+                raise CommandError(f"Special assessment {options['assessment']} does not exist")
+            mailing = create_mailing(special_assessment, options['subject'])
+            skipped = mailing.deliveries.filter(status=StatementDelivery.STATUS_SKIPPED).count()
+            self.stdout.write(f'Created mailing {mailing.pk} ({skipped} units skipped with no owner email)')
+
+        def progress(delivery):
+            if delivery.status == StatementDelivery.STATUS_FAILED:
+                self.stdout.write(self.style.WARNING(f'Failed {delivery.email}: {delivery.error}'))
+
+        sent, failed = send_mailing(
+            mailing,
+            rate=options['rate'],
+            batch_size=options['batch_size'],
+            retry_failed=options['retry_failed'],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Mailing {mailing.pk}: {sent} sent, {failed} failed'))
+        if failed:
+            self.stdout.write(f'Retry with: manage.py mail_statements --resume {mailing.pk} --retry-failed')
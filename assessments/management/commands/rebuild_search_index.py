@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from assessments.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the unit, owner and payment reference search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild')
+
+    def handle(self, *args, **options):
+        count = rebuild_index(using=options['database'])
+        backend = 'SQLite FTS5' if fts_enabled(options['database']) else 'search term table'
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} units and payments ({backend})'))
@@ -0,0 +1,70 @@
+import csv
+import sys
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import UnitAssessment
+from assessments.reconciliation import ReconciliationIndex, read_deposits
+
+
+class Command(BaseCommand):
+    help = 'Propose unit assessment matches for unidentified deposits from a CSV exception file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('deposits', help='CSV with date, amount, name, unit, reference and memo columns')
+        parser.add_argument('--output', help='CSV file for the proposed matches (default stdout)')
+        parser.add_argument('--association', type=int, help='Only match against this association ID')
+        parser.add_argument('--assessment', type=int, help='Only match against this special assessment ID')
+        parser.add_argument('--top', type=int, default=3, help='Candidates proposed per deposit')
+        parser.add_argument('--tolerance', type=Decimal, default=Decimal('1.00'), help='Amount difference still treated as a match')
+
+    def handle(self, *args, **options):
+        if not options['tolerance'].is_finite() or options['tolerance'] < 0:
+            raise CommandError('--tolerance must be a non-negative amount')
+        try:
+            with open(options['deposits'], newline='') as file:
+                deposits = read_deposits(file)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['deposits']}: {exc}")
+
+        unit_assessments = UnitAssessment.objects.all()
+        if options['association']:
+            unit_assessments = unit_assessments.filter(special_assessment__association_id=options['association'])
+        if options['assessment']:
+            unit_assessments = unit_assessments.filter(special_assessment_id=options['assessment'])
+
+        started = time.monotonic()
+        index = ReconciliationIndex(unit_assessments, tolerance=options['tolerance'])
+        built = time.monotonic()
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        matched = 0
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['Line', 'Date', 'Amount', 'Name', 'Unit', 'Reference', 'Rank', 'Score',
+                             'Unit Assessment ID', 'Matched Unit', 'Matched Owner', 'Special Assessment', 'Reasons'])
+            for deposit in deposits:
+                deposit_columns = [deposit.line, deposit.date or '', deposit.amount if deposit.amount is not None else '',
+                                   deposit.name, deposit.unit, deposit.reference]
+                if deposit.error:
+                    writer.writerow(deposit_columns + ['', '', '', '', '', '', deposit.error])
+                    continue
+                candidates = index.candidates(deposit, limit=options['top'])
+                if candidates:
+                    matched += 1
+                for rank, candidate in enumerate(candidates, start=1):
+                    writer.writerow(deposit_columns + [rank, candidate.score, candidate.unit_assessment_id, candidate.unit_number,
+                                                       candidate.owner_name, candidate.special_assessment, '; '.join(candidate.reasons)])
+                if not candidates:
+                    writer.writerow(deposit_columns + ['', '', '', '', '', '', 'no candidates'])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        unparseable = sum(1 for deposit in deposits if deposit.error)
+        self.stderr.write(
+            f'{matched} of {len(deposits)} deposits have candidates, {unparseable} unparseable; '
+            f'indexed {len(index.units)} units in {built - started:.2f}s, matched in {time.monotonic() - built:.2f}s'
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from assessments.events import EVENT_RETENTION_DAYS, prune_events
+from assessments.models import UnitAssessment
+from assessments.statuses import refresh_statuses
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored payment status, days delinquent and amount past due of every unit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Compute as of this date (YYYY-MM-DD); default today')
+        parser.add_argument('--assessment', type=int, help='Only this special assessment ID')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        unit_assessments = UnitAssessment.objects.all()
+        if options['assessment']:
+            unit_assessments = unit_assessments.filter(special_assessment_id=options['assessment'])
+
+        changed = refresh_statuses(unit_assessments, today=today)
+        self.stdout.write(self.style.SUCCESS(f'Updated the status of {changed} unit assessments'))
+
+        # Dashboards only replay recent events, so the nightly run also trims the log
+        pruned = prune_events()
+        self.stdout.write(f'Removed {pruned} dashboard events older than {EVENT_RETENTION_DAYS} days')
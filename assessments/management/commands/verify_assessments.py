@@ -0,0 +1,67 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.integrity import check_assessments, fix_discrepancies
+from assessments.models import SpecialAssessment
+from hoa_management.routers import reporting_reads, unit_of_work
+
+
+class Command(BaseCommand):
+    help = 'Check the stored assessment totals and monthly payments against their rows, and optionally fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--association', type=int, help='Only this association ID')
+        parser.add_argument('--assessment', type=int, action='append', help='Special assessment ID (repeatable)')
+        parser.add_argument('--fix', action='store_true', help='Write the expected totals and monthly payments')
+        parser.add_argument('--output', help='Also write the discrepancies to this CSV file')
+
+    @unit_of_work()
+    def handle(self, *args, **options):
+        assessments = SpecialAssessment.objects.all()
+        if options['association']:
+            assessments = assessments.filter(association_id=options['association'])
+        if options['assessment']:
+            assessments = assessments.filter(pk__in=options['assessment'])
+
+        started = time.perf_counter()
+        with reporting_reads():
+            report = check_assessments(assessments)
+        elapsed = time.perf_counter() - started
+        names = {drift.special_assessment.pk: str(drift.special_assessment) for drift in report.drifts}
+
+        for drift in report.drifts:
+            self.stdout.write(
+                f"{drift.special_assessment}: {drift.rows} monthly rows pay ${drift.priced:,.2f}/month, "
+                f"${drift.priced - drift.exact:+,.2f} from the payment on their principal "
+                f"and ${drift.priced - drift.loan:+,.2f} from the loan payment of ${drift.loan:,.2f}"
+            )
+        for discrepancy in report.discrepancies:
+            self.stdout.write(self.style.WARNING(
+                f"{names.get(discrepancy.special_assessment_id, discrepancy.special_assessment_id)}: "
+                f"{discrepancy.model} {discrepancy.object_id} {discrepancy.field} is {discrepancy.stored}, "
+                f"expected {discrepancy.expected}" + ('' if discrepancy.fixable else ' (report only)')
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(['Special Assessment', 'Model', 'ID', 'Field', 'Stored', 'Expected', 'Fixable'])
+                for discrepancy in report.discrepancies:
+                    writer.writerow([discrepancy.special_assessment_id, discrepancy.model, discrepancy.object_id,
+                                     discrepancy.field, discrepancy.stored, discrepancy.expected, discrepancy.fixable])
+
+        self.stdout.write(
+            f"Checked {report.assessments} assessments, {report.unit_assessments} unit assessments "
+            f"and {report.fees} fees in {elapsed:.1f}s: {len(report.discrepancies)} discrepancies"
+        )
+
+        # Report-only discrepancies are the loan terms' to settle, so only unfixed derived values fail the run
+        unfixed = [discrepancy for discrepancy in report.discrepancies if discrepancy.fixable]
+        if options['fix'] and unfixed:
+            updated = fix_discrepancies(report.discrepancies)
+            self.stdout.write(self.style.SUCCESS(f'Fixed {updated} values'))
+            unfixed = []
+        if unfixed:
+            raise CommandError(f'{len(unfixed)} fixable discrepancies remain; run with --fix')
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from assessments.models import SpecialAssessment, UnitAssessment
+from assessments.rollups import warm_assessment
+from assessments.statuses import refresh_statuses
+
+
+class Command(BaseCommand):
+    help = 'Precompute statuses, rollups and optionally summary PDFs of every active assessment, after deploys and at midnight'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Assessments warmed at once (default 4)')
+        parser.add_argument('--pdfs', action='store_true', help='Also render and cache each summary PDF')
+        parser.add_argument('--assessment', type=int, action='append', help='Only this special assessment ID (repeatable)')
+        parser.add_argument('--include-finished', action='store_true', help='Also warm assessments whose term has ended')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        today = date.today()
+        assessments = SpecialAssessment.objects.filter(archived_at__isnull=True).order_by('pk')
+        if options['assessment']:
+            assessments = assessments.filter(pk__in=options['assessment'])
+        assessment_ids = [
+            sa.pk for sa in assessments.only('pk', 'start_date', 'loan_period_months')
+            if options['include_finished'] or sa.installments_due(today) < sa.loan_period_months
+        ]
+        if not assessment_ids:
+            self.stdout.write('No active special assessments to warm')
+            return
+
+        started = time.perf_counter()
+        # SQLite takes one writer at a time, so statuses are stored here before the pool only reads
+        changed = {
+            pk: refresh_statuses(UnitAssessment.objects.filter(special_assessment_id=pk), today=today)
+            for pk in assessment_ids
+        }
+
+        def warm(assessment_id):
+            try:
+                return warm_assessment(assessment_id, pdfs=options['pdfs'])
+            finally:
+                # Each pool thread holds its own connection
+                connections.close_all()
+
+        failures = 0
+        with ThreadPoolExecutor(max_workers=min(options['workers'], len(assessment_ids))) as pool:
+            futures = {pool.submit(warm, pk): pk for pk in assessment_ids}
+            for future in as_completed(futures):
+                try:
+                    special_assessment, units = future.result()
+                except Exception as exc:
+                    failures += 1
+                    self.stderr.write(f'Assessment {futures[future]}: {exc}')
+                    continue
+                self.stdout.write(f'{special_assessment}: {units} units, {changed[special_assessment.pk]} statuses updated')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(assessment_ids) - failures} of {len(assessment_ids)} assessments in {elapsed:.1f}s'
+        ))
+        if failures:
+            raise CommandError(f'{failures} assessments failed to warm')
@@ -0,0 +1,63 @@
+import os
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments.models import Association, SpecialAssessment
+from assessments.renderers import get_renderer
+from assessments.streaming import write_report
+from assessments.yearend import year_end_summary
+from hoa_management.routers import reporting_reads, unit_of_work
+
+
+class Command(BaseCommand):
+    help = 'Write the year-end interest and principal paid by every unit, as one CSV and/or a PDF of owner letters per assessment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year - 1, help='Calendar year (default: last year)')
+        parser.add_argument('--association', type=int, help='Only this association (default: all)')
+        parser.add_argument('--output', required=True, help='Directory to write the files into')
+        parser.add_argument('--format', choices=['csv', 'pdf', 'both'], default='both')
+
+    @unit_of_work()
+    def handle(self, *args, **options):
+        year = options['year']
+        assessments = (
+            SpecialAssessment.objects.filter(start_date__lte=date(year, 12, 31))
+            .select_related('association').order_by('association__name', 'start_date', 'pk')
+        )
+        if options['association']:
+            if not Association.objects.filter(pk=options['association']).exists():
+                raise CommandError(f"Association {options['association']} does not exist")
+            assessments = assessments.filter(association_id=options['association'])
+        os.makedirs(options['output'], exist_ok=True)
+
+        formats = ['csv', 'pdf'] if options['format'] == 'both' else [options['format']]
+        render_csv = get_renderer('year_end_summary', 'csv') if 'csv' in formats else None
+        render_pdf = get_renderer('year_end_summary', 'pdf') if 'pdf' in formats else None
+
+        started = time.perf_counter()
+        csv_path = os.path.join(options['output'], f'Year_End_{year}.csv')
+        csv_file = open(csv_path, 'wb') if render_csv else None
+        units = 0
+        try:
+            for count, special_assessment in enumerate(assessments, 1):
+                with reporting_reads():
+                    summary = year_end_summary(special_assessment, year)
+                if csv_file:
+                    render_csv(summary, output=csv_file, header=count == 1)
+                if render_pdf:
+                    filename = (f"{special_assessment.association.name}_{special_assessment.name}_"
+                                f"Year_End_{year}.pdf").replace(' ', '_').replace('/', '-')
+                    write_report(render_pdf, os.path.join(options['output'], filename), summary)
+                units += len(summary.rows)
+                self.stdout.write(f"{special_assessment.association.name} / {special_assessment.name}: {len(summary.rows)} units")
+        finally:
+            if csv_file:
+                csv_file.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {year} year-end figures for {units} units to {options['output']} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementMailing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200)),
+                ('message', models.TextField(blank=True, help_text='Email body sent with each statement')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('special_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_mailings', to='assessments.specialassessment')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatementDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped (no email)')], db_index=True, default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('mailing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='assessments.statementmailing')),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_deliveries', to='assessments.unitassessment')),
+            ],
+            options={
+                'verbose_name_plural': 'statement deliveries',
+                'ordering': ['id'],
+                'unique_together': {('mailing', 'unit_assessment')},
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:01
+
+import re
+
+from django.db import migrations, models
+
+
+FTS_TABLE = 'assessments_search_fts'
+
+
+def tokenize(*values):
+    terms = []
+    for value in values:
+        for token in re.findall(r'\w+', (value or '').lower()):
+            if token[:100] not in terms:
+                terms.append(token[:100])
+    return terms
+
+
+def build_search_index(apps, schema_editor):
+    """Create the FTS5 table on SQLite and index existing units and payments"""
+    Unit = apps.get_model('assessments', 'Unit')
+    Payment = apps.get_model('assessments', 'Payment')
+    SearchEntry = apps.get_model('assessments', 'SearchEntry')
+    connection = schema_editor.connection
+
+    use_fts = False
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")
+            use_fts = cursor.fetchone() is not None
+        if use_fts:
+            schema_editor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, tokenize='unicode61')")
+
+    documents = [
+        (pk * 2, tokenize(unit_number, owner_name, owner_email), 'unit', pk)
+        for pk, unit_number, owner_name, owner_email
+        in Unit.objects.using(connection.alias).values_list('pk', 'unit_number', 'owner_name', 'owner_email').iterator()
+    ] + [
+        (pk * 2 + 1, tokenize(reference_number), 'payment', pk)
+        for pk, reference_number in Payment.objects.using(connection.alias).values_list('pk', 'reference_number').iterator()
+    ]
+    if use_fts:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(rowid, ' '.join(terms)) for rowid, terms, kind, pk in documents if terms],
+            )
+    else:
+        SearchEntry.objects.using(connection.alias).bulk_create([
+            SearchEntry(kind=kind, object_id=pk, term=term)
+            for rowid, terms, kind, pk in documents
+            for term in terms
+        ], batch_size=2000)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0002_statement_mailings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('unit', 'Unit'), ('payment', 'Payment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('term', models.CharField(db_index=True, max_length=100)),
+            ],
+            options={
+                'verbose_name_plural': 'search entries',
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='assessments_kind_8e7c25_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
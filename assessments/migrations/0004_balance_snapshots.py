@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_end', models.DateField(help_text='Last day of the month this snapshot covers')),
+                ('total_paid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='assessments.unitassessment')),
+            ],
+            options={
+                'ordering': ['unit_assessment', 'period_end'],
+                'unique_together': {('unit_assessment', 'period_end')},
+            },
+        ),
+    ]
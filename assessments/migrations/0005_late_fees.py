@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:14
+
+from decimal import Decimal
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0004_balance_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LateFeeRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grace_days', models.PositiveIntegerField(default=15, help_text="Days after an installment's due date before it is late")),
+                ('flat_fee', models.DecimalField(decimal_places=2, default=Decimal('25.00'), help_text='Fixed fee charged per late month', max_digits=10)),
+                ('percent_of_past_due', models.DecimalField(decimal_places=2, default=0, help_text='Additional percentage of the amount past due', max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('maximum_fee', models.DecimalField(blank=True, decimal_places=2, help_text="Cap on a single month's fee", max_digits=10, null=True)),
+                ('minimum_past_due', models.DecimalField(decimal_places=2, default=Decimal('1.00'), help_text='Amounts past due below this are not charged', max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('special_assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='late_fee_rule', to='assessments.specialassessment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LateFee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='Due date of the installment that was late')),
+                ('amount_past_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('waived', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='late_fees', to='assessments.unitassessment')),
+            ],
+            options={
+                'ordering': ['-period'],
+                'unique_together': {('unit_assessment', 'period')},
+            },
+        ),
+    ]
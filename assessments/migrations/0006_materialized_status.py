@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0005_late_fees'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unitassessment',
+            name='amount_past_due',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='unitassessment',
+            name='days_delinquent',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='unitassessment',
+            name='status',
+            field=models.CharField(blank=True, choices=[('Paid in Full', 'Paid in Full'), ('Current', 'Current'), ('Behind', 'Behind'), ('Not Started', 'Not Started'), ('Partial Payment', 'Partial Payment'), ('Not Paid', 'Not Paid')], db_index=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='unitassessment',
+            name='status_updated_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='unitassessment',
+            index=models.Index(fields=['special_assessment', 'status'], name='assessments_special_01ef77_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0006_materialized_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('payment_posted', 'Payment posted'), ('status_changed', 'Status changed')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='assessments.association')),
+                ('special_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='assessments.specialassessment')),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='assessments.unitassessment')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['special_assessment', 'id'], name='assessments_special_80eeb3_idx'), models.Index(fields=['association', 'id'], name='assessments_associa_8e750c_idx')],
+            },
+        ),
+    ]
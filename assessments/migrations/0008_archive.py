@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0007_assessment_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialassessment',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_method', models.CharField(blank=True, max_length=50)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_payments', to='assessments.unitassessment')),
+            ],
+            options={
+                'ordering': ['-payment_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAdditionalFee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fee_type', models.CharField(max_length=100)),
+                ('fee_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('monthly_payment', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('unit_assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_fees', to='assessments.unitassessment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0008_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialassessment',
+            name='cache_version',
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+STATUS_FIELDS = ['status', 'days_delinquent', 'amount_past_due', 'status_updated_on']
+
+
+def backfill_statuses(apps, schema_editor):
+    """Store the status of every unit assessment, which 0006 added with defaults only"""
+    # Statuses come from UnitAssessment.delinquency, so the current classes compute
+    # them on unsaved instances; only the historical models read and write rows
+    from assessments.models import SpecialAssessment as CurrentSpecialAssessment, UnitAssessment as CurrentUnitAssessment
+
+    db = schema_editor.connection.alias
+    today = date.today()
+    UnitAssessment = apps.get_model('assessments', 'UnitAssessment')
+    special_assessments = {
+        sa.pk: CurrentSpecialAssessment(pk=sa.pk, start_date=sa.start_date, loan_period_months=sa.loan_period_months,
+                                        interest_rate=sa.interest_rate)
+        for sa in apps.get_model('assessments', 'SpecialAssessment').objects.using(db)
+    }
+
+    def totals(model_name, field, **filters):
+        # An assessment's rows are either all live or all archived, so the tables add up
+        summed = defaultdict(lambda: Decimal('0.00'))
+        for archived in ('', 'Archived'):
+            rows = (apps.get_model('assessments', archived + model_name).objects.using(db).filter(**filters)
+                    .order_by().values_list('unit_assessment').annotate(total=Sum(field)))
+            for unit_assessment_id, total in rows:
+                summed[unit_assessment_id] += total
+        return summed
+
+    fees = totals('AdditionalFee', 'fee_amount')
+    fees_monthly = totals('AdditionalFee', 'monthly_payment')
+    paid = totals('Payment', 'amount', payment_date__lte=today)
+
+    rows = []
+    for row in UnitAssessment.objects.using(db).order_by('pk').iterator(chunk_size=2000):
+        ua = CurrentUnitAssessment(
+            pk=row.pk, special_assessment=special_assessments[row.special_assessment_id],
+            payment_option=row.payment_option, base_assessment_amount=row.base_assessment_amount,
+            monthly_base_payment=row.monthly_base_payment,
+        )
+        ua.annotated_lce_fees, ua.annotated_lce_monthly, ua.annotated_paid = fees[row.pk], fees_monthly[row.pk], paid[row.pk]
+        ua.annotated_as_of = today
+        row.status, row.days_delinquent, row.amount_past_due = ua.delinquency(today)
+        row.status_updated_on = today
+        rows.append(row)
+    UnitAssessment.objects.using(db).bulk_update(rows, STATUS_FIELDS, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0009_cache_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_statuses, migrations.RunPython.noop),
+    ]
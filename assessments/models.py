@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from bisect import bisect_right
+from datetime import date, timedelta
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
+from functools import lru_cache
 import math
 
+from .amortization import monthly_payment
+
 
 class Association(models.Model):
     """Represents an HOA or Condominium Association"""
@@ -39,6 +47,13 @@ class SpecialAssessment(models.Model):
     total_base_assessment = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_lce_assessments = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Total Limited Common Element assessments")
 
+    # Set once the payments and fees have moved to the archive tables
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    # Part of the cache keys of the assessment's rollup and summary PDF; only
+    # ever incremented in SQL by rollups.bump_assessment_version
+    cache_version = models.PositiveBigIntegerField(default=1, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -48,24 +63,46 @@ class SpecialAssessment(models.Model):
     def __str__(self):
         return f"{self.association.name} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        # A stale instance must not write an older cache_version back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'cache_version'
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def is_archived(self):
+        return self.archived_at is not None
+
     def monthly_interest_rate(self):
         """Get monthly interest rate as decimal"""
         return (self.interest_rate / 100) / 12
 
     def calculate_monthly_payment(self, principal):
         """Calculate monthly payment for a given principal using loan amortization formula"""
-        if principal == 0:
-            return Decimal('0.00')
+        # M = P * [r(1+r)^n] / [(1+r)^n - 1], with the factor cached per (rate, term)
+        return monthly_payment(principal, self.interest_rate, self.loan_period_months)
 
-        r = float(self.monthly_interest_rate())
-        n = self.loan_period_months
+    def installment_dates(self):
+        """Due dates of every monthly installment"""
+        return installment_dates(self.start_date, self.loan_period_months)
 
-        if r == 0:
-            return Decimal(principal / n).quantize(Decimal('0.01'))
+    def installments_due(self, as_of):
+        """Number of monthly installments due on or before as_of"""
+        return bisect_right(self.installment_dates(), as_of)
 
-        # M = P * [r(1+r)^n] / [(1+r)^n - 1]
-        monthly_payment = float(principal) * (r * math.pow(1 + r, n)) / (math.pow(1 + r, n) - 1)
-        return Decimal(monthly_payment).quantize(Decimal('0.01'))
+
+@lru_cache(maxsize=1024)
+def installment_dates(start, count):
+    """Due dates of count monthly installments from start"""
+    # Each due date is one month after the previous one, so a start late in the
+    # month keeps the day of the shortest month passed (Jan 31, Feb 29, Mar 29, ...)
+    dates = [start]
+    for _ in range(count - 1):
+        dates.append(dates[-1] + relativedelta(months=1))
+    return tuple(dates)
 
 
 class Unit(models.Model):
@@ -88,6 +125,59 @@ class Unit(models.Model):
         return f"{self.association.name} - Unit {self.unit_number}"
 
 
+class UnitAssessmentQuerySet(models.QuerySet):
+    def with_totals(self, as_of=None):
+        """Annotate fee and payment totals so per-row helpers skip their aggregate queries
+
+        With as_of, payments are totalled through that date from the latest
+        monthly BalanceSnapshot plus the payments made after it, and the
+        instances evaluate their status and balances as of that date.
+        """
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        zero = Value(Decimal('0.00'), output_field=money)
+
+        def subtotal(model, field, **filters):
+            rows = (model.objects.filter(unit_assessment=OuterRef('pk'), **filters)
+                    .order_by().values('unit_assessment')
+                    .annotate(total=Sum(field)).values('total'))
+            return Coalesce(Subquery(rows), zero)
+
+        def rows_total(live, archived, field, **filters):
+            # Archived assessments read the archive tables; CASE only runs the matching subquery
+            return Case(
+                When(special_assessment__archived_at__isnull=False, then=subtotal(archived, field, **filters)),
+                default=subtotal(live, field, **filters),
+                output_field=money,
+            )
+
+        queryset = self.select_related('unit', 'special_assessment').annotate(
+            annotated_lce_fees=rows_total(AdditionalFee, ArchivedAdditionalFee, 'fee_amount'),
+            annotated_lce_monthly=rows_total(AdditionalFee, ArchivedAdditionalFee, 'monthly_payment'),
+        )
+        if as_of is None:
+            return queryset.annotate(
+                annotated_paid=rows_total(Payment, ArchivedPayment, 'amount'),
+                annotated_late_fees=subtotal(LateFee, 'amount', waived=False),
+            )
+
+        snapshots = (BalanceSnapshot.objects
+                     .filter(unit_assessment=OuterRef('pk'), period_end__lte=as_of)
+                     .order_by('-period_end'))
+        queryset = queryset.annotate(
+            snapshot_paid=Coalesce(Subquery(snapshots.values('total_paid')[:1]), zero),
+            snapshot_end=Coalesce(Subquery(snapshots.values('period_end')[:1]), Value(date.min, output_field=models.DateField())),
+        )
+        return queryset.annotate(
+            annotated_paid=ExpressionWrapper(
+                F('snapshot_paid') + rows_total(Payment, ArchivedPayment, 'amount',
+                                                payment_date__gt=OuterRef('snapshot_end'), payment_date__lte=as_of),
+                output_field=money,
+            ),
+            annotated_late_fees=subtotal(LateFee, 'amount', waived=False, period__lte=as_of),
+            annotated_as_of=Value(as_of, output_field=models.DateField()),
+        )
+
+
 class UnitAssessment(models.Model):
     """Links a unit to a special assessment with specific amounts"""
     PAYMENT_OPTION_LUMP = 'lump'
@@ -97,6 +187,9 @@ class UnitAssessment(models.Model):
         (PAYMENT_OPTION_MONTHLY, 'Monthly Payments'),
     ]
 
+    STATUSES = ['Paid in Full', 'Current', 'Behind', 'Not Started', 'Partial Payment', 'Not Paid']
+    STATUS_CHOICES = [(status, status) for status in STATUSES]
+
     unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='unit_assessments')
     special_assessment = models.ForeignKey(SpecialAssessment, on_delete=models.CASCADE, related_name='unit_assessments')
 
@@ -109,12 +202,21 @@ class UnitAssessment(models.Model):
     # Calculated fields
     monthly_base_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Monthly payment for base assessment with interest")
 
+    # Materialized payment status, kept current by signals and refresh_payment_statuses
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True, db_index=True)
+    days_delinquent = models.PositiveIntegerField(default=0, db_index=True)
+    amount_past_due = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    status_updated_on = models.DateField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UnitAssessmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ['unit', 'special_assessment']
         ordering = ['unit__unit_number']
+        indexes = [models.Index(fields=['special_assessment', 'status'])]
 
     def __str__(self):
         return f"{self.unit.unit_number} - {self.special_assessment.name}"
@@ -127,13 +229,25 @@ class UnitAssessment(models.Model):
             self.monthly_base_payment = Decimal('0.00')
         super().save(*args, **kwargs)
 
+    def fee_rows(self):
+        """Additional fees, from the archive once the special assessment is archived"""
+        return self.archived_fees if self.special_assessment.is_archived else self.additional_fees
+
+    def payment_rows(self):
+        """Payments, from the archive once the special assessment is archived"""
+        return self.archived_payments if self.special_assessment.is_archived else self.payments
+
     def total_lce_fees(self):
         """Get total of all Limited Common Element fees for this unit assessment"""
-        return self.additional_fees.aggregate(total=models.Sum('fee_amount'))['total'] or Decimal('0.00')
+        if hasattr(self, 'annotated_lce_fees'):
+            return self.annotated_lce_fees
+        return self.fee_rows().aggregate(total=models.Sum('fee_amount'))['total'] or Decimal('0.00')
 
     def total_lce_monthly_payment(self):
         """Get total monthly payment for all LCE fees"""
-        return self.additional_fees.aggregate(total=models.Sum('monthly_payment'))['total'] or Decimal('0.00')
+        if hasattr(self, 'annotated_lce_monthly'):
+            return self.annotated_lce_monthly
+        return self.fee_rows().aggregate(total=models.Sum('monthly_payment'))['total'] or Decimal('0.00')
 
     def total_assessment_amount(self):
         """Get total assessment (base + all LCE fees)"""
@@ -145,25 +259,50 @@ class UnitAssessment(models.Model):
             return Decimal('0.00')
         return self.monthly_base_payment + self.total_lce_monthly_payment()
 
-    def total_paid(self):
-        """Get total amount paid so far"""
-        return self.payments.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-
-    def remaining_balance(self):
+    def _as_of(self, as_of):
+        """Resolve the date calculations run at: explicit, then as loaded by with_totals(as_of)"""
+        return as_of or getattr(self, 'annotated_as_of', None)
+
+    def total_paid(self, as_of=None):
+        """Get total amount paid so far, or through as_of"""
+        as_of = self._as_of(as_of)
+        if hasattr(self, 'annotated_paid') and as_of == getattr(self, 'annotated_as_of', None):
+            return self.annotated_paid
+        if as_of is None:
+            return self.payment_rows().aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+
+        # Latest monthly snapshot on or before as_of, plus the payments since
+        snapshot = self.balance_snapshots.filter(period_end__lte=as_of).order_by('-period_end').first()
+        payments = self.payment_rows().filter(payment_date__lte=as_of)
+        paid = Decimal('0.00')
+        if snapshot:
+            paid = snapshot.total_paid
+            payments = payments.filter(payment_date__gt=snapshot.period_end)
+        return paid + (payments.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00'))
+
+    def total_late_fees(self, as_of=None):
+        """Unwaived late fees charged so far, or through as_of; billed apart from the assessment balance"""
+        as_of = self._as_of(as_of)
+        if hasattr(self, 'annotated_late_fees') and as_of == getattr(self, 'annotated_as_of', None):
+            return self.annotated_late_fees
+        fees = self.late_fees.filter(waived=False)
+        if as_of is not None:
+            fees = fees.filter(period__lte=as_of)
+        return fees.aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
+
+    def remaining_balance(self, as_of=None):
         """Calculate remaining balance"""
         if self.payment_option == self.PAYMENT_OPTION_LUMP:
-            return self.total_assessment_amount() - self.total_paid()
-        return self.calculate_payoff_amount()
-
-    def calculate_payoff_amount(self):
-        """Calculate the payoff amount at current date"""
-        from datetime import date
+            return self.total_assessment_amount() - self.total_paid(as_of)
+        return self.calculate_payoff_amount(as_of)
 
+    def calculate_payoff_amount(self, as_of=None):
+        """Calculate the payoff amount at current date, or as of a past date"""
         if self.payment_option == self.PAYMENT_OPTION_LUMP:
-            return self.total_assessment_amount() - self.total_paid()
+            return self.total_assessment_amount() - self.total_paid(as_of)
 
         # Calculate number of payments made
-        total_paid = self.total_paid()
+        total_paid = self.total_paid(as_of)
         monthly_payment = self.total_monthly_payment()
 
         if monthly_payment == 0:
@@ -190,31 +329,60 @@ class UnitAssessment(models.Model):
         remaining_principal = pmt * ((1 - math.pow(1 + r, -n)) / r)
         return Decimal(remaining_principal).quantize(Decimal('0.01'))
 
-    def payment_status(self):
-        """Get payment status"""
+    def period_summary(self, start, end=None):
+        """Opening balance, payments and closing balance for a statement period, all from SQL aggregates"""
+        end = end or date.today()
+        opening = start - timedelta(days=1)
+        period_paid = self.payment_rows().filter(payment_date__gte=start, payment_date__lte=end).aggregate(
+            total=models.Sum('amount'))['total'] or Decimal('0.00')
+        return {
+            'start': start,
+            'end': end,
+            'opening_paid': self.total_paid(opening),
+            'opening_balance': self.remaining_balance(opening),
+            'period_paid': period_paid,
+            'closing_paid': self.total_paid(end),
+            'closing_balance': self.remaining_balance(end),
+        }
+
+    def expected_payment_count(self, as_of=None):
+        """Number of monthly installments due on or before as_of (default today)"""
+        return self.special_assessment.installments_due(self._as_of(as_of) or date.today())
+
+    def delinquency(self, as_of=None):
+        """(status, days delinquent, amount past due) as of a date, default today"""
+        as_of = self._as_of(as_of) or date.today()
+        paid = self.total_paid(as_of)
+        status = self.payment_status(as_of)
+        start = self.special_assessment.start_date
+
         if self.payment_option == self.PAYMENT_OPTION_LUMP:
-            if self.total_paid() >= self.total_assessment_amount():
+            past_due = self.total_assessment_amount() - paid if as_of >= start else Decimal('0.00')
+            oldest_unpaid = start
+        else:
+            monthly = self.total_monthly_payment()
+            past_due = monthly * self.expected_payment_count(as_of) - paid
+            # Installments are settled oldest first, so the first unpaid one is the oldest late one
+            covered = int(paid / monthly) if monthly else 0
+            due_dates = self.special_assessment.installment_dates()
+            oldest_unpaid = due_dates[min(covered, len(due_dates) - 1)]
+
+        if past_due <= 0:
+            return status, 0, Decimal('0.00')
+        return status, max((as_of - oldest_unpaid).days, 0), Decimal(past_due).quantize(Decimal('0.01'))
+
+    def payment_status(self, as_of=None):
+        """Get payment status, as of today or a past date"""
+        paid_amount = self.total_paid(as_of)
+        if self.payment_option == self.PAYMENT_OPTION_LUMP:
+            if paid_amount >= self.total_assessment_amount():
                 return "Paid in Full"
-            elif self.total_paid() > 0:
+            elif paid_amount > 0:
                 return "Partial Payment"
             else:
                 return "Not Paid"
         else:
-            from datetime import date
-            from dateutil.relativedelta import relativedelta
-
-            expected_payments = 0
-            current_date = date.today()
-            payment_date = self.special_assessment.start_date
-
-            while payment_date <= current_date:
-                expected_payments += 1
-                payment_date = payment_date + relativedelta(months=1)
-                if expected_payments >= self.special_assessment.loan_period_months:
-                    break
-
-            expected_amount = self.total_monthly_payment() * expected_payments
-            paid_amount = self.total_paid()
+            expected_amount = self.total_monthly_payment() * self.expected_payment_count(as_of)
 
             if paid_amount >= self.total_assessment_amount():
                 return "Paid in Full"
@@ -226,6 +394,20 @@ class UnitAssessment(models.Model):
                 return "Not Started"
 
 
+def reject_archived(row):
+    """Refuse to write a payment or fee of an archived assessment, whose totals read only the archive tables"""
+    if row.unit_assessment_id is None:
+        return
+    if row._meta.get_field('unit_assessment').is_cached(row):
+        archived = row.unit_assessment.special_assessment.is_archived
+    else:
+        archived = SpecialAssessment.objects.filter(unit_assessments=row.unit_assessment_id, archived_at__isnull=False).exists()
+    if archived:
+        raise ValidationError(
+            "This special assessment is archived; restore it (archive_assessments --restore) before changing its payments or fees"
+        )
+
+
 class AdditionalFee(models.Model):
     """Represents additional fees like Deck, Skylight, etc. (Limited Common Element assessments)"""
     unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='additional_fees')
@@ -240,8 +422,14 @@ class AdditionalFee(models.Model):
     def __str__(self):
         return f"{self.unit_assessment.unit.unit_number} - {self.fee_type}: ${self.fee_amount}"
 
+    def clean(self):
+        reject_archived(self)
+
     def save(self, *args, **kwargs):
         """Calculate monthly payment on save"""
+        # Callers that already hold the parent (admin inlines, bulk jobs) assign
+        # it to unit_assessment so no extra queries are made here.
+        reject_archived(self)
         if self.unit_assessment.payment_option == UnitAssessment.PAYMENT_OPTION_MONTHLY:
             self.monthly_payment = self.unit_assessment.special_assessment.calculate_monthly_payment(self.fee_amount)
         else:
@@ -266,3 +454,197 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"{self.unit_assessment.unit.unit_number} - ${self.amount} on {self.payment_date}"
+
+    def clean(self):
+        reject_archived(self)
+
+    def save(self, *args, **kwargs):
+        reject_archived(self)
+        super().save(*args, **kwargs)
+
+
+class ArchivedAdditionalFee(models.Model):
+    """An AdditionalFee of an archived special assessment, kept read-only with its original id"""
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='archived_fees')
+    fee_type = models.CharField(max_length=100)
+    fee_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    monthly_payment = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    description = models.TextField(blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.unit_assessment.unit.unit_number} - {self.fee_type}: ${self.fee_amount}"
+
+
+class ArchivedPayment(models.Model):
+    """A Payment of an archived special assessment, kept read-only with its original id"""
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='archived_payments')
+    payment_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=50, blank=True)
+    reference_number = models.CharField(max_length=100, blank=True)
+    notes = models.TextField(blank=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-payment_date']
+
+    def __str__(self):
+        return f"{self.unit_assessment.unit.unit_number} - ${self.amount} on {self.payment_date}"
+
+
+class StatementMailing(models.Model):
+    """A batch of owner statements emailed for one special assessment"""
+    special_assessment = models.ForeignKey(SpecialAssessment, on_delete=models.CASCADE, related_name='statement_mailings')
+    subject = models.CharField(max_length=200)
+    message = models.TextField(blank=True, help_text="Email body sent with each statement")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.special_assessment} - {self.subject}"
+
+
+class StatementDelivery(models.Model):
+    """Per-recipient status of a statement mailing"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+    STATUSES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SKIPPED, 'Skipped (no email)'),
+    ]
+
+    mailing = models.ForeignKey(StatementMailing, on_delete=models.CASCADE, related_name='deliveries')
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='statement_deliveries')
+    email = models.EmailField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['mailing', 'unit_assessment']
+        ordering = ['id']
+        verbose_name_plural = 'statement deliveries'
+
+    def __str__(self):
+        return f"{self.unit_assessment.unit.unit_number} - {self.email or 'no email'}: {self.get_status_display()}"
+
+
+class SearchEntry(models.Model):
+    """Indexed search term for a unit or payment, used where SQLite FTS5 is unavailable"""
+    KIND_UNIT = 'unit'
+    KIND_PAYMENT = 'payment'
+    KINDS = [
+        (KIND_UNIT, 'Unit'),
+        (KIND_PAYMENT, 'Payment'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    term = models.CharField(max_length=100, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['kind', 'object_id'])]
+        verbose_name_plural = 'search entries'
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.term}"
+
+
+class BalanceSnapshot(models.Model):
+    """Cumulative amount paid by a unit assessment through the end of a month"""
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='balance_snapshots')
+    period_end = models.DateField(help_text="Last day of the month this snapshot covers")
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['unit_assessment', 'period_end']
+        ordering = ['unit_assessment', 'period_end']
+
+    def __str__(self):
+        return f"{self.unit_assessment} through {self.period_end}: ${self.total_paid}"
+
+
+class LateFeeRule(models.Model):
+    """How late fees are charged on a special assessment's delinquent units"""
+    special_assessment = models.OneToOneField(SpecialAssessment, on_delete=models.CASCADE, related_name='late_fee_rule')
+    grace_days = models.PositiveIntegerField(default=15, help_text="Days after an installment's due date before it is late")
+    flat_fee = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('25.00'), help_text="Fixed fee charged per late month")
+    percent_of_past_due = models.DecimalField(max_digits=5, decimal_places=2, default=0, validators=[MinValueValidator(0), MaxValueValidator(100)], help_text="Additional percentage of the amount past due")
+    maximum_fee = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Cap on a single month's fee")
+    minimum_past_due = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('1.00'), help_text="Amounts past due below this are not charged")
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Late fees for {self.special_assessment}"
+
+    def fee_for(self, amount_past_due):
+        """Fee charged for one late month with this much past due"""
+        fee = self.flat_fee + (amount_past_due * self.percent_of_past_due / 100)
+        if self.maximum_fee is not None:
+            fee = min(fee, self.maximum_fee)
+        return fee.quantize(Decimal('0.01'))
+
+
+class LateFee(models.Model):
+    """A late fee charged to a unit for one missed due date"""
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='late_fees')
+    period = models.DateField(help_text="Due date of the installment that was late")
+    amount_past_due = models.DecimalField(max_digits=12, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    waived = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['unit_assessment', 'period']
+        ordering = ['-period']
+
+    def __str__(self):
+        return f"{self.unit_assessment} - ${self.amount} late fee for {self.period}"
+
+
+class AssessmentEvent(models.Model):
+    """A payment or status change published to live dashboards"""
+    KIND_PAYMENT_POSTED = 'payment_posted'
+    KIND_STATUS_CHANGED = 'status_changed'
+    KINDS = [
+        (KIND_PAYMENT_POSTED, 'Payment posted'),
+        (KIND_STATUS_CHANGED, 'Status changed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    association = models.ForeignKey(Association, on_delete=models.CASCADE, related_name='events')
+    special_assessment = models.ForeignKey(SpecialAssessment, on_delete=models.CASCADE, related_name='events')
+    unit_assessment = models.ForeignKey(UnitAssessment, on_delete=models.CASCADE, related_name='events')
+    payload = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['special_assessment', 'id']),
+            models.Index(fields=['association', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.unit_assessment_id}"
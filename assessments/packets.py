@@ -0,0 +1,121 @@
+"""
+Annual meeting packets: every assessment summary in one PDF with a table of contents.
+
+Each section is rendered by generate_assessment_summary_pdf in a separate worker
+process, so build time scales with cores rather than with the number of
+assessments. The finished sections are merged with pypdf behind a contents page.
+"""
+import multiprocessing
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+
+from django.db import connections
+
+
+PacketSection = namedtuple('PacketSection', ['assessment_id', 'title', 'association', 'path', 'pages'])
+
+
+def _init_worker():
+    """Make sure Django is ready and no parent DB connection is reused in the worker"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hoa_management.settings')
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _render_section(assessment_id, directory):
+    """Render one assessment summary to a file in directory (runs in a worker)"""
+    from pypdf import PdfReader
+
+    from .models import SpecialAssessment
+    from .renderers import get_renderer
+    from .streaming import write_report
+
+    special_assessment = SpecialAssessment.objects.select_related('association').get(pk=assessment_id)
+    path = write_report(get_renderer('assessment_summary', 'pdf'), os.path.join(directory, f'{assessment_id}.pdf'), special_assessment)
+    return PacketSection(
+        assessment_id=assessment_id,
+        title=special_assessment.name,
+        association=special_assessment.association.name,
+        path=path,
+        pages=len(PdfReader(path).pages),
+    )
+
+
+def _contents_pdf(title, sections, first_section_page):
+    """Render the cover and table of contents pages"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+    styles = getSampleStyleSheet()
+
+    elements = [
+        Paragraph(title, styles['Title']),
+        Paragraph(f"Prepared {date.today().strftime('%B %d, %Y')}", styles['Normal']),
+        Spacer(1, 0.3*inch),
+        Paragraph("Contents", styles['Heading2']),
+    ]
+
+    data = [['Association', 'Assessment', 'Page']]
+    page = first_section_page
+    for section in sections:
+        data.append([section.association, section.title, str(page)])
+        page += section.pages
+
+    contents_table = Table(data, colWidths=[3*inch, 3*inch, 0.75*inch], repeatRows=1)
+    contents_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(contents_table)
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def build_packet(special_assessments, output, title='Annual Meeting Packet', workers=None):
+    """Render every assessment summary in parallel and merge them into output"""
+    from pypdf import PdfReader, PdfWriter
+
+    assessment_ids = [sa.pk for sa in special_assessments]
+    workers = workers or os.cpu_count() or 1
+
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if workers == 1 or len(assessment_ids) <= 1:
+            sections = [_render_section(pk, directory) for pk in assessment_ids]
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+            with ProcessPoolExecutor(max_workers=min(workers, len(assessment_ids)), mp_context=context,
+                                     initializer=_init_worker) as pool:
+                sections = list(pool.map(_render_section, assessment_ids, [directory] * len(assessment_ids)))
+
+        # The contents length decides where sections start, so render it twice
+        contents = _contents_pdf(title, sections, first_section_page=1)
+        contents_pages = len(PdfReader(contents).pages)
+        contents = _contents_pdf(title, sections, first_section_page=contents_pages + 1)
+
+        writer = PdfWriter()
+        writer.append(contents, outline_item='Contents')
+        for section in sections:
+            writer.append(section.path, outline_item=f'{section.association} - {section.title}')
+        writer.write(output)
+
+    return sections
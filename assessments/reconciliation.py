@@ -0,0 +1,230 @@
+"""
+Candidate matching for deposits that arrived without a usable reference.
+
+ReconciliationIndex loads every unit assessment once and builds lookup tables:
+normalized owner-name tokens and their prefixes, unit-number variants within
+one edit, and expected payment amounts bucketed by the tolerance. Each deposit
+then only scores the units that share at least one key with it, instead of
+being compared against every unit. Rows whose date or amount cannot be read
+are kept with an error instead of stopping the file.
+"""
+import csv
+import re
+from collections import defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.utils.dateparse import parse_date
+
+from .models import UnitAssessment
+
+
+NAME_STOPWORDS = {'and', 'the', 'of', 'mr', 'mrs', 'ms', 'dr', 'jr', 'sr', 'llc', 'inc', 'trust', 'trustee', 'family', 'estate', 'revocable', 'living'}
+
+NAME_PREFIX_MIN = 3
+
+# Name and unit keys shared by more units than this carry no signal and are skipped
+KEY_MAX_POSTINGS = 500
+
+# Multiples of the monthly installment a single deposit commonly covers
+INSTALLMENT_MULTIPLES = (1, 2, 3, 6, 12)
+
+SCORE_UNIT_EXACT = 40
+SCORE_UNIT_NEAR = 20
+SCORE_NAME = 35
+SCORE_NAME_PREFIX = 15
+SCORE_AMOUNT_EXACT = 25
+SCORE_AMOUNT_NEAR = 15
+SCORE_AMOUNT_MULTIPLE = 10
+
+Deposit = namedtuple('Deposit', ['line', 'date', 'amount', 'name', 'unit', 'reference', 'memo', 'error'], defaults=[''])
+Candidate = namedtuple('Candidate', ['unit_assessment_id', 'unit_number', 'owner_name', 'special_assessment', 'score', 'reasons'])
+UnitEntry = namedtuple('UnitEntry', ['unit_number', 'owner_name', 'special_assessment', 'name_tokens'])
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def name_tokens(name):
+    """Lower-case owner name words without titles, entity words or initials"""
+    return {token for token in TOKEN_RE.findall((name or '').lower()) if len(token) > 1 and token not in NAME_STOPWORDS}
+
+
+def normalize_unit(unit_number):
+    """Upper-case letters and digits only, leading zeros dropped from numbers ('Unit #0101-A' -> 'UNIT101A')"""
+    text = re.sub(r'[^A-Z0-9]', '', (unit_number or '').upper())
+    return re.sub(r'(?<![0-9])0+(?=[0-9])', '', text)
+
+
+def unit_variants(unit_number):
+    """The normalized unit and every one-character deletion of it, so one-edit typos share a key"""
+    normalized = normalize_unit(unit_number)
+    if not normalized:
+        return set()
+    variants = {normalized}
+    if len(normalized) > 1:
+        variants.update(normalized[:i] + normalized[i + 1:] for i in range(len(normalized)))
+    digits = re.sub(r'[^0-9]', '', normalized)
+    if digits and digits != normalized:
+        variants.add(digits)
+    return variants
+
+
+def to_cents(amount):
+    """Whole cents of an amount; ValueError for text that is not a finite number"""
+    try:
+        amount = Decimal(amount)
+    except InvalidOperation:
+        raise ValueError(f'{amount!r} is not an amount')
+    if not amount.is_finite():
+        raise ValueError(f'{amount} is not a finite amount')
+    return int((amount * 100).to_integral_value())
+
+
+class ReconciliationIndex:
+    """Lookup tables over unit assessments for scoring deposit matches"""
+
+    def __init__(self, unit_assessments=None, tolerance=Decimal('1.00')):
+        self.tolerance_cents = max(to_cents(tolerance), 1)
+        self.units = {}
+        self.by_unit = defaultdict(set)
+        self.by_unit_exact = defaultdict(set)
+        self.by_name = defaultdict(set)
+        self.by_name_prefix = defaultdict(set)
+        self.by_amount = defaultdict(list)
+        self.amounts = defaultdict(list)
+
+        if unit_assessments is None:
+            unit_assessments = UnitAssessment.objects.all()
+        rows = unit_assessments.with_totals().order_by().values_list(
+            'pk', 'unit__unit_number', 'unit__owner_name', 'special_assessment__name', 'payment_option',
+            'monthly_base_payment', 'annotated_lce_monthly', 'base_assessment_amount', 'annotated_lce_fees',
+        )
+        for pk, unit_number, owner_name, assessment, option, monthly_base, lce_monthly, base, lce_fees in rows.iterator(chunk_size=5000):
+            tokens = name_tokens(owner_name)
+            self.units[pk] = UnitEntry(unit_number, owner_name, assessment, tokens)
+
+            self.by_unit_exact[normalize_unit(unit_number)].add(pk)
+            for variant in unit_variants(unit_number):
+                self.by_unit[variant].add(pk)
+            for token in tokens:
+                self.by_name[token].add(pk)
+                for length in range(NAME_PREFIX_MIN, len(token)):
+                    self.by_name_prefix[token[:length]].add(pk)
+
+            if option == UnitAssessment.PAYMENT_OPTION_LUMP:
+                self._add_amount(pk, to_cents(base + lce_fees), 1)
+            else:
+                installment = to_cents(monthly_base + lce_monthly)
+                for multiple in INSTALLMENT_MULTIPLES:
+                    self._add_amount(pk, installment * multiple, multiple)
+
+    def _add_amount(self, pk, cents, multiple):
+        if cents > 0:
+            self.by_amount[cents // self.tolerance_cents].append((cents, pk, multiple))
+            self.amounts[pk].append((cents, multiple))
+
+    def _amount_score(self, cents, expected, multiple):
+        difference = abs(expected - cents)
+        if difference > self.tolerance_cents:
+            return None
+        if multiple > 1:
+            return SCORE_AMOUNT_MULTIPLE, f'amount = {multiple} installments'
+        if difference == 0:
+            return SCORE_AMOUNT_EXACT, 'amount exact'
+        return SCORE_AMOUNT_NEAR, 'amount within tolerance'
+
+    def _amount_scores(self, amount, found, amount_only_limit):
+        """{unit assessment id: (score, reason)} for expected amounts within the tolerance
+
+        An amount alone matches every unit on the same installment, so once
+        more than amount_only_limit units share it only the units already
+        found by unit or name are scored.
+        """
+        cents = to_cents(amount)
+        bucket = cents // self.tolerance_cents
+        entries = [entry for key in (bucket - 1, bucket, bucket + 1) for entry in self.by_amount.get(key, ())]
+        if len(entries) > amount_only_limit:
+            entries = [(expected, pk, multiple) for pk in found for expected, multiple in self.amounts.get(pk, ())]
+
+        scores = {}
+        for expected, pk, multiple in entries:
+            scored = self._amount_score(cents, expected, multiple)
+            if scored and scored[0] > scores.get(pk, (0, ''))[0]:
+                scores[pk] = scored
+        return scores
+
+    def candidates(self, deposit, limit=3, amount_only_limit=25):
+        """Best scoring unit assessments for a deposit, highest score first"""
+        scores = defaultdict(int)
+        reasons = defaultdict(list)
+
+        def add(pk, score, reason):
+            scores[pk] += score
+            reasons[pk].append(reason)
+
+        if deposit.unit:
+            exact = self.by_unit_exact.get(normalize_unit(deposit.unit), set())
+            for pk in exact:
+                add(pk, SCORE_UNIT_EXACT, 'unit exact')
+            near = set()
+            for variant in unit_variants(deposit.unit):
+                postings = self.by_unit.get(variant, set())
+                if len(postings) <= KEY_MAX_POSTINGS:
+                    near |= postings
+            for pk in near - exact:
+                add(pk, SCORE_UNIT_NEAR, 'unit within one edit')
+
+        tokens = name_tokens(deposit.name)
+        if tokens:
+            name_hits = defaultdict(float)
+            for token in tokens:
+                exact = self.by_name.get(token, ())
+                if len(exact) <= KEY_MAX_POSTINGS:
+                    for pk in exact:
+                        name_hits[pk] += SCORE_NAME / len(tokens)
+                prefixed = self.by_name_prefix.get(token, ()) if len(token) >= NAME_PREFIX_MIN else ()
+                if len(prefixed) <= KEY_MAX_POSTINGS:
+                    for pk in prefixed:
+                        name_hits[pk] += SCORE_NAME_PREFIX / len(tokens)
+            for pk, score in name_hits.items():
+                add(pk, round(score), 'owner name')
+
+        if deposit.amount is not None:
+            for pk, (score, reason) in self._amount_scores(deposit.amount, list(scores), amount_only_limit).items():
+                add(pk, score, reason)
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            Candidate(pk, self.units[pk].unit_number, self.units[pk].owner_name, self.units[pk].special_assessment,
+                      score, reasons[pk])
+            for pk, score in best
+        ]
+
+
+def read_deposits(file):
+    """Parse a deposit exception CSV with date, amount, name, unit, reference and memo columns
+
+    A row whose date or amount cannot be read (2024-02-30, 'abc', inf, NaN)
+    comes back without them and with error set, so it is reported rather than
+    matched.
+    """
+    deposits = []
+    for line, row in enumerate(csv.DictReader(file), start=2):
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        deposit = Deposit(
+            line=line, date=None, amount=None, name=row.get('name', ''), unit=row.get('unit', ''),
+            reference=row.get('reference', ''), memo=row.get('memo', ''),
+        )
+        try:
+            if row.get('amount'):
+                amount = row['amount'].replace('$', '').replace(',', '')
+                to_cents(amount)
+                deposit = deposit._replace(amount=Decimal(amount))
+            if row.get('date'):
+                day = parse_date(row['date'])
+                if day is None:
+                    raise ValueError(f"{row['date']!r} is not a YYYY-MM-DD date")
+                deposit = deposit._replace(date=day)
+        except (ValueError, ArithmeticError) as exc:
+            deposit = deposit._replace(date=None, amount=None, error=f'unparseable: {exc}')
+        deposits.append(deposit)
+    return deposits
@@ -0,0 +1,59 @@
+"""
+Registry of report renderers, imported on first use.
+
+Renderers are registered by report name and format as dotted paths, so the
+rendering backends (reportlab for PDF, openpyxl for XLSX) are only imported
+by the first request or command that actually renders that format, not by
+every web worker and manage.py command at startup.
+
+Every renderer takes the object to render first, writes the document to the
+binary file object passed as output (or a new BytesIO) and returns it.
+"""
+from collections import namedtuple
+
+from django.utils.module_loading import import_string
+
+
+Renderer = namedtuple('Renderer', ['path', 'content_type', 'extension'])
+
+PDF = 'application/pdf'
+XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV = 'text/csv'
+
+RENDERERS = {
+    ('assessment_summary', 'pdf'): Renderer('assessments.reports.generate_assessment_summary_pdf', PDF, 'pdf'),
+    ('assessment_summary', 'xlsx'): Renderer('assessments.spreadsheets.generate_assessment_summary_xlsx', XLSX, 'xlsx'),
+    ('assessment_summary', 'csv'): Renderer('assessments.tables.generate_assessment_summary_csv', CSV, 'csv'),
+    ('unit_statement', 'pdf'): Renderer('assessments.reports.generate_unit_statement_pdf', PDF, 'pdf'),
+    ('consolidated_statement', 'pdf'): Renderer('assessments.reports.generate_consolidated_statement_pdf', PDF, 'pdf'),
+    ('year_end_summary', 'pdf'): Renderer('assessments.reports.generate_year_end_pdf', PDF, 'pdf'),
+    ('year_end_summary', 'csv'): Renderer('assessments.tables.generate_year_end_csv', CSV, 'csv'),
+}
+
+_loaded = {}
+
+
+def register_renderer(report, format, path, content_type, extension=None):
+    """Add or replace the renderer of a report in a format"""
+    RENDERERS[report, format] = Renderer(path, content_type, extension or format)
+    _loaded.pop((report, format), None)
+
+
+def renderer_formats(report):
+    return [format for name, format in RENDERERS if name == report]
+
+
+def get_renderer(report, format):
+    """The render function of a report in a format, importing its backend on first use"""
+    try:
+        renderer = RENDERERS[report, format]
+    except KeyError:
+        raise ValueError(f'No {format} renderer for {report}') from None
+    if (report, format) not in _loaded:
+        _loaded[report, format] = import_string(renderer.path)
+    return _loaded[report, format]
+
+
+def render(report, format, *args, **kwargs):
+    """Render a report; returns the output file object"""
+    return get_renderer(report, format)(*args, **kwargs)
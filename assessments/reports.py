@@ -6,11 +6,86 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 from io import BytesIO
 from datetime import date
-
-
-def generate_assessment_summary_pdf(special_assessment):
-    """Generate a PDF summary report for a special assessment"""
-    buffer = BytesIO()
+from decimal import Decimal
+
+
+# Rows per unit table chunk; one chunk comfortably fits a landscape letter page.
+SUMMARY_CHUNK_ROWS = 30
+
+SUMMARY_HEADERS = ['Unit', 'Base\nAssessment', 'LCE\nFees', 'Total\nAssessment',
+                   'Monthly\nBase', 'Monthly\nLCE', 'Total\nMonthly', 'Total\nPaid', 'Balance', 'Status']
+
+SUMMARY_COL_WIDTHS = [0.6*inch, 0.95*inch, 0.75*inch, 0.95*inch, 0.80*inch, 0.80*inch, 0.85*inch, 0.85*inch, 0.85*inch, 0.9*inch]
+
+# Styles are built once and shared by every chunk instead of one command per row
+SUMMARY_CHUNK_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 8),
+    ('FONTSIZE', (0, 1), (-1, -1), 7),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 1), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+])
+
+SUMMARY_TOTALS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#366092')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+
+def assessment_summary_rows(special_assessment, as_of=None):
+    """Build the formatted unit rows and totals row in a single pass over the units"""
+    rows = []
+    sums = [Decimal('0.00')] * 8
+
+    for ua in special_assessment.unit_assessments.with_totals(as_of).order_by('unit__unit_number'):
+        amounts = [
+            ua.base_assessment_amount,
+            ua.total_lce_fees(),
+            ua.total_assessment_amount(),
+            ua.monthly_base_payment,
+            ua.total_lce_monthly_payment(),
+            ua.total_monthly_payment(),
+            ua.total_paid(),
+            ua.remaining_balance(),
+        ]
+        sums = [total + amount for total, amount in zip(sums, amounts)]
+        rows.append([ua.unit.unit_number] + [f'${amount:,.2f}' for amount in amounts] + [ua.payment_status()])
+
+    totals = ['TOTALS'] + [f'${total:,.2f}' for total in sums] + ['']
+    return rows, totals
+
+
+def summary_table_chunks(rows, totals, chunk_rows=SUMMARY_CHUNK_ROWS):
+    """Split the unit rows into fixed-size tables so layout cost stays linear"""
+    tables = []
+    for start in range(0, len(rows), chunk_rows):
+        chunk = Table([SUMMARY_HEADERS] + rows[start:start + chunk_rows], colWidths=SUMMARY_COL_WIDTHS, repeatRows=1)
+        chunk.setStyle(SUMMARY_CHUNK_STYLE)
+        tables.append(chunk)
+
+    totals_table = Table([totals], colWidths=SUMMARY_COL_WIDTHS)
+    totals_table.setStyle(SUMMARY_TOTALS_STYLE)
+    tables.append(totals_table)
+    return tables
+
+
+def generate_assessment_summary_pdf(special_assessment, output=None, as_of=None):
+    """Generate a PDF summary report for a special assessment, into output if given, as of a date if given"""
+    buffer = output if output is not None else BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), topMargin=0.5*inch, bottomMargin=0.5*inch)
 
     elements = []
@@ -37,6 +112,8 @@ def generate_assessment_summary_pdf(special_assessment):
     # Title
     elements.append(Paragraph(f"{special_assessment.association.name}", title_style))
     elements.append(Paragraph(f"{special_assessment.name}", heading_style))
+    if as_of:
+        elements.append(Paragraph(f"Balances as of {as_of.strftime('%B %d, %Y')}", styles['Normal']))
     elements.append(Spacer(1, 0.2*inch))
 
     # Loan Information Table
@@ -68,81 +145,8 @@ def generate_assessment_summary_pdf(special_assessment):
     elements.append(Paragraph("Unit Assessment Details", heading_style))
     elements.append(Spacer(1, 0.1*inch))
 
-    # Headers
-    data = [['Unit', 'Base\nAssessment', 'LCE\nFees', 'Total\nAssessment',
-             'Monthly\nBase', 'Monthly\nLCE', 'Total\nMonthly', 'Total\nPaid', 'Balance', 'Status']]
-
-    # Add unit data
-    for ua in special_assessment.unit_assessments.all():
-        data.append([
-            ua.unit.unit_number,
-            f'${ua.base_assessment_amount:,.2f}',
-            f'${ua.total_lce_fees():,.2f}',
-            f'${ua.total_assessment_amount():,.2f}',
-            f'${ua.monthly_base_payment:,.2f}',
-            f'${ua.total_lce_monthly_payment():,.2f}',
-            f'${ua.total_monthly_payment():,.2f}',
-            f'${ua.total_paid():,.2f}',
-            f'${ua.remaining_balance():,.2f}',
-            ua.payment_status()
-        ])
-
-    # Add totals row
-    total_base = sum(ua.base_assessment_amount for ua in special_assessment.unit_assessments.all())
-    total_lce = sum(ua.total_lce_fees() for ua in special_assessment.unit_assessments.all())
-    total_assessment = sum(ua.total_assessment_amount() for ua in special_assessment.unit_assessments.all())
-    total_monthly_base = sum(ua.monthly_base_payment for ua in special_assessment.unit_assessments.all())
-    total_monthly_lce = sum(ua.total_lce_monthly_payment() for ua in special_assessment.unit_assessments.all())
-    total_monthly = sum(ua.total_monthly_payment() for ua in special_assessment.unit_assessments.all())
-    total_paid = sum(ua.total_paid() for ua in special_assessment.unit_assessments.all())
-    total_balance = sum(ua.remaining_balance() for ua in special_assessment.unit_assessments.all())
-
-    data.append([
-        'TOTALS',
-        f'${total_base:,.2f}',
-        f'${total_lce:,.2f}',
-        f'${total_assessment:,.2f}',
-        f'${total_monthly_base:,.2f}',
-        f'${total_monthly_lce:,.2f}',
-        f'${total_monthly:,.2f}',
-        f'${total_paid:,.2f}',
-        f'${total_balance:,.2f}',
-        ''
-    ])
-
-    # Create table
-    col_widths = [0.6*inch, 0.95*inch, 0.75*inch, 0.95*inch, 0.80*inch, 0.80*inch, 0.85*inch, 0.85*inch, 0.85*inch, 0.9*inch]
-    unit_table = Table(data, colWidths=col_widths, repeatRows=1)
-
-    # Style the table
-    table_style = [
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 1), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]
-
-    # Alternate row colors
-    for i in range(1, len(data) - 1):
-        if i % 2 == 0:
-            table_style.append(('BACKGROUND', (0, i), (-1, i), colors.lightgrey))
-
-    # Totals row styling
-    table_style.extend([
-        ('BACKGROUND', (0, len(data)-1), (-1, len(data)-1), colors.HexColor('#366092')),
-        ('TEXTCOLOR', (0, len(data)-1), (-1, len(data)-1), colors.whitesmoke),
-        ('FONTNAME', (0, len(data)-1), (-1, len(data)-1), 'Helvetica-Bold'),
-    ])
-
-    unit_table.setStyle(TableStyle(table_style))
-    elements.append(unit_table)
+    rows, totals = assessment_summary_rows(special_assessment, as_of)
+    elements.extend(summary_table_chunks(rows, totals))
 
     # Footer
     elements.append(Spacer(1, 0.2*inch))
@@ -161,9 +165,14 @@ def generate_assessment_summary_pdf(special_assessment):
     return buffer
 
 
-def generate_unit_statement_pdf(unit_assessment):
-    """Generate a PDF statement for a specific unit"""
-    buffer = BytesIO()
+def generate_unit_statement_pdf(unit_assessment, output=None, as_of=None, start=None):
+    """Generate a PDF statement for a specific unit, into output if given
+
+    as_of ends the statement at that date; with start as well it becomes a
+    period statement with opening and closing balances and only that
+    period's payments.
+    """
+    buffer = output if output is not None else BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
 
     elements = []
@@ -182,6 +191,10 @@ def generate_unit_statement_pdf(unit_assessment):
     # Header
     elements.append(Paragraph(f"{unit_assessment.special_assessment.association.name}", title_style))
     elements.append(Paragraph(f"Unit {unit_assessment.unit.unit_number} - Assessment Statement", styles['Heading2']))
+    if start:
+        elements.append(Paragraph(f"Statement period {start.strftime('%B %d, %Y')} to {(as_of or date.today()).strftime('%B %d, %Y')}", styles['Normal']))
+    elif as_of:
+        elements.append(Paragraph(f"As of {as_of.strftime('%B %d, %Y')}", styles['Normal']))
     elements.append(Spacer(1, 0.3*inch))
 
     # Assessment Details
@@ -218,7 +231,7 @@ def generate_unit_statement_pdf(unit_assessment):
     ]
 
     # Add LCE fees
-    for fee in unit_assessment.additional_fees.all():
+    for fee in unit_assessment.fee_rows().all():
         breakdown_data.append([
             f'LCE: {fee.fee_type}',
             f'${fee.fee_amount:,.2f}',
@@ -251,10 +264,13 @@ def generate_unit_statement_pdf(unit_assessment):
     elements.append(Paragraph("Payment Summary", styles['Heading3']))
     summary_data = [
         ['Total Assessment:', f'${unit_assessment.total_assessment_amount():,.2f}'],
-        ['Total Paid:', f'${unit_assessment.total_paid():,.2f}'],
-        ['Remaining Balance:', f'${unit_assessment.remaining_balance():,.2f}'],
-        ['Payment Status:', unit_assessment.payment_status()],
+        ['Total Paid:', f'${unit_assessment.total_paid(as_of):,.2f}'],
+        ['Remaining Balance:', f'${unit_assessment.remaining_balance(as_of):,.2f}'],
+        ['Payment Status:', unit_assessment.payment_status(as_of)],
     ]
+    late_fees = unit_assessment.total_late_fees(as_of)
+    if late_fees:
+        summary_data.insert(3, ['Late Fees (billed separately):', f'${late_fees:,.2f}'])
 
     summary_table = Table(summary_data, colWidths=[2.5*inch, 2*inch])
     summary_table.setStyle(TableStyle([
@@ -268,12 +284,38 @@ def generate_unit_statement_pdf(unit_assessment):
     elements.append(summary_table)
     elements.append(Spacer(1, 0.3*inch))
 
-    # Payment History
-    if unit_assessment.payments.exists():
+    # Statement Period
+    if start:
+        period = unit_assessment.period_summary(start, as_of)
+        elements.append(Paragraph("Statement Period", styles['Heading3']))
+        period_data = [
+            [f"Opening Balance ({period['start'].strftime('%m/%d/%Y')}):", f"${period['opening_balance']:,.2f}"],
+            ['Payments This Period:', f"${period['period_paid']:,.2f}"],
+            [f"Closing Balance ({period['end'].strftime('%m/%d/%Y')}):", f"${period['closing_balance']:,.2f}"],
+        ]
+        period_table = Table(period_data, colWidths=[2.5*inch, 2*inch])
+        period_table.setStyle(TableStyle([
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('LINEBELOW', (0, 1), (-1, 1), 0.5, colors.grey),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+        elements.append(period_table)
+        elements.append(Spacer(1, 0.3*inch))
+
+    # Payment History, evaluated once for both the check and the rows
+    payments = unit_assessment.payment_rows().all()
+    if as_of:
+        payments = payments.filter(payment_date__lte=as_of)
+    if start:
+        payments = payments.filter(payment_date__gte=start)
+    payments = list(payments)
+    if payments:
         elements.append(Paragraph("Payment History", styles['Heading3']))
         payment_data = [['Date', 'Amount', 'Method', 'Reference']]
 
-        for payment in unit_assessment.payments.all():
+        for payment in payments:
             payment_data.append([
                 payment.payment_date.strftime('%m/%d/%Y'),
                 f'${payment.amount:,.2f}',
@@ -308,3 +350,193 @@ def generate_unit_statement_pdf(unit_assessment):
     doc.build(elements)
     buffer.seek(0)
     return buffer
+
+
+def generate_consolidated_statement_pdf(statement, output=None):
+    """Generate one PDF statement covering every active assessment of a unit, into output if given
+
+    statement comes from consolidated.consolidated_statements, so rendering
+    runs no queries of its own.
+    """
+    buffer = output if output is not None else BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.75*inch, bottomMargin=0.75*inch)
+
+    elements = []
+    styles = getSampleStyleSheet()
+    unit = statement.unit
+
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.HexColor('#1f4788'),
+        spaceAfter=12,
+        alignment=TA_CENTER
+    )
+    header_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ])
+    totals_style = TableStyle(header_style.getCommands() + [
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#366092')),
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ])
+
+    # Header
+    elements.append(Paragraph(unit.association.name, title_style))
+    elements.append(Paragraph(f"Unit {unit.unit_number} - Consolidated Statement", styles['Heading2']))
+    elements.append(Paragraph(f"Owner: {unit.owner_name or 'N/A'}", styles['Normal']))
+    elements.append(Paragraph(f"As of {statement.statement_date.strftime('%B %d, %Y')}", styles['Normal']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # One row per assessment with the combined totals
+    elements.append(Paragraph("Summary", styles['Heading3']))
+    if not statement.lines:
+        elements.append(Paragraph("This unit has no active special assessments.", styles['Normal']))
+    else:
+        summary_data = [['Assessment', 'Total', 'Paid', 'Balance', 'Monthly', 'Status']]
+        for line in statement.lines:
+            ua = line.unit_assessment
+            summary_data.append([
+                ua.special_assessment.name,
+                f'${ua.total_assessment_amount():,.2f}',
+                f'${ua.total_paid():,.2f}',
+                f'${ua.remaining_balance():,.2f}',
+                f'${ua.total_monthly_payment():,.2f}',
+                ua.payment_status(),
+            ])
+        summary_data.append([
+            'COMBINED',
+            f'${statement.total_assessment:,.2f}',
+            f'${statement.total_paid:,.2f}',
+            f'${statement.remaining_balance:,.2f}',
+            f'${statement.monthly_total:,.2f}',
+            '',
+        ])
+        summary_table = Table(summary_data, colWidths=[2*inch, 1*inch, 1*inch, 1*inch, 0.9*inch, 1.1*inch], repeatRows=1)
+        summary_table.setStyle(totals_style)
+        elements.append(summary_table)
+        elements.append(Paragraph(f"Combined monthly payment: ${statement.monthly_total:,.2f}", styles['Heading4']))
+        if statement.late_fees:
+            elements.append(Paragraph(f"Late fees (billed separately): ${statement.late_fees:,.2f}", styles['Heading4']))
+
+    # Breakdown and payment history of each assessment
+    for line in statement.lines:
+        ua = line.unit_assessment
+        elements.append(Spacer(1, 0.2*inch))
+        elements.append(Paragraph(ua.special_assessment.name, styles['Heading3']))
+        elements.append(Paragraph(
+            f"{ua.get_payment_option_display()} - starting {ua.special_assessment.start_date.strftime('%B %d, %Y')}",
+            styles['Normal'],
+        ))
+
+        breakdown_data = [
+            ['Description', 'Amount', 'Monthly Payment'],
+            ['Base Assessment', f'${ua.base_assessment_amount:,.2f}', f'${ua.monthly_base_payment:,.2f}'],
+        ]
+        for fee in line.fees:
+            breakdown_data.append([f'LCE: {fee.fee_type}', f'${fee.fee_amount:,.2f}', f'${fee.monthly_payment:,.2f}'])
+        breakdown_data.append(['TOTAL', f'${ua.total_assessment_amount():,.2f}', f'${ua.total_monthly_payment():,.2f}'])
+        breakdown_table = Table(breakdown_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
+        breakdown_table.setStyle(totals_style)
+        elements.append(breakdown_table)
+
+        if line.payments:
+            elements.append(Spacer(1, 0.1*inch))
+            payment_data = [['Date', 'Amount', 'Method', 'Reference']]
+            for payment in line.payments:
+                payment_data.append([
+                    payment.payment_date.strftime('%m/%d/%Y'),
+                    f'${payment.amount:,.2f}',
+                    payment.payment_method or 'N/A',
+                    payment.reference_number or 'N/A'
+                ])
+            payment_table = Table(payment_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 2*inch], repeatRows=1)
+            payment_table.setStyle(header_style)
+            elements.append(payment_table)
+
+    # Footer
+    elements.append(Spacer(1, 0.3*inch))
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=TA_CENTER
+    )
+    elements.append(Paragraph(f"Generated on {date.today().strftime('%B %d, %Y')}", footer_style))
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+
+def generate_year_end_pdf(summary, output=None):
+    """Generate one year-end interest and principal letter per unit of a year_end_summary, into output if given
+
+    Pages are drawn straight on a canvas rather than laid out with platypus,
+    so a whole portfolio renders in minutes.
+    """
+    from reportlab.pdfgen import canvas
+
+    buffer = output if output is not None else BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    special_assessment = summary.special_assessment
+    generated = date.today().strftime('%B %d, %Y')
+
+    for row in summary.rows:
+        unit = row.unit_assessment.unit
+        y = height - inch
+        pdf.setFont('Helvetica-Bold', 16)
+        pdf.setFillColor(colors.HexColor('#1f4788'))
+        pdf.drawCentredString(width / 2, y, special_assessment.association.name)
+        pdf.setFillColor(colors.black)
+        y -= 0.4*inch
+        pdf.setFont('Helvetica-Bold', 13)
+        pdf.drawString(inch, y, f"{summary.year} Interest and Principal Statement")
+        y -= 0.3*inch
+        pdf.setFont('Helvetica', 10)
+        for line in [
+            f"Unit {unit.unit_number}" + (f" - {unit.owner_name}" if unit.owner_name else ''),
+            f"{special_assessment.name} ({row.unit_assessment.get_payment_option_display()})",
+            f"{special_assessment.interest_rate}% over {special_assessment.loan_period_months} months from "
+            f"{special_assessment.start_date.strftime('%B %d, %Y')}",
+        ]:
+            pdf.drawString(inch, y, line)
+            y -= 0.22*inch
+
+        y -= 0.2*inch
+        amounts = [
+            (f'Paid January 1 - December 31, {summary.year}', row.paid),
+            ('Interest paid', row.interest),
+            ('Principal paid', row.principal),
+            (f'Principal balance at December 31, {summary.year}', row.principal_balance),
+        ]
+        for index, (label, amount) in enumerate(amounts):
+            pdf.setFont('Helvetica-Bold' if index in (1, 2) else 'Helvetica', 11)
+            pdf.drawString(inch, y, label)
+            pdf.drawRightString(width - inch, y, f'${amount:,.2f}')
+            pdf.setStrokeColor(colors.grey)
+            pdf.line(inch, y - 6, width - inch, y - 6)
+            y -= 0.35*inch
+
+        y -= 0.2*inch
+        pdf.setFont('Helvetica', 8)
+        pdf.setFillColor(colors.grey)
+        pdf.drawString(inch, y, "Payments are applied to each scheduled installment's interest first, then its principal.")
+        pdf.drawCentredString(width / 2, 0.75*inch, f"Generated on {generated}")
+        pdf.setFillColor(colors.black)
+        pdf.showPage()
+
+    if not summary.rows:
+        pdf.drawString(inch, height - inch, f"{special_assessment.name}: no units")
+        pdf.showPage()
+    pdf.save()
+    buffer.seek(0)
+    return buffer
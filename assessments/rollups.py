@@ -0,0 +1,127 @@
+"""
+Cached assessment rollups and summary PDFs.
+
+The assessment page's totals and unit rows need every unit's balance, which
+is a full pass over the assessment, so the rollup stores both. Status counts
+read the stored status column instead, so they are not cached. Entries are
+keyed by today's date (balances change when the date does), ROLLUP_FORMAT and
+the assessment's cache_version, a database counter that the signal handlers
+bump after each commit that changes its units, fees or payments, and that
+refresh_statuses bumps when it stores new statuses; entries under older
+versions are never read again and age out. warm_caches fills these entries
+ahead of users after deploys and at midnight.
+"""
+import glob
+import os
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import SpecialAssessment, UnitAssessment
+from .renderers import render
+
+
+# Bump when the shape of a cached rollup changes, so deploys never read the old shape
+ROLLUP_FORMAT = 2
+
+
+def bump_assessment_version(assessment_id):
+    """Retire every cached rollup and PDF of an assessment once the current transaction commits
+
+    Bumping after the commit means no request can pair the new version with
+    data that is not yet visible and cache it under the new key.
+    """
+    transaction.on_commit(lambda: SpecialAssessment.objects.filter(pk=assessment_id).update(
+        cache_version=F('cache_version') + 1))
+
+
+def bump_unit_assessment_version(unit_assessment_id):
+    assessment_id = (UnitAssessment.objects.filter(pk=unit_assessment_id)
+                     .values_list('special_assessment_id', flat=True).first())
+    if assessment_id:
+        bump_assessment_version(assessment_id)
+
+
+def _key(kind, special_assessment, today=None):
+    return (f'assessment-{kind}:{ROLLUP_FORMAT}:{special_assessment.pk}:{today or date.today()}:'
+            f'{special_assessment.cache_version}')
+
+
+def compute_rollup(special_assessment):
+    """Totals and unit rows of an assessment in one pass over its units
+
+    Rows are plain dicts with the keys the assessment page reads, ordered by
+    unit number, and carry the stored status.
+    """
+    rows = []
+    for ua in special_assessment.unit_assessments.with_totals():
+        rows.append({
+            'id': ua.pk,
+            'unit': {'unit_number': ua.unit.unit_number},
+            'total_assessment_amount': ua.total_assessment_amount(),
+            'total_monthly_payment': ua.total_monthly_payment(),
+            'total_paid': ua.total_paid(),
+            'remaining_balance': ua.remaining_balance(),
+            'total_late_fees': ua.total_late_fees(),
+            'status': ua.status,
+        })
+    return {
+        'total_assessment': sum(row['total_assessment_amount'] for row in rows),
+        'total_paid': sum(row['total_paid'] for row in rows),
+        'total_remaining': sum(row['remaining_balance'] for row in rows),
+        'total_late_fees': sum(row['total_late_fees'] for row in rows),
+        'units': len(rows),
+        'rows': rows,
+    }
+
+
+def assessment_rollup(special_assessment, refresh=False):
+    """The cached rollup for today, computed and stored on a miss"""
+    key = _key('rollup', special_assessment)
+    rollup = None if refresh else cache.get(key)
+    if rollup is None:
+        rollup = compute_rollup(special_assessment)
+        cache.set(key, rollup)
+    return rollup
+
+
+def summary_pdf(special_assessment, refresh=False):
+    """Path of today's summary PDF in REPORT_CACHE_DIR, rendered to disk on a miss"""
+    directory = settings.REPORT_CACHE_DIR
+    prefix = f'summary-{special_assessment.pk}-'
+    path = os.path.join(directory, f'{prefix}{date.today()}-{special_assessment.cache_version}.pdf')
+    if not refresh and os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    # Render beside the final name and rename, so no reader sees a partial file
+    descriptor, partial = tempfile.mkstemp(dir=directory, prefix=prefix, suffix='.partial')
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            render('assessment_summary', 'pdf', special_assessment, output=output)
+        os.replace(partial, path)
+    except BaseException:
+        os.unlink(partial)
+        raise
+
+    # Older dates and versions of this assessment's PDF are never served again
+    for stale in glob.glob(os.path.join(directory, f'{prefix}*.pdf')):
+        if stale != path:
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+    return path
+
+
+def warm_assessment(assessment_id, pdfs=False):
+    """Precompute today's cache entries for one assessment; only reads the database"""
+    special_assessment = SpecialAssessment.objects.select_related('association').get(pk=assessment_id)
+    rollup = assessment_rollup(special_assessment, refresh=True)
+    if pdfs:
+        summary_pdf(special_assessment, refresh=True)
+    return special_assessment, rollup['units']
@@ -0,0 +1,138 @@
+"""
+What-if repricing of a special assessment under alternative loan terms.
+
+An assessment is loaded once into a plain in-memory snapshot and then repriced
+for any number of candidate (rate, term, lump-sum share) scenarios. Nothing in
+this module writes to the database.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from . import amortization
+from .models import AdditionalFee, UnitAssessment
+
+
+Scenario = namedtuple('Scenario', ['interest_rate', 'loan_period_months', 'lump_sum_share'])
+
+UnitSnapshot = namedtuple('UnitSnapshot', ['unit_number', 'base_amount', 'fee_amounts'])
+
+ScenarioResult = namedtuple('ScenarioResult', [
+    'scenario',
+    'annuity_factor',
+    'unit_payments',
+    'total_principal',
+    'lump_sum_collected',
+    'financed_principal',
+    'monthly_collections',
+    'association_loan_payment',
+    'total_interest',
+    'min_unit_payment',
+    'max_unit_payment',
+    'average_unit_payment',
+])
+
+
+class AssessmentSnapshot:
+    """Read-only copy of the amounts needed to reprice every unit of an assessment"""
+
+    def __init__(self, special_assessment, units):
+        self.special_assessment = special_assessment
+        self.units = units
+        self.total_principal = float(sum(u.base_amount + sum(u.fee_amounts) for u in units))
+
+    @classmethod
+    def load(cls, special_assessment):
+        """Load all unit amounts for an assessment with two queries"""
+        fees = {}
+        fee_rows = (AdditionalFee.objects
+                    .filter(unit_assessment__special_assessment=special_assessment)
+                    .values_list('unit_assessment_id', 'fee_amount'))
+        for unit_assessment_id, fee_amount in fee_rows:
+            fees.setdefault(unit_assessment_id, []).append(fee_amount)
+
+        rows = (UnitAssessment.objects
+                .filter(special_assessment=special_assessment)
+                .order_by('unit__unit_number')
+                .values_list('id', 'unit__unit_number', 'base_assessment_amount'))
+        units = [
+            UnitSnapshot(unit_number, base, fees.get(pk, []))
+            for pk, unit_number, base in rows
+        ]
+        return cls(special_assessment, units)
+
+    def current_scenario(self):
+        """Scenario matching the assessment's current loan terms"""
+        return Scenario(self.special_assessment.interest_rate, self.special_assessment.loan_period_months, Decimal('0'))
+
+
+def annuity_factor(interest_rate, loan_period_months):
+    """Cached annuity factor for a scenario, as a float for batch pricing"""
+    rate = amortization.monthly_rate(interest_rate)
+    return float(amortization.annuity_factor(rate, loan_period_months))
+
+
+def price_scenario(snapshot, scenario):
+    """Reprice every unit in the snapshot under a single scenario"""
+    factor = annuity_factor(scenario.interest_rate, scenario.loan_period_months)
+    share = float(scenario.lump_sum_share) / 100
+
+    # Base assessment and each LCE fee are priced separately with the same
+    # half-up cent rounding as the stored monthly_base_payment and
+    # AdditionalFee.monthly_payment values.
+    rate, months = scenario.interest_rate, scenario.loan_period_months
+    unit_payments = [
+        float(amortization.monthly_payment(u.base_amount, rate, months)
+              + sum(amortization.monthly_payment(fee, rate, months) for fee in u.fee_amounts))
+        for u in snapshot.units
+    ]
+
+    total_principal = snapshot.total_principal
+    financed_principal = total_principal * (1 - share)
+    monthly_collections = sum(unit_payments) * (1 - share)
+    count = len(unit_payments)
+
+    return ScenarioResult(
+        scenario=scenario,
+        annuity_factor=factor,
+        unit_payments=unit_payments,
+        total_principal=total_principal,
+        lump_sum_collected=total_principal * share,
+        financed_principal=financed_principal,
+        monthly_collections=monthly_collections,
+        association_loan_payment=financed_principal * factor,
+        total_interest=monthly_collections * int(scenario.loan_period_months) - financed_principal,
+        min_unit_payment=min(unit_payments) if count else 0.0,
+        max_unit_payment=max(unit_payments) if count else 0.0,
+        average_unit_payment=sum(unit_payments) / count if count else 0.0,
+    )
+
+
+def run_scenarios(special_assessment, scenarios, snapshot=None):
+    """Reprice all units of an assessment under each scenario, without DB writes"""
+    if snapshot is None:
+        snapshot = AssessmentSnapshot.load(special_assessment)
+    return [price_scenario(snapshot, scenario) for scenario in scenarios]
+
+
+def parse_scenarios(text):
+    """Parse 'rate, months, lump sum %' lines into Scenario tuples"""
+    scenarios = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = [part.strip().rstrip('%') for part in line.split(',')]
+        if len(parts) == 2:
+            parts.append('0')
+        if len(parts) != 3:
+            raise ValueError(f"Line {line_number}: expected 'rate, months, lump sum %'")
+        try:
+            rate, months, share = Decimal(parts[0]), int(parts[1]), Decimal(parts[2])
+            if not (rate.is_finite() and share.is_finite()):
+                raise ValueError('not a finite number')
+        except (ArithmeticError, ValueError):
+            raise ValueError(f"Line {line_number}: could not parse '{line}'")
+        if rate < 0 or months <= 0 or not (0 <= share <= 100):
+            raise ValueError(f"Line {line_number}: rate must be >= 0, months > 0 and lump sum share between 0 and 100")
+        scenarios.append(Scenario(rate, months, share))
+    return scenarios
@@ -0,0 +1,198 @@
+"""
+Indexed search over unit numbers, owner names and emails, and payment references.
+
+On SQLite the index is an FTS5 virtual table whose rowid encodes the kind and
+primary key of each document. Other backends use the SearchEntry table, with
+one indexed row per term, and resolve prefixes as range scans on that index.
+The index is kept in sync by the signal handlers in signals.py; bulk writes
+should call index_units / index_payments or rebuild_index themselves.
+
+Query words match the start of indexed words, not their middle: "smi" finds
+"Smith" and "l5" finds "L51", but "51" does not find "L51". Unit numbers
+are split at punctuation, so "51" does find "L-51" and "Bldg 2 #51".
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.expressions import RawSQL
+
+from .models import SearchEntry, Unit, Payment
+
+
+FTS_TABLE = 'assessments_search_fts'
+
+KIND_CODES = {SearchEntry.KIND_UNIT: 0, SearchEntry.KIND_PAYMENT: 1}
+
+TERM_MAX_LENGTH = 100
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(*values):
+    """Lower-case word tokens of the given values, in order and without duplicates"""
+    terms = []
+    for value in values:
+        for token in TOKEN_RE.findall((value or '').lower()):
+            token = token[:TERM_MAX_LENGTH]
+            if token not in terms:
+                terms.append(token)
+    return terms
+
+
+def unit_terms(unit_number, owner_name, owner_email):
+    return tokenize(unit_number, owner_name, owner_email)
+
+
+def payment_terms(reference_number):
+    return tokenize(reference_number)
+
+
+_fts_tables = {}
+
+
+def fts_enabled(using=DEFAULT_DB_ALIAS):
+    """Whether the FTS5 table exists on this database, checked once per database until the next migrate"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def forget_fts_tables():
+    """Drop the remembered fts_enabled answers, e.g. after migrations create or drop the table"""
+    _fts_tables.clear()
+
+
+def _rowid(kind, object_id):
+    return object_id * len(KIND_CODES) + KIND_CODES[kind]
+
+
+def remove_documents(kind, object_ids, using=DEFAULT_DB_ALIAS):
+    """Drop documents from the index"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk in object_ids])
+    else:
+        SearchEntry.objects.using(using).filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def index_documents(kind, documents, using=DEFAULT_DB_ALIAS):
+    """Replace the indexed terms of each (object_id, terms) document"""
+    documents = list(documents)
+    remove_documents(kind, [pk for pk, terms in documents], using=using)
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(_rowid(kind, pk), ' '.join(terms)) for pk, terms in documents if terms],
+            )
+    else:
+        SearchEntry.objects.using(using).bulk_create([
+            SearchEntry(kind=kind, object_id=pk, term=term)
+            for pk, terms in documents
+            for term in terms
+        ], batch_size=2000)
+
+
+def index_units(units, using=DEFAULT_DB_ALIAS):
+    index_documents(SearchEntry.KIND_UNIT, [
+        (unit.pk, unit_terms(unit.unit_number, unit.owner_name, unit.owner_email)) for unit in units
+    ], using=using)
+
+
+def index_payments(payments, using=DEFAULT_DB_ALIAS):
+    index_documents(SearchEntry.KIND_PAYMENT, [
+        (payment.pk, payment_terms(payment.reference_number)) for payment in payments
+    ], using=using)
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS, batch_size=2000):
+    """Rebuild the whole index from the Unit and Payment tables"""
+    if fts_enabled(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchEntry.objects.using(using).all().delete()
+
+    sources = [
+        (SearchEntry.KIND_UNIT, Unit.objects.using(using).values_list('pk', 'unit_number', 'owner_name', 'owner_email'), unit_terms),
+        (SearchEntry.KIND_PAYMENT, Payment.objects.using(using).values_list('pk', 'reference_number'), payment_terms),
+    ]
+    count = 0
+    for kind, rows, terms_for in sources:
+        batch = []
+        for pk, *values in rows.order_by().iterator(chunk_size=batch_size):
+            batch.append((pk, terms_for(*values)))
+            if len(batch) >= batch_size:
+                index_documents(kind, batch, using=using)
+                count += len(batch)
+                batch = []
+        index_documents(kind, batch, using=using)
+        count += len(batch)
+    return count
+
+
+def _match(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(query, limit=50, using=DEFAULT_DB_ALIAS):
+    """Return {kind: [object ids]} of documents matching every word of the query as a prefix"""
+    results = {kind: [] for kind in KIND_CODES}
+    terms = tokenize(query)
+    if not terms:
+        return results
+
+    if fts_enabled(using):
+        # One query per kind, so a kind with many hits cannot crowd out the other
+        with connections[using].cursor() as cursor:
+            for kind, code in KIND_CODES.items():
+                cursor.execute(
+                    f'SELECT rowid / %s FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% %s = %s LIMIT %s',
+                    [len(KIND_CODES), _match(terms), len(KIND_CODES), code, limit],
+                )
+                results[kind] = [row[0] for row in cursor.fetchall()]
+        return results
+
+    # Prefix match as an index range scan: term >= 'abc' and term < 'abc\uffff'
+    matches = None
+    for term in terms:
+        found = set(
+            SearchEntry.objects.using(using)
+            .filter(term__gte=term, term__lt=term + '\uffff')
+            .values_list('kind', 'object_id')
+        )
+        matches = found if matches is None else matches & found
+        if not matches:
+            return results
+    for kind, object_id in sorted(matches, key=lambda match: match[1]):
+        if len(results[kind]) < limit:
+            results[kind].append(object_id)
+    return results
+
+
+def matching_ids(kind, query, using=DEFAULT_DB_ALIAS):
+    """Subquery of the ids of every document of one kind matching the query, for use in an __in filter"""
+    terms = tokenize(query)
+    if not terms:
+        return SearchEntry.objects.none().values('object_id')
+
+    if fts_enabled(using):
+        return RawSQL(
+            f'SELECT rowid / %s FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% %s = %s',
+            [len(KIND_CODES), _match(terms), len(KIND_CODES), KIND_CODES[kind]],
+        )
+
+    ids = None
+    for term in terms:
+        entries = SearchEntry.objects.using(using).filter(kind=kind, term__gte=term, term__lt=term + '\uffff')
+        if ids is not None:
+            entries = entries.filter(object_id__in=ids)
+        ids = entries.values('object_id')
+    return ids
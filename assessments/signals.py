@@ -0,0 +1,105 @@
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.dispatch import receiver
+
+from . import search
+from .models import Unit, SpecialAssessment, UnitAssessment, AdditionalFee, Payment, LateFee, SearchEntry
+from .events import payment_posted_event, publish
+from .rollups import bump_assessment_version, bump_unit_assessment_version
+from .snapshots import invalidate_snapshots
+from .statuses import refresh_unit_statuses
+
+
+@receiver(post_migrate)
+def forget_search_tables(sender, **kwargs):
+    """Migrations may have added or removed the FTS table that fts_enabled remembers"""
+    search.forget_fts_tables()
+
+
+@receiver(post_save, sender=Unit)
+def index_unit(sender, instance, using, **kwargs):
+    """Keep the search index in step with unit owner details"""
+    search.index_units([instance], using=using)
+
+
+@receiver(post_delete, sender=Unit)
+def unindex_unit(sender, instance, using, **kwargs):
+    search.remove_documents(SearchEntry.KIND_UNIT, [instance.pk], using=using)
+
+
+@receiver(post_save, sender=Payment)
+def index_payment(sender, instance, using, **kwargs):
+    """Keep the search index in step with payment reference numbers"""
+    search.index_payments([instance], using=using)
+
+
+@receiver(post_delete, sender=Payment)
+def unindex_payment(sender, instance, using, **kwargs):
+    search.remove_documents(SearchEntry.KIND_PAYMENT, [instance.pk], using=using)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_position(sender, instance, **kwargs):
+    """Note where an edited payment used to sit so its old months are invalidated too"""
+    instance._previous_position = None
+    if instance.pk:
+        instance._previous_position = (
+            Payment.objects.filter(pk=instance.pk).values_list('unit_assessment_id', 'payment_date').first()
+        )
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    """Drop balance snapshots from the payment's month onwards and refresh the stored status"""
+    positions = [(instance.unit_assessment_id, instance.payment_date)]
+    if getattr(instance, '_previous_position', None):
+        positions.append(instance._previous_position)
+    for unit_assessment_id, payment_date in positions:
+        invalidate_snapshots([unit_assessment_id], payment_date)
+    refresh_unit_statuses(unit_assessment_id for unit_assessment_id, payment_date in positions)
+
+
+@receiver(post_save, sender=Payment)
+def publish_payment(sender, instance, created, raw=False, **kwargs):
+    """Tell live dashboards about new payments"""
+    if created and not raw:
+        publish([payment_posted_event(instance)])
+
+
+@receiver(post_save, sender=UnitAssessment)
+def refresh_assessment_status(sender, instance, raw=False, **kwargs):
+    """Amounts or payment option changed; status updates are bulk_update so this does not recurse"""
+    if not raw:
+        refresh_unit_statuses([instance.pk])
+
+
+@receiver(post_save, sender=AdditionalFee)
+@receiver(post_delete, sender=AdditionalFee)
+def refresh_fee_status(sender, instance, **kwargs):
+    refresh_unit_statuses([instance.unit_assessment_id])
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_save, sender=SpecialAssessment)
+@receiver(post_save, sender=UnitAssessment)
+@receiver(post_delete, sender=UnitAssessment)
+@receiver(post_save, sender=AdditionalFee)
+@receiver(post_delete, sender=AdditionalFee)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=LateFee)
+@receiver(post_delete, sender=LateFee)
+def invalidate_rollups(sender, instance, raw=False, **kwargs):
+    """Retire the cached rollup and summary PDF of the assessment that changed"""
+    if raw:
+        return
+    if sender is Unit:
+        # Cached unit rows show the unit number
+        for assessment_id in set(instance.unit_assessments.order_by().values_list('special_assessment_id', flat=True)):
+            bump_assessment_version(assessment_id)
+    elif sender is SpecialAssessment:
+        bump_assessment_version(instance.pk)
+    elif sender is UnitAssessment:
+        bump_assessment_version(instance.special_assessment_id)
+    else:
+        bump_unit_assessment_version(instance.unit_assessment_id)
@@ -0,0 +1,93 @@
+"""
+Monthly balance snapshots for point-in-time (as-of date) queries.
+
+A BalanceSnapshot holds the cumulative amount a unit assessment had paid by the
+end of a month, so the amount paid as of any date is one snapshot plus the few
+payments made after it. build_snapshots fills in missing months incrementally;
+the Payment signal handlers drop the snapshots a payment change invalidates, and
+bulk writes that bypass signals should call invalidate_snapshots themselves.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ArchivedPayment, BalanceSnapshot, Payment, UnitAssessment
+
+
+BATCH_SIZE = 2000
+
+
+def month_end(day):
+    """Last day of the month containing day"""
+    return day.replace(day=1) + relativedelta(months=1) - timedelta(days=1)
+
+
+def last_closed_month_end(today=None):
+    """Last day of the most recent complete month"""
+    return (today or date.today()).replace(day=1) - timedelta(days=1)
+
+
+def invalidate_snapshots(unit_assessment_ids, since):
+    """Drop snapshots covering the month of since or later, which a payment change makes stale"""
+    return BalanceSnapshot.objects.filter(
+        unit_assessment_id__in=unit_assessment_ids,
+        period_end__gte=since.replace(day=1),
+    ).delete()[0]
+
+
+def build_snapshots(through=None, unit_assessments=None):
+    """Create the missing month-end snapshots through the given date; returns the number created"""
+    through = month_end(through) if through else last_closed_month_end()
+    unit_assessments = unit_assessments if unit_assessments is not None else UnitAssessment.objects.all()
+    unit_assessments = unit_assessments.select_related('special_assessment').order_by()
+
+    # Where each unit assessment's snapshots currently end, and their running total
+    latest = dict(
+        BalanceSnapshot.objects.filter(unit_assessment__in=unit_assessments)
+        .values('unit_assessment').annotate(last=Max('period_end')).values_list('unit_assessment', 'last')
+    )
+    carried = {
+        ua_id: total
+        for ua_id, period_end, total in BalanceSnapshot.objects.filter(unit_assessment__in=unit_assessments)
+        .filter(period_end__in=set(latest.values())).values_list('unit_assessment', 'period_end', 'total_paid')
+        if latest[ua_id] == period_end
+    }
+
+    # Monthly payment totals for every month not yet snapshotted, one grouped query
+    # per table; archived assessments' payments live in ArchivedPayment
+    since = min(latest.values()) if latest and len(latest) == unit_assessments.count() else None
+    monthly = defaultdict(lambda: defaultdict(Decimal))
+    for model in (Payment, ArchivedPayment):
+        payments = model.objects.filter(unit_assessment__in=unit_assessments, payment_date__lte=through)
+        if since:
+            payments = payments.filter(payment_date__gt=since)
+        for ua_id, month, total in (payments.order_by().annotate(month=TruncMonth('payment_date'))
+                                    .values('unit_assessment', 'month').annotate(total=Sum('amount'))
+                                    .values_list('unit_assessment', 'month', 'total')):
+            monthly[ua_id][month_end(month)] += total
+
+    created = 0
+    batch = []
+    for ua in unit_assessments.iterator(chunk_size=BATCH_SIZE):
+        months = monthly.get(ua.pk, {})
+        if ua.pk in latest:
+            period_end = month_end(latest[ua.pk] + timedelta(days=1))
+        else:
+            period_end = month_end(min([ua.special_assessment.start_date, *months]))
+        running = carried.get(ua.pk, Decimal('0.00'))
+
+        while period_end <= through:
+            running += months.get(period_end, Decimal('0.00'))
+            batch.append(BalanceSnapshot(unit_assessment_id=ua.pk, period_end=period_end, total_paid=running))
+            period_end = month_end(period_end + timedelta(days=1))
+
+        if len(batch) >= BATCH_SIZE:
+            created += len(BalanceSnapshot.objects.bulk_create(batch, batch_size=BATCH_SIZE))
+            batch = []
+
+    created += len(BalanceSnapshot.objects.bulk_create(batch, batch_size=BATCH_SIZE))
+    return created
@@ -0,0 +1,79 @@
+"""
+Excel workbooks, rendered with openpyxl.
+
+Only imported through the renderer registry, so openpyxl is loaded on the
+first export rather than at startup.
+"""
+from io import BytesIO
+
+import openpyxl
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .tables import SUMMARY_COLUMNS, assessment_table_rows
+
+
+MONEY_FORMAT = '"$"#,##0.00'
+
+
+def generate_assessment_summary_xlsx(special_assessment, output=None, as_of=None):
+    """Generate an Excel summary of a special assessment, into output if given"""
+    buffer = output if output is not None else BytesIO()
+
+    # Create workbook
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Assessment Summary"
+
+    # Header styling
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+
+    # Assessment Information
+    ws['A1'] = special_assessment.association.name
+    ws['A1'].font = Font(bold=True, size=14)
+    ws['A2'] = special_assessment.name
+    ws['A2'].font = Font(bold=True, size=12)
+
+    ws['A4'] = "Loan Amount:"
+    ws['B4'] = float(special_assessment.total_loan_amount)
+    ws['B4'].number_format = MONEY_FORMAT
+
+    ws['A5'] = "Interest Rate:"
+    ws['B5'] = float(special_assessment.interest_rate) / 100
+    ws['B5'].number_format = '0.00%'
+
+    ws['A6'] = "Loan Period:"
+    ws['B6'] = f"{special_assessment.loan_period_months} months"
+
+    ws['A7'] = "Monthly Loan Payment:"
+    ws['B7'] = float(special_assessment.monthly_loan_payment)
+    ws['B7'].number_format = MONEY_FORMAT
+
+    if as_of:
+        ws['A8'] = "Balances as of:"
+        ws['B8'] = as_of
+        ws['B8'].number_format = 'mm/dd/yyyy'
+
+    # Unit Assessment Table
+    row = 10
+    for col, header in enumerate(SUMMARY_COLUMNS, 1):
+        cell = ws.cell(row=row, column=col, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center')
+
+    row += 1
+    for values in assessment_table_rows(special_assessment, as_of):
+        ws.cell(row=row, column=1, value=values[0])
+        for col, amount in enumerate(values[1:-1], 2):
+            ws.cell(row=row, column=col, value=float(amount)).number_format = MONEY_FORMAT
+        ws.cell(row=row, column=len(values), value=values[-1])
+        row += 1
+
+    # Adjust column widths
+    for col in range(1, len(SUMMARY_COLUMNS) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 15
+
+    wb.save(buffer)
+    return buffer
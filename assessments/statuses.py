@@ -0,0 +1,70 @@
+"""
+Materialized payment status columns on UnitAssessment.
+
+payment_status() needs each unit's payment total, so filtering or counting by
+status used to mean computing it for every row. refresh_statuses stores status,
+days delinquent and amount past due on the row instead. The signal handlers
+refresh single units as payments and fees change. The nightly
+refresh_payment_statuses command catches up as the calendar advances; it
+streams units with their totals annotated and writes back only the rows whose
+values changed. Status changes are published as dashboard events, and the
+assessments whose rows changed get their cached rollups retired, since those
+carry each unit's status.
+"""
+from datetime import date
+
+from .bulk import bulk_update_rows
+from .events import publish, status_changed_event
+from .models import UnitAssessment
+from .rollups import bump_assessment_version
+
+
+BATCH_SIZE = 2000
+
+STATUS_FIELDS = ['status', 'days_delinquent', 'amount_past_due', 'status_updated_on']
+
+
+def refresh_statuses(unit_assessments=None, today=None, batch_size=BATCH_SIZE):
+    """Recompute and store the status columns; returns the number of rows that changed"""
+    today = today or date.today()
+    if unit_assessments is None:
+        unit_assessments = UnitAssessment.objects.all()
+
+    changed = 0
+    batch = []
+    events = []
+    assessment_ids = set()
+    for ua in unit_assessments.with_totals(today).order_by().iterator(chunk_size=batch_size):
+        previous = ua.status
+        if apply_status(ua, today):
+            batch.append(ua)
+            assessment_ids.add(ua.special_assessment_id)
+            # Units getting their first stored status are not news
+            if previous and ua.status != previous:
+                events.append(status_changed_event(ua, previous))
+        if len(batch) >= batch_size:
+            changed += bulk_update_rows(batch, STATUS_FIELDS)
+            publish(events)
+            batch = []
+            events = []
+    if batch:
+        changed += bulk_update_rows(batch, STATUS_FIELDS)
+        publish(events)
+    for assessment_id in assessment_ids:
+        bump_assessment_version(assessment_id)
+    return changed
+
+
+def apply_status(unit_assessment, today):
+    """Set the status columns on an instance loaded with with_totals(today); returns whether they changed"""
+    status, days, past_due = unit_assessment.delinquency(today)
+    if (unit_assessment.status, unit_assessment.days_delinquent, unit_assessment.amount_past_due) == (status, days, past_due):
+        return False
+    unit_assessment.status, unit_assessment.days_delinquent, unit_assessment.amount_past_due = status, days, past_due
+    unit_assessment.status_updated_on = today
+    return True
+
+
+def refresh_unit_statuses(unit_assessment_ids):
+    """Refresh the given unit assessments, e.g. after one of their payments changed"""
+    return refresh_statuses(UnitAssessment.objects.filter(pk__in=set(unit_assessment_ids)))
@@ -0,0 +1,51 @@
+"""
+Spooled rendering and chunked streaming for generated documents.
+
+Reports are rendered into a SpooledTemporaryFile that rolls over to disk past
+SPOOL_MAX_MEMORY, so a finished document does not stay pinned in worker memory
+while a slow client downloads it.
+"""
+import shutil
+import tempfile
+
+from django.http import FileResponse
+
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class StreamedFileResponse(FileResponse):
+    """FileResponse that sends larger chunks; Content-Length comes from the seekable file"""
+    block_size = STREAM_CHUNK_SIZE
+
+
+def spool_report(generate, *args, **kwargs):
+    """Render a report function into a rewound spooled temporary file"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        generate(*args, output=spooled, **kwargs)
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def report_response(generate, *args, filename, **kwargs):
+    """Render a report and stream it back as an attachment"""
+    return StreamedFileResponse(spool_report(generate, *args, **kwargs), as_attachment=True, filename=filename)
+
+
+def write_report(generate, path, *args, **kwargs):
+    """Render a report straight to a file on disk, for bulk jobs and management commands"""
+    with open(path, 'wb') as output:
+        generate(*args, output=output, **kwargs)
+    return path
+
+
+def copy_report(spooled, destination):
+    """Copy a spooled report to another file object in STREAM_CHUNK_SIZE chunks"""
+    spooled.seek(0)
+    shutil.copyfileobj(spooled, destination, STREAM_CHUNK_SIZE)
@@ -0,0 +1,149 @@
+"""
+Seeded synthetic portfolios for benchmarks and load testing.
+
+Data is written with bulk_create, so monthly payments are priced here rather
+than by the model save() methods.
+"""
+import random
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from hoa_management.routers import reset_replica_check
+
+from .models import Association, SpecialAssessment, Unit, UnitAssessment, AdditionalFee, Payment
+from .search import index_units, index_payments
+from .statuses import refresh_statuses
+
+
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def scratch_database(alias=DEFAULT_DB_ALIAS, name=None):
+    """Point a connection at a freshly migrated test database for the duration of the block
+
+    Pass name to put the test database in that file, e.g. so threads get their
+    own connections instead of sharing an in-memory SQLite database. Aliases
+    that mirror this one, like the read replica, are pointed at the same
+    database meanwhile, so routed reads never reach the real replica.
+    """
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name:
+        test_settings['NAME'] = name
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    mirrors = {
+        mirror: settings_dict['NAME'] for mirror, settings_dict in connections.settings.items()
+        if mirror != alias and settings_dict.get('TEST', {}).get('MIRROR') == alias
+    }
+    for mirror in mirrors:
+        connections[mirror].close()
+        connections.settings[mirror]['NAME'] = connection.settings_dict['NAME']
+    reset_replica_check()
+    try:
+        yield connection
+    finally:
+        for mirror, mirror_name in mirrors.items():
+            connections[mirror].close()
+            connections.settings[mirror]['NAME'] = mirror_name
+        reset_replica_check()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+
+
+def seed_portfolio(associations=1, units_per_association=100, months_paid=12,
+                   lump_sum_share=0.1, fee_share=0.3, seed=0, start_date=None):
+    """Create associations with one special assessment each, units, fees and payments"""
+    rng = random.Random(seed)
+    if start_date is None:
+        start_date = date.today().replace(day=1) - relativedelta(months=months_paid)
+
+    special_assessments = []
+    for a in range(associations):
+        association = Association.objects.create(name=f'Synthetic Association {a + 1}')
+        base_amount = Decimal('33225.68')
+        special_assessment = SpecialAssessment.objects.create(
+            association=association,
+            name=f'Synthetic Special Assessment {a + 1}',
+            total_loan_amount=base_amount * units_per_association,
+            interest_rate=Decimal('8.38'),
+            loan_period_months=240,
+            monthly_loan_payment=Decimal('0.00'),
+            start_date=start_date,
+            total_base_assessment=base_amount * units_per_association,
+        )
+        special_assessment.monthly_loan_payment = special_assessment.calculate_monthly_payment(special_assessment.total_loan_amount)
+        special_assessment.save(update_fields=['monthly_loan_payment'])
+
+        units = Unit.objects.bulk_create([
+            Unit(
+                association=association,
+                unit_number=f'{chr(65 + (u % 26))}{u + 1}',
+                owner_name=f'Owner {a + 1}-{u + 1}',
+                owner_email=f'owner{a + 1}-{u + 1}@example.com',
+                common_expense_allocation=Decimal('1.00'),
+            )
+            for u in range(units_per_association)
+        ], batch_size=BATCH_SIZE)
+        if units and units[0].pk is None:
+            units = list(Unit.objects.filter(association=association))
+
+        unit_assessments = []
+        for unit in units:
+            lump = rng.random() < lump_sum_share
+            unit_assessments.append(UnitAssessment(
+                unit=unit,
+                special_assessment=special_assessment,
+                base_assessment_amount=base_amount,
+                payment_option=UnitAssessment.PAYMENT_OPTION_LUMP if lump else UnitAssessment.PAYMENT_OPTION_MONTHLY,
+                monthly_base_payment=Decimal('0.00') if lump else special_assessment.calculate_monthly_payment(base_amount),
+            ))
+        unit_assessments = UnitAssessment.objects.bulk_create(unit_assessments, batch_size=BATCH_SIZE)
+        if unit_assessments and unit_assessments[0].pk is None:
+            unit_assessments = list(UnitAssessment.objects.filter(special_assessment=special_assessment))
+
+        fees = []
+        payments = []
+        for ua in unit_assessments:
+            monthly = ua.payment_option == UnitAssessment.PAYMENT_OPTION_MONTHLY
+            fee_monthly = Decimal('0.00')
+            if rng.random() < fee_share:
+                fee_amount = rng.choice([Decimal('487.00'), Decimal('974.00'), Decimal('11525.82')])
+                fee_monthly = special_assessment.calculate_monthly_payment(fee_amount) if monthly else Decimal('0.00')
+                fees.append(AdditionalFee(unit_assessment=ua, fee_type='Deck', fee_amount=fee_amount, monthly_payment=fee_monthly))
+
+            if not monthly:
+                if rng.random() < 0.8:
+                    payments.append(Payment(unit_assessment=ua, payment_date=start_date, amount=ua.base_assessment_amount,
+                                            payment_method='Check', reference_number=str(rng.randint(1000, 99999))))
+                continue
+
+            # Most owners pay every month; some stop paying part way through
+            paid_months = months_paid if rng.random() < 0.8 else rng.randint(0, months_paid)
+            installment = ua.monthly_base_payment + fee_monthly
+            for m in range(paid_months):
+                payments.append(Payment(
+                    unit_assessment=ua,
+                    payment_date=start_date + relativedelta(months=m),
+                    amount=installment,
+                    payment_method=rng.choice(['Check', 'ACH', 'Wire']),
+                    reference_number=str(rng.randint(1000, 99999)),
+                ))
+
+        AdditionalFee.objects.bulk_create(fees, batch_size=BATCH_SIZE)
+        payments = Payment.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+
+        # bulk_create skips the signals that maintain the search index and statuses
+        index_units(units)
+        if payments and payments[0].pk is not None:
+            index_payments(payments)
+        refresh_statuses(special_assessment.unit_assessments.all())
+        special_assessments.append(special_assessment)
+
+    return special_assessments
@@ -0,0 +1,65 @@
+"""
+Tabular rows of an assessment, shared by the CSV and XLSX renderers.
+
+Amounts stay Decimals here; each renderer formats them for its medium.
+"""
+import csv
+import io
+from decimal import Decimal
+
+
+SUMMARY_COLUMNS = ['Unit', 'Base Assessment', 'LCE Fees', 'Total Assessment', 'Monthly Base', 'Monthly LCE',
+                   'Total Monthly', 'Total Paid', 'Balance', 'Status']
+
+CENTS = Decimal('0.01')
+
+
+def assessment_table_rows(special_assessment, as_of=None):
+    """One row per unit, in unit number order, with amounts as Decimals"""
+    for ua in special_assessment.unit_assessments.with_totals(as_of).order_by('unit__unit_number'):
+        amounts = [
+            ua.base_assessment_amount,
+            ua.total_lce_fees(),
+            ua.total_assessment_amount(),
+            ua.monthly_base_payment,
+            ua.total_lce_monthly_payment(),
+            ua.total_monthly_payment(),
+            ua.total_paid(),
+            ua.remaining_balance(),
+        ]
+        yield [ua.unit.unit_number] + [Decimal(amount).quantize(CENTS) for amount in amounts] + [ua.payment_status()]
+
+
+def generate_assessment_summary_csv(special_assessment, output=None, as_of=None):
+    """Write the unit table of an assessment as UTF-8 CSV into output if given"""
+    buffer = output if output is not None else io.BytesIO()
+    text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(SUMMARY_COLUMNS)
+    writer.writerows(assessment_table_rows(special_assessment, as_of))
+    text.flush()
+    text.detach()
+    return buffer
+
+
+YEAR_END_COLUMNS = ['Association', 'Assessment', 'Unit', 'Owner', 'Year', 'Paid Before Year', 'Paid In Year',
+                    'Interest Paid', 'Principal Paid', 'Principal Balance']
+
+
+def generate_year_end_csv(summary, output=None, header=True):
+    """Write a year_end_summary as UTF-8 CSV into output if given"""
+    buffer = output if output is not None else io.BytesIO()
+    text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    if header:
+        writer.writerow(YEAR_END_COLUMNS)
+    special_assessment = summary.special_assessment
+    for row in summary.rows:
+        unit = row.unit_assessment.unit
+        writer.writerow([
+            special_assessment.association.name, special_assessment.name, unit.unit_number, unit.owner_name,
+            summary.year, row.paid_before, row.paid, row.interest, row.principal, row.principal_balance,
+        ])
+    text.flush()
+    text.detach()
+    return buffer
@@ -1,3 +1,904 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from importlib import import_module
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from hoa_management import routers
+
+from . import search
+from .allocation import allocate_assessment, largest_remainder
+from .amortization import annuity_factor, interest_paid, interest_schedule, monthly_payment, monthly_rate
+from .archive import archive_assessment, restore_assessment
+from .events import event_stream
+from .integrity import check_assessments
+from .late_fees import accrue_late_fees
+from .loadtest import drive_endpoint, percentile
+from .mailing import create_mailing, send_mailing
+from .models import (Association, SpecialAssessment, Unit, UnitAssessment, AdditionalFee, ArchivedAdditionalFee, Payment, ArchivedPayment, LateFee, LateFeeRule,
+                     AssessmentEvent, SearchEntry)
+from .reconciliation import Deposit, ReconciliationIndex, read_deposits
+from .scenarios import AssessmentSnapshot, Scenario, UnitSnapshot, parse_scenarios, run_scenarios
+from .snapshots import build_snapshots
+from .statuses import refresh_unit_statuses
+from .synthetic import scratch_database
+from .views import PAYMENTS_PER_PAGE
+from .yearend import year_end_summary
+
+
+class SQLiteProductionModeStressTest(SimpleTestCase):
+    """Parallel readers and writers against the production-mode SQLite backend"""
+    alias = 'sqlite_stress'
+    writers = 4
+    readers = 4
+    writes_per_writer = 50
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        connections.settings[self.alias] = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'hoa_management.sqlite_backend',
+            'NAME': os.path.join(self.directory.name, 'stress.sqlite3'),
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+            'TEST': {},
+        }
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO counter (id, value) VALUES (1, 0)')
+            cursor.execute('CREATE TABLE ledger (id INTEGER PRIMARY KEY, amount INTEGER NOT NULL)')
+
+    def tearDown(self):
+        connections[self.alias].close()
+        del connections.settings[self.alias]
+        self.directory.cleanup()
+
+    def test_parallel_readers_and_writers(self):
+        errors = []
+        writers_done = threading.Event()
+
+        def writer():
+            try:
+                for _ in range(self.writes_per_writer):
+                    # Read-then-write inside one transaction: without BEGIN
+                    # IMMEDIATE this is where "database is locked" shows up.
+                    with transaction.atomic(using=self.alias):
+                        with connections[self.alias].cursor() as cursor:
+                            cursor.execute('SELECT value FROM counter WHERE id = 1')
+                            value = cursor.fetchone()[0]
+                            cursor.execute('UPDATE counter SET value = %s WHERE id = 1', [value + 1])
+                            cursor.execute('INSERT INTO ledger (amount) VALUES (1)')
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[self.alias].close()
+
+        def reader():
+            try:
+                while not writers_done.is_set():
+                    with connections[self.alias].cursor() as cursor:
+                        cursor.execute('SELECT (SELECT value FROM counter WHERE id = 1), (SELECT COUNT(*) FROM ledger)')
+                        value, rows = cursor.fetchone()
+                    if value != rows:
+                        errors.append(AssertionError(f'Inconsistent snapshot: counter={value} ledger={rows}'))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections[self.alias].close()
+
+        writer_threads = [threading.Thread(target=writer) for _ in range(self.writers)]
+        reader_threads = [threading.Thread(target=reader) for _ in range(self.readers)]
+        for thread in reader_threads + writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        writers_done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('SELECT value FROM counter WHERE id = 1')
+            self.assertEqual(cursor.fetchone()[0], self.writers * self.writes_per_writer)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Reporting reads go to the replica only while it answers"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'replica.sqlite3')
+        connections.settings[routers.REPLICA_ALIAS] = {
+            **connections['default'].settings_dict,
+            'NAME': f'file:{self.path}?mode=ro',
+            'TEST': {},
+        }
+        routers._replica_up_until = routers._replica_down_until = 0.0
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        connections[routers.REPLICA_ALIAS].close()
+        del connections[routers.REPLICA_ALIAS]
+        del connections.settings[routers.REPLICA_ALIAS]
+        routers._replica_up_until = routers._replica_down_until = 0.0
+        self.directory.cleanup()
+
+    def reporting_read(self):
+        with routers.reporting_reads():
+            return self.router.db_for_read(Payment)
+
+    def migrate_replica(self):
+        with sqlite3.connect(self.path) as replica:
+            replica.execute('CREATE TABLE django_migrations (id INTEGER PRIMARY KEY)')
+
+    def test_missing_replica_is_not_created(self):
+        self.assertEqual(self.reporting_read(), 'default')
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unmigrated_replica_is_skipped(self):
+        sqlite3.connect(self.path).close()
+        self.assertEqual(self.reporting_read(), 'default')
+
+    def test_migrated_replica_serves_reporting_reads(self):
+        self.migrate_replica()
+        with routers.unit_of_work():
+            self.assertEqual(self.reporting_read(), routers.REPLICA_ALIAS)
+            self.assertEqual(self.router.db_for_read(Payment), 'default')
+
+    def test_writes_pin_reads_until_the_unit_of_work_ends(self):
+        self.migrate_replica()
+        with routers.unit_of_work():
+            self.router.db_for_write(Payment)
+            self.assertEqual(self.reporting_read(), 'default')
+            with routers.unit_of_work():
+                self.assertEqual(self.reporting_read(), routers.REPLICA_ALIAS)
+        with routers.unit_of_work():
+            self.assertEqual(self.reporting_read(), routers.REPLICA_ALIAS)
+
+
+class LoadTestHarnessTests(SimpleTestCase):
+    """The scratch database and request driver behind the load_test command"""
+    alias = 'load_test_source'
+    mirror = 'load_test_replica'
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        test_settings = {**connections['default'].settings_dict['TEST'], 'NAME': None}
+        for alias, mirror in [(self.alias, None), (self.mirror, self.alias)]:
+            connections.settings[alias] = {
+                **connections['default'].settings_dict,
+                'NAME': os.path.join(self.directory.name, f'{alias}.sqlite3'),
+                'TEST': {**test_settings, 'MIRROR': mirror},
+            }
+
+    def tearDown(self):
+        for alias in (self.alias, self.mirror):
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        self.directory.cleanup()
+
+    def test_scratch_database_serves_mirrored_reads(self):
+        replica_name = connections.settings[self.mirror]['NAME']
+        scratch = os.path.join(self.directory.name, 'scratch.sqlite3')
+        with scratch_database(self.alias, name=scratch):
+            self.assertEqual(connections[self.mirror].settings_dict['NAME'], scratch)
+            Association.objects.using(self.alias).create(name='Scratch HOA')
+            self.assertEqual(list(Association.objects.using(self.mirror).values_list('name', flat=True)), ['Scratch HOA'])
+        self.assertEqual(connections.settings[self.mirror]['NAME'], replica_name)
+        self.assertFalse(os.path.exists(scratch))
+
+    def test_drive_endpoint_counts_errors_and_queries(self):
+        class Driver:
+            def get(self, path):
+                return (200, 3) if path == '/ok/' else (500, None)
+
+        stats = drive_endpoint(Driver(), 'mixed', ['/ok/', '/broken/'], requests=10, concurrency=3)
+        self.assertEqual((stats.requests, stats.errors, stats.queries), (10, 5, 3))
+        self.assertLessEqual(stats.p50, stats.p95)
+        self.assertLessEqual(stats.p95, stats.p99)
+
+    def test_percentile_is_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual([percentile(ordered, fraction) for fraction in (0.5, 0.95, 0.99, 1.0)], [50, 95, 99, 100])
+        self.assertEqual(percentile([7], 0.99), 7)
+
+
+class InstallmentScheduleTests(SimpleTestCase):
+    """Due dates step one month at a time from the start date"""
+
+    def test_month_end_start_keeps_the_shortest_day_passed(self):
+        special_assessment = SpecialAssessment(start_date=date(2024, 1, 31), loan_period_months=24)
+        dates = special_assessment.installment_dates()
+        self.assertEqual(dates[:4], (date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 29), date(2024, 4, 29)))
+        self.assertEqual(dates[13], date(2025, 2, 28))
+        self.assertEqual(dates[14], date(2025, 3, 28))
+        self.assertEqual(special_assessment.installments_due(date(2024, 3, 28)), 2)
+        self.assertEqual(special_assessment.installments_due(date(2024, 3, 29)), 3)
+        self.assertEqual(special_assessment.installments_due(date(2024, 4, 30)), 4)
+
+    def test_count_is_bounded_by_the_term(self):
+        special_assessment = SpecialAssessment(start_date=date(2024, 1, 1), loan_period_months=12)
+        self.assertEqual(special_assessment.installments_due(date(2023, 12, 31)), 0)
+        self.assertEqual(special_assessment.installments_due(date(2024, 1, 1)), 1)
+        self.assertEqual(special_assessment.installments_due(date(2030, 1, 1)), 12)
+
+
+class AmortizationTests(SimpleTestCase):
+
+    def float_payment(self, principal, annual_rate, months):
+        """The float formula calculate_monthly_payment used before amortization.monthly_payment"""
+        r = float(monthly_rate(annual_rate))
+        if r == 0:
+            return Decimal(principal / months).quantize(Decimal('0.01'))
+        return Decimal(float(principal) * (r * math.pow(1 + r, months)) / (math.pow(1 + r, months) - 1)).quantize(Decimal('0.01'))
+
+    def test_zero_rate_splits_the_principal_evenly(self):
+        self.assertEqual(annuity_factor(monthly_rate(0), 8), Decimal('0.125'))
+        self.assertEqual(monthly_payment(Decimal('1000.00'), Decimal('0.00'), 12), Decimal('83.33'))
+        self.assertEqual(monthly_payment(Decimal('0.00'), Decimal('6.00'), 12), Decimal('0.00'))
+
+    def test_cents_round_half_up(self):
+        # 1.00 / 8 = 0.125 and 0.20 / 8 = 0.025 exactly; half-even would round both down
+        self.assertEqual(monthly_payment(Decimal('1.00'), Decimal('0.00'), 8), Decimal('0.13'))
+        self.assertEqual(monthly_payment(Decimal('0.20'), Decimal('0.00'), 8), Decimal('0.03'))
+
+    def test_matches_the_float_formula_on_the_fixture(self):
+        # The AssessmentTestCase and synthetic portfolio amounts and terms
+        cases = [(Decimal('10000.00'), Decimal('6.00'), 12), (Decimal('500.00'), Decimal('6.00'), 12),
+                 (Decimal('100000.00'), Decimal('6.00'), 12), (Decimal('33225.68'), Decimal('8.38'), 240)]
+        for principal, annual_rate, months in cases:
+            self.assertEqual(monthly_payment(principal, annual_rate, months), self.float_payment(principal, annual_rate, months))
+        self.assertEqual(monthly_payment(Decimal('100000.00'), Decimal('6.00'), 12), Decimal('8606.64'))
+
+
+class AssessmentTestCase(TestCase):
+    """An association of units sharing one special assessment"""
+    units = 6
+
+    def setUp(self):
+        self.association = Association.objects.create(name='Test HOA')
+        self.special_assessment = SpecialAssessment.objects.create(
+            association=self.association, name='2024 Special Assessment', total_loan_amount=Decimal('100000.00'),
+            interest_rate=Decimal('6.00'), loan_period_months=12, monthly_loan_payment=Decimal('8606.64'),
+            start_date=date(2024, 1, 1),
+        )
+        self.unit_assessments = []
+        for index in range(self.units):
+            unit = Unit.objects.create(association=self.association, unit_number=f'A{index + 1}')
+            self.unit_assessments.append(UnitAssessment.objects.create(
+                unit=unit, special_assessment=self.special_assessment, base_assessment_amount=Decimal('10000.00'),
+                payment_option=UnitAssessment.PAYMENT_OPTION_LUMP if index == 0 else UnitAssessment.PAYMENT_OPTION_MONTHLY,
+            ))
+        AdditionalFee.objects.create(unit_assessment=self.unit_assessments[1], fee_type='Deck', fee_amount=Decimal('500.00'))
+
+    def pay_off(self):
+        """Pay every unit in full on the first due date"""
+        for ua in UnitAssessment.objects.with_totals():
+            total = ua.total_assessment_amount() if ua.payment_option == ua.PAYMENT_OPTION_LUMP else ua.total_monthly_payment() * 12
+            Payment.objects.create(unit_assessment=ua, payment_date=date(2024, 1, 1), amount=total)
+        self.special_assessment.refresh_from_db()
+
+
+class ArchiveTests(AssessmentTestCase):
+
+    def balances(self, as_of=None):
+        return [(ua.pk, ua.total_paid(), ua.total_assessment_amount(), ua.remaining_balance())
+                for ua in UnitAssessment.objects.with_totals(as_of).order_by('pk')]
+
+    def test_archive_and_restore_round_trip(self):
+        self.pay_off()
+        before, payment_ids = self.balances(), sorted(Payment.objects.values_list('pk', flat=True))
+
+        archive_assessment(self.special_assessment)
+        self.assertEqual(Payment.objects.count(), 0)
+        self.assertEqual(AdditionalFee.objects.count(), 0)
+        self.assertEqual(sorted(ArchivedPayment.objects.values_list('pk', flat=True)), payment_ids)
+        self.assertEqual(self.balances(), before)
+
+        restore_assessment(SpecialAssessment.objects.get())
+        self.assertEqual(ArchivedPayment.objects.count(), 0)
+        self.assertEqual(sorted(Payment.objects.values_list('pk', flat=True)), payment_ids)
+        self.assertEqual(self.balances(), before)
+
+    def test_snapshots_built_after_archiving_include_archived_payments(self):
+        self.pay_off()
+        as_of = date(2024, 6, 15)
+        before = self.balances(as_of)
+
+        archive_assessment(self.special_assessment)
+        self.assertGreater(build_snapshots(through=date(2024, 5, 31)), 0)
+        self.assertEqual(self.balances(as_of), before)
+
+        restore_assessment(SpecialAssessment.objects.get())
+        self.assertEqual(self.balances(as_of), before)
+
+    def test_archived_assessment_rejects_new_payments_and_fees(self):
+        self.pay_off()
+        archive_assessment(self.special_assessment)
+        ua = UnitAssessment.objects.get(pk=self.unit_assessments[2].pk)
+
+        payment = Payment(unit_assessment_id=ua.pk, payment_date=date(2025, 1, 1), amount=Decimal('10.00'))
+        with self.assertRaises(ValidationError):
+            payment.full_clean()
+        with self.assertRaises(ValidationError):
+            payment.save()
+        with self.assertRaises(ValidationError):
+            AdditionalFee.objects.create(unit_assessment=ua, fee_type='Skylight', fee_amount=Decimal('100.00'))
+        self.assertEqual(Payment.objects.count() + AdditionalFee.objects.count(), 0)
+
+
+class LateFeeTests(AssessmentTestCase):
+    run_date = date(2024, 3, 20)
+
+    def setUp(self):
+        super().setUp()
+        LateFeeRule.objects.create(special_assessment=self.special_assessment, grace_days=15, flat_fee=Decimal('25.00'))
+        # Unit A3 is current through March; everyone else has paid nothing
+        current = self.unit_assessments[2]
+        Payment.objects.create(unit_assessment=current, payment_date=date(2024, 1, 1),
+                               amount=current.total_monthly_payment() * 3)
+
+    def test_accrues_one_fee_per_delinquent_unit(self):
+        fees = accrue_late_fees(self.run_date)
+        charged = {ua.pk for ua in self.unit_assessments} - {self.unit_assessments[2].pk}
+        self.assertEqual({fee.unit_assessment_id for fee in fees}, charged)
+        self.assertEqual({fee.period for fee in fees}, {date(2024, 3, 1)})
+        self.assertEqual({fee.amount for fee in fees}, {Decimal('25.00')})
+        self.assertEqual(LateFee.objects.count(), len(charged))
+
+    def test_dry_run_writes_nothing(self):
+        self.assertEqual(len(accrue_late_fees(self.run_date, dry_run=True)), self.units - 1)
+        self.assertEqual(LateFee.objects.count(), 0)
+
+    def test_rerun_and_concurrent_run_do_not_double_charge(self):
+        pending = accrue_late_fees(self.run_date, dry_run=True)
+        accrue_late_fees(self.run_date)
+        self.assertEqual(accrue_late_fees(self.run_date), [])
+        # A run that computed its fees before this one committed is absorbed by ignore_conflicts
+        LateFee.objects.bulk_create(pending, ignore_conflicts=True)
+        self.assertEqual(LateFee.objects.count(), self.units - 1)
+
+    def test_late_fees_are_reported_apart_from_the_balance(self):
+        before = {ua.pk: ua.remaining_balance() for ua in UnitAssessment.objects.with_totals()}
+        accrue_late_fees(self.run_date)
+        LateFee.objects.filter(unit_assessment=self.unit_assessments[1]).update(waived=True)
+
+        for ua in UnitAssessment.objects.with_totals():
+            expected = Decimal('0.00') if ua.pk in (self.unit_assessments[1].pk, self.unit_assessments[2].pk) else Decimal('25.00')
+            self.assertEqual(ua.total_late_fees(), expected)
+            self.assertEqual(UnitAssessment.objects.get(pk=ua.pk).total_late_fees(), expected)
+            self.assertEqual(ua.remaining_balance(), before[ua.pk])
+        for ua in UnitAssessment.objects.with_totals(date(2024, 2, 29)):
+            self.assertEqual(ua.total_late_fees(), Decimal('0.00'))
+
+
+class AllocationTests(AssessmentTestCase):
+
+    def test_largest_remainder_is_penny_exact(self):
+        weights = [Decimal('1.37'), Decimal('0.91'), Decimal('2.05'), Decimal('0.33'), Decimal('1.00')]
+        for total in [Decimal('0.01'), Decimal('100.00'), Decimal('3500000.00'), Decimal('12345.67')]:
+            shares = largest_remainder(total, weights)
+            self.assertEqual(sum(shares), total)
+            self.assertTrue(all(share == share.quantize(Decimal('0.01')) for share in shares))
+
+    def test_leftover_cents_go_to_earlier_units_on_ties(self):
+        self.assertEqual(largest_remainder(Decimal('100.00'), [1, 1, 1]),
+                         [Decimal('33.34'), Decimal('33.33'), Decimal('33.33')])
+        self.assertEqual(largest_remainder(Decimal('0.02'), [1, 1, 1]),
+                         [Decimal('0.01'), Decimal('0.01'), Decimal('0.00')])
+
+    def test_units_without_allocation_cannot_be_split(self):
+        with self.assertRaises(ValueError):
+            largest_remainder(Decimal('100.00'), [0, 0])
+
+    def test_dry_run_writes_nothing(self):
+        result = allocate_assessment(self.special_assessment, total=Decimal('60000.01'), dry_run=True)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 1, 5))
+        self.assertEqual(sorted(UnitAssessment.objects.values_list('base_assessment_amount', flat=True)),
+                         [Decimal('10000.00')] * self.units)
+
+    def test_splits_created_updated_and_unchanged_units(self):
+        Unit.objects.create(association=self.association, unit_number='A7')
+        result = allocate_assessment(self.special_assessment, total=Decimal('70000.01'))
+        self.assertEqual((result.created, result.updated, result.unchanged), (1, 1, 5))
+
+        rows = UnitAssessment.objects.order_by('unit__unit_number')
+        self.assertEqual([ua.base_assessment_amount for ua in rows], [Decimal('10000.01')] + [Decimal('10000.00')] * 6)
+        self.assertEqual(sum(ua.base_assessment_amount for ua in rows), result.total)
+        for ua in rows:
+            # Priced as UnitAssessment.save() would price it
+            expected = (self.special_assessment.calculate_monthly_payment(ua.base_assessment_amount)
+                        if ua.payment_option == UnitAssessment.PAYMENT_OPTION_MONTHLY else Decimal('0.00'))
+            self.assertEqual(ua.monthly_base_payment, expected)
+        self.special_assessment.refresh_from_db()
+        self.assertEqual(self.special_assessment.total_base_assessment, Decimal('70000.01'))
+
+        rerun = allocate_assessment(self.special_assessment, total=Decimal('70000.01'))
+        self.assertEqual((rerun.created, rerun.updated, rerun.unchanged), (0, 0, 7))
+
+
+class VerifyAssessmentsTests(AssessmentTestCase):
+
+    def fields(self):
+        return {discrepancy.field: discrepancy for discrepancy in check_assessments().discrepancies}
+
+    def verify(self, *args):
+        output = StringIO()
+        call_command('verify_assessments', *args, stdout=output)
+        return output.getvalue()
+
+    def test_fix_writes_derived_values_and_exits_cleanly(self):
+        ua = self.unit_assessments[3]
+        UnitAssessment.objects.filter(pk=ua.pk).update(monthly_base_payment=Decimal('1.00'))
+        self.assertEqual(set(self.fields()), {'total_base_assessment', 'total_lce_assessments', 'monthly_base_payment',
+                                              'total_loan_amount', 'loan payment shortfall', 'rounding drift'})
+        with self.assertRaises(CommandError):
+            self.verify()
+
+        # Only the loan terms are left, and they are report only
+        self.verify('--fix')
+        self.special_assessment.refresh_from_db()
+        self.assertEqual(self.special_assessment.total_base_assessment, Decimal('60000.00'))
+        self.assertEqual(self.special_assessment.total_lce_assessments, Decimal('500.00'))
+        self.assertEqual(UnitAssessment.objects.get(pk=ua.pk).monthly_base_payment, ua.monthly_base_payment)
+        self.assertEqual(set(self.fields()), {'total_loan_amount', 'loan payment shortfall'})
+        self.assertIn('(report only)', self.verify())
+
+    def test_monthly_rows_short_of_the_loan_payment_are_flagged(self):
+        shortfall = self.fields()['loan payment shortfall']
+        self.assertEqual(shortfall.expected, self.special_assessment.monthly_loan_payment)
+        self.assertFalse(shortfall.fixable)
+
+        SpecialAssessment.objects.filter(pk=self.special_assessment.pk).update(monthly_loan_payment=shortfall.stored)
+        self.assertNotIn('loan payment shortfall', self.fields())
+
+    def test_archived_fees_count_towards_the_loan_payment(self):
+        SpecialAssessment.objects.filter(pk=self.special_assessment.pk).update(
+            monthly_loan_payment=self.fields()['loan payment shortfall'].stored)
+        self.pay_off()
+        archive_assessment(self.special_assessment)
+        self.assertNotIn('loan payment shortfall', self.fields())
+        self.assertEqual(check_assessments().fees, 1)
+
+        # A mismatched archived fee is reported, but fixing it would write to the archive
+        ArchivedAdditionalFee.objects.update(monthly_payment=Decimal('1.00'))
+        fee = self.fields()['monthly_payment']
+        self.assertEqual((fee.model, fee.fixable), ('ArchivedAdditionalFee', False))
+
+
+class LedgerExportTests(AssessmentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for month, ua in enumerate(self.unit_assessments[1:4], start=1):
+            Payment.objects.create(unit_assessment=ua, payment_date=date(2024, month, 5), amount=Decimal('100.00'),
+                                   reference_number=f'CHK-{month}')
+        self.client.force_login(User.objects.create_user('auditor', is_staff=True))
+
+    def export(self, **params):
+        response = self.client.get(reverse('assessments:export_ledger'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_lists_every_payment_oldest_first(self):
+        rows = list(csv.DictReader(self.export().decode().splitlines()))
+        self.assertEqual([row['reference_number'] for row in rows], ['CHK-1', 'CHK-2', 'CHK-3'])
+        self.assertEqual(rows[0]['unit'], 'A2')
+        self.assertEqual(rows[0]['association'], 'Test HOA')
+
+    def test_date_range_json_lines_and_gzip(self):
+        body = gzip.decompress(self.export(format='jsonl', gzip='1', start='2024-02-01', end='2024-03-31'))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(row['reference_number'], row['payment_date']) for row in rows],
+                         [('CHK-2', '2024-02-05'), ('CHK-3', '2024-03-05')])
+
+    def test_archived_payments_are_included(self):
+        self.pay_off()
+        before = self.export()
+        archive_assessment(self.special_assessment)
+        self.assertEqual(self.export(), before)
+
+    def test_rejects_bad_parameters_and_non_staff(self):
+        url = reverse('assessments:export_ledger')
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2024-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'association': 'x'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class PeriodStatementTests(AssessmentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ua = self.unit_assessments[1]
+        for month in (1, 2, 3):
+            Payment.objects.create(unit_assessment=self.ua, payment_date=date(2024, month, 5), amount=Decimal('100.00'))
+
+    def test_period_summary_balances(self):
+        for snapshots in (False, True):
+            if snapshots:
+                build_snapshots(through=date(2024, 3, 31))
+            period = UnitAssessment.objects.get(pk=self.ua.pk).period_summary(date(2024, 2, 1), date(2024, 2, 29))
+            self.assertEqual((period['opening_paid'], period['period_paid'], period['closing_paid']),
+                             (Decimal('100.00'), Decimal('100.00'), Decimal('200.00')))
+            self.assertEqual(period['opening_balance'], self.ua.remaining_balance(date(2024, 1, 31)))
+            self.assertEqual(period['closing_balance'], self.ua.remaining_balance(date(2024, 2, 29)))
+
+    def test_unit_page_lists_only_the_period_payments(self):
+        url = reverse('assessments:unit_assessment_detail', args=[self.ua.pk])
+        response = self.client.get(url, {'start': '2024-02-01', 'as_of': '2024-02-29'})
+        self.assertEqual([payment.payment_date for payment in response.context['payments']], [date(2024, 2, 5)])
+        self.assertEqual(response.context['period']['period_paid'], Decimal('100.00'))
+
+        response = self.client.get(reverse('assessments:download_unit_statement_pdf', args=[self.ua.pk]),
+                                   {'start': '2024-02-01', 'as_of': '2024-02-29'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    def test_payment_history_is_paginated_with_the_filters_kept(self):
+        Payment.objects.bulk_create([
+            Payment(unit_assessment=self.ua, payment_date=date(2024, 4, 1) + timedelta(days=day), amount=Decimal('1.00'))
+            for day in range(PAYMENTS_PER_PAGE)
+        ])
+        url = reverse('assessments:unit_assessment_detail', args=[self.ua.pk])
+        response = self.client.get(url, {'as_of': '2024-12-31', 'page': '2'})
+        page = response.context['payments']
+        self.assertEqual((page.number, page.paginator.count, len(page)), (2, PAYMENTS_PER_PAGE + 3, 3))
+        self.assertEqual(response.context['filter_query'], 'as_of=2024-12-31')
+
+
+class MailingTests(AssessmentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Unit.objects.filter(unit_number='A1').update(owner_name='Pat Lee', owner_email='pat@example.com')
+
+    def test_message_braces_other_than_placeholders_are_sent_as_written(self):
+        mailing = create_mailing(self.special_assessment, 'Your statement',
+                                 message='Hi {owner}, unit {unit} owes {amount} {0} {{x}} {')
+        self.assertEqual(send_mailing(mailing), (1, 0))
+        self.assertEqual(mail.outbox[0].body, 'Hi Pat Lee, unit A1 owes {amount} {0} {{x}} {')
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'Unit_A1_Statement.pdf')
+
+    def test_default_message(self):
+        send_mailing(create_mailing(self.special_assessment, 'Your statement'))
+        self.assertIn('Dear Pat Lee,', mail.outbox[0].body)
+        self.assertIn('2024 Special Assessment, Unit A1', mail.outbox[0].body)
+
+
+class ConsolidatedStatementsCommandTests(AssessmentTestCase):
+
+    def test_counts_the_queries_of_the_read_connection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = StringIO()
+            call_command('consolidated_statements', association=self.association.pk, output=directory, stdout=output)
+            self.assertEqual(len(os.listdir(directory)), self.units)
+        self.assertIn(f'Wrote {self.units} statements', output.getvalue())
+        self.assertIn('from 4 queries on default', output.getvalue())
+
+
+class AssessmentEventTests(AssessmentTestCase):
+
+    def post_payment(self, ua, amount):
+        return Payment.objects.create(unit_assessment=ua, payment_date=date(2024, 1, 5), amount=amount)
+
+    def test_payment_publishes_its_totals(self):
+        ua = self.unit_assessments[0]
+        before = UnitAssessment.objects.with_totals().get(pk=ua.pk).remaining_balance()
+        with CaptureQueriesContext(connection) as queries:
+            payment = self.post_payment(ua, Decimal('2500.00'))
+        # Index, snapshots, status refresh and both events
+        self.assertLessEqual(len(queries), 10)
+
+        event = AssessmentEvent.objects.get(kind=AssessmentEvent.KIND_PAYMENT_POSTED)
+        after = UnitAssessment.objects.with_totals().get(pk=ua.pk).remaining_balance()
+        self.assertEqual(event.special_assessment_id, self.special_assessment.pk)
+        self.assertEqual(event.payload['payment_id'], payment.pk)
+        self.assertEqual(event.payload['total_paid'], '2500.00')
+        self.assertEqual(Decimal(event.payload['remaining_balance']), after)
+        self.assertEqual(Decimal(event.payload['remaining_change']), after - before)
+
+    def test_monthly_balance_change_is_the_payoff_change(self):
+        ua = self.unit_assessments[2]
+        before = UnitAssessment.objects.with_totals().get(pk=ua.pk).remaining_balance()
+        self.post_payment(ua, ua.total_monthly_payment() * 3)
+        event = AssessmentEvent.objects.get(kind=AssessmentEvent.KIND_PAYMENT_POSTED)
+        after = UnitAssessment.objects.with_totals().get(pk=ua.pk).remaining_balance()
+        self.assertEqual(Decimal(event.payload['remaining_change']), after - before)
+        self.assertNotEqual(after - before, -ua.total_monthly_payment() * 3)
+
+    def test_status_change_is_published(self):
+        ua = self.unit_assessments[3]
+        self.post_payment(ua, Decimal('100.00'))
+        AssessmentEvent.objects.all().delete()
+        self.post_payment(ua, ua.total_monthly_payment() * 12)
+        event = AssessmentEvent.objects.get(kind=AssessmentEvent.KIND_STATUS_CHANGED)
+        self.assertEqual((event.payload['previous_status'], event.payload['status']), ('Behind', 'Paid in Full'))
+        self.assertEqual(UnitAssessment.objects.get(pk=ua.pk).status, 'Paid in Full')
+
+    async def collect(self, **kwargs):
+        return [chunk async for chunk in event_stream(poll_seconds=0.01, max_seconds=0.05,
+                                                      special_assessment_id=self.special_assessment.pk, **kwargs)]
+
+    async def test_stream_resumes_after_last_event_id(self):
+        for ua in self.unit_assessments[1:4]:
+            await Payment.objects.acreate(unit_assessment=ua, payment_date=date(2024, 1, 5), amount=Decimal('10.00'))
+        ids = [event.pk async for event in AssessmentEvent.objects.order_by('id')]
+
+        chunks = await self.collect(last_event_id=ids[1])
+        self.assertTrue(chunks[0].startswith('retry:'))
+        self.assertEqual([chunk.split('\n')[0] for chunk in chunks[1:]], [f'id: {pk}' for pk in ids[2:]])
+        # Without a last id the stream starts from now
+        self.assertEqual(len(await self.collect()), 1)
+
+    def test_wsgi_pages_poll_instead_of_streaming(self):
+        self.post_payment(self.unit_assessments[1], Decimal('10.00'))
+        ids = list(AssessmentEvent.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(self.client.get(reverse('assessments:assessment_events', args=[self.special_assessment.pk])).status_code, 204)
+        response = self.client.get(reverse('assessments:assessment_event_poll', args=[self.special_assessment.pk]), {'after': ids[0]})
+        self.assertEqual([event['id'] for event in response.json()['events']], ids[1:])
+        self.assertEqual(response.json()['last_event_id'], ids[-1])
+        page = self.client.get(reverse('assessments:assessment_detail', args=[self.special_assessment.pk]))
+        self.assertEqual(page.context['last_event_id'], ids[-1])
+        self.assertFalse(page.context['live_stream'])
+
+
+class YearEndTests(AssessmentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ua = UnitAssessment.objects.with_totals().get(pk=self.unit_assessments[2].pk)
+        self.installment = self.ua.total_monthly_payment()
+        starts, before, interest = interest_schedule(
+            self.ua.total_assessment_amount(), self.installment,
+            monthly_rate(self.special_assessment.interest_rate), self.special_assessment.loan_period_months)
+        self.total_interest = before[-1] + interest[-1]
+        self.payoff = self.ua.total_assessment_amount() + self.total_interest
+
+    def row(self, year):
+        summary = year_end_summary(self.special_assessment, year)
+        return next(row for row in summary.rows if row.unit_assessment.pk == self.ua.pk)
+
+    def pay(self, day, amount):
+        Payment.objects.create(unit_assessment=self.ua, payment_date=day, amount=amount)
+
+    def test_cumulative_interest_never_falls_through_payoff(self):
+        installment = monthly_payment(Decimal('10000.00'), Decimal('8.38'), 240)
+        args = (Decimal('10000.00'), installment, Decimal('8.38'), 240)
+        scheduled = installment * 240
+        self.assertLessEqual(interest_paid(scheduled - Decimal('0.01'), *args), interest_paid(scheduled, *args))
+        previous = Decimal('0.00')
+        for paid in range(0, int(scheduled) + 200, 37):
+            interest = interest_paid(Decimal(paid), *args)
+            self.assertGreaterEqual(interest, previous)
+            previous = interest
+
+    def test_payoff_year_reports_the_last_installment_interest(self):
+        for month in range(1, 12):
+            self.pay(date(2024, month, 1), self.installment)
+        self.pay(date(2025, 1, 1), self.payoff - self.installment * 11)
+
+        first, payoff_year = self.row(2024), self.row(2025)
+        self.assertGreater(payoff_year.interest, Decimal('0.00'))
+        self.assertEqual(first.interest + payoff_year.interest, self.total_interest)
+        self.assertEqual(first.principal + payoff_year.principal, self.ua.total_assessment_amount())
+        self.assertEqual(payoff_year.principal_balance, Decimal('0.00'))
+
+    def test_small_final_payment_is_never_negative_interest(self):
+        self.pay(date(2024, 6, 1), self.payoff - Decimal('0.50'))
+        self.pay(date(2025, 1, 1), Decimal('0.50'))
+        payoff_year = self.row(2025)
+        self.assertGreaterEqual(payoff_year.interest, Decimal('0.00'))
+        self.assertEqual(self.row(2024).interest + payoff_year.interest, self.total_interest)
+
+
+class StoredStatusTests(AssessmentTestCase):
+
+    def stored(self):
+        return {ua.pk: (ua.status, ua.days_delinquent, ua.amount_past_due) for ua in UnitAssessment.objects.all()}
+
+    def computed(self):
+        return {ua.pk: ua.delinquency() for ua in UnitAssessment.objects.with_totals()}
+
+    def test_refresh_stores_the_computed_status(self):
+        self.pay_off()
+        # Queryset updates skip the signals that keep the columns current
+        Payment.objects.filter(unit_assessment=self.unit_assessments[2]).update(amount=Decimal('1.00'))
+        UnitAssessment.objects.update(status='', days_delinquent=0, amount_past_due=Decimal('0.00'))
+
+        ids = [ua.pk for ua in self.unit_assessments]
+        self.assertEqual(refresh_unit_statuses(ids), len(ids))
+        self.assertEqual(self.stored(), self.computed())
+        self.assertEqual(UnitAssessment.objects.get(pk=ids[2]).status, 'Behind')
+        self.assertEqual(refresh_unit_statuses(ids), 0)
+
+    def test_backfill_migration_stores_the_computed_status(self):
+        Payment.objects.create(unit_assessment=self.unit_assessments[0], payment_date=date(2024, 1, 1), amount=Decimal('100.00'))
+        archive_assessment(self.special_assessment)
+        UnitAssessment.objects.update(status='', days_delinquent=0, amount_past_due=Decimal('0.00'))
+
+        migration = import_module('assessments.migrations.0010_backfill_statuses')
+        migration.backfill_statuses(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.stored(), self.computed())
+        self.assertNotIn('', {status for status, _, _ in self.stored().values()})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rollup-tests'}})
+class RollupCacheTests(AssessmentTestCase):
+
+    def version(self):
+        return SpecialAssessment.objects.values_list('cache_version', flat=True).get()
+
+    def page(self, **params):
+        return self.client.get(reverse('assessments:assessment_detail', args=[self.special_assessment.pk]), params)
+
+    def test_version_bumps_only_after_commit(self):
+        before = self.version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Payment.objects.create(unit_assessment=self.unit_assessments[2], payment_date=date(2024, 1, 1), amount=Decimal('10.00'))
+            self.assertEqual(self.version(), before)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(self.version(), before)
+
+    def test_cached_rows_match_the_units(self):
+        rows = self.page().context['unit_assessments']
+        expected = UnitAssessment.objects.with_totals()
+        self.assertEqual([row['id'] for row in rows], [ua.pk for ua in expected])
+        self.assertEqual([(row['total_assessment_amount'], row['remaining_balance'], row['status']) for row in rows],
+                         [(ua.total_assessment_amount(), ua.remaining_balance(), ua.status) for ua in expected])
+
+        with CaptureQueriesContext(connection) as cached:
+            self.page()
+        self.assertFalse(any('"assessments_payment"' in query['sql'] for query in cached.captured_queries))
+
+    def test_payment_retires_the_cached_rows(self):
+        ua = self.unit_assessments[2]
+        self.assertEqual(self.page().context['total_paid'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(unit_assessment=ua, payment_date=date(2024, 1, 1), amount=Decimal('25.00'))
+
+        response = self.page()
+        self.assertEqual(response.context['total_paid'], Decimal('25.00'))
+        row = next(row for row in response.context['unit_assessments'] if row['id'] == ua.pk)
+        self.assertEqual(row['total_paid'], Decimal('25.00'))
+
+    def test_status_refresh_retires_the_cached_rows(self):
+        ids = [ua.pk for ua in self.unit_assessments]
+        UnitAssessment.objects.update(status='')
+        self.page()
+        # Like a day's refresh, this changes statuses without touching payments or fees
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_unit_statuses(ids)
+
+        response = self.page(status='Not Paid')
+        self.assertEqual([row['id'] for row in response.context['unit_assessments']],
+                         list(UnitAssessment.objects.filter(status='Not Paid').values_list('pk', flat=True)))
+        self.assertNotIn('', [row['status'] for row in self.page().context['unit_assessments']])
+
+
+class ReconciliationTests(AssessmentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.installment = UnitAssessment.objects.with_totals().get(pk=self.unit_assessments[2].pk).total_monthly_payment()
+
+    def deposit(self, amount, name=''):
+        return Deposit(line=2, date=date(2024, 2, 1), amount=amount, name=name, unit='', reference='', memo='')
+
+    def matched(self, deposit, tolerance=Decimal('1.00'), **kwargs):
+        index = ReconciliationIndex(tolerance=tolerance)
+        return {candidate.unit_number: candidate.reasons for candidate in index.candidates(deposit, limit=10, **kwargs)}
+
+    def test_amounts_match_within_the_tolerance_only(self):
+        shared = {'A3', 'A4', 'A5', 'A6'}
+        self.assertEqual(self.matched(self.deposit(self.installment)), dict.fromkeys(shared, ['amount exact']))
+        self.assertEqual(self.matched(self.deposit(self.installment + Decimal('1.00'))),
+                         dict.fromkeys(shared, ['amount within tolerance']))
+        self.assertEqual(self.matched(self.deposit(self.installment - Decimal('1.01'))), {})
+        self.assertEqual(self.matched(self.deposit(self.installment + Decimal('0.50')), tolerance=Decimal('0.25')), {})
+
+    def test_shared_amount_only_scores_units_found_otherwise(self):
+        Unit.objects.filter(unit_number='A4').update(owner_name='Jane Smith')
+        deposit = self.deposit(self.installment, name='J Smith')
+        self.assertEqual(self.matched(deposit, amount_only_limit=2), {'A4': ['owner name', 'amount exact']})
+        self.assertEqual(self.matched(self.deposit(self.installment), amount_only_limit=2), {})
+        self.assertIn('A5', self.matched(deposit))
+
+    def test_unreadable_rows_are_reported(self):
+        deposits = read_deposits(StringIO(
+            'Date,Amount,Name,Unit\n'
+            '2024-02-01,"$1,000.00",Smith,A4\n'
+            '2024-02-30,100.00,Jones,A5\n'
+            '2024-02-01,inf,Jones,A5\n'
+            '2024-02-01,NaN,Jones,A5\n'
+            '2024-02-01,abc,Jones,A5\n'
+            'Feb 1,100.00,Jones,A5\n'
+        ))
+        self.assertEqual(deposits[0].amount, Decimal('1000.00'))
+        self.assertEqual(deposits[0].error, '')
+        self.assertEqual([bool(deposit.error) for deposit in deposits[1:]], [True] * 5)
+        self.assertEqual({(deposit.date, deposit.amount) for deposit in deposits[1:]}, {(None, None)})
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('date,amount,unit\n2024-02-30,100.00,A5\n2024-02-01,nan,A5\n')
+        self.addCleanup(os.unlink, file.name)
+        self.addCleanup(os.unlink, file.name + '.out')
+        call_command('reconcile_deposits', file.name, output=file.name + '.out', stderr=StringIO())
+        with open(file.name + '.out', newline='') as output:
+            rows = list(csv.reader(output))[1:]
+        self.assertEqual([row[-1].split(':')[0] for row in rows], ['unparseable', 'unparseable'])
+
+
+class ScenarioTests(AssessmentTestCase):
+
+    def test_non_finite_values_are_rejected(self):
+        for text in ('nan, 12, 0', 'inf, 12, 0', '6, 12, NaN', '6, 12, -Infinity'):
+            with self.assertRaisesRegex(ValueError, 'Line 1: could not parse'):
+                parse_scenarios(text)
+
+        self.client.force_login(User.objects.create_superuser('treasurer'))
+        response = self.client.get(reverse('admin:assessments_specialassessment_scenarios', args=[self.special_assessment.pk]),
+                                   {'scenarios': '6, 12, 0\nnan, 12, 0', 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Line 2', response.json()['error'])
+
+    def test_current_terms_reproduce_the_stored_payments(self):
+        result, = run_scenarios(self.special_assessment, [AssessmentSnapshot.load(self.special_assessment).current_scenario()])
+        # Lump sum units store no installment, so only the monthly units are compared
+        unit_assessments = UnitAssessment.objects.order_by('unit__unit_number')
+        monthly = [index for index, ua in enumerate(unit_assessments) if ua.payment_option == ua.PAYMENT_OPTION_MONTHLY]
+        self.assertEqual([result.unit_payments[index] for index in monthly],
+                         [float(unit_assessments[index].total_monthly_payment()) for index in monthly])
+
+    def test_unit_payments_round_half_up(self):
+        snapshot = AssessmentSnapshot(self.special_assessment, [UnitSnapshot('X1', Decimal('1.00'), [Decimal('0.20')])])
+        result, = run_scenarios(self.special_assessment, [Scenario(Decimal('0'), 8, Decimal('0'))], snapshot=snapshot)
+        # 1.00 / 8 = 0.125 and 0.20 / 8 = 0.025, each rounded up
+        self.assertEqual(result.unit_payments, [0.16])
+
+
+class SearchTests(AssessmentTestCase):
+
+    def found(self, query):
+        return sorted(Unit.objects.get(pk=pk).unit_number for pk in search.search(query)[SearchEntry.KIND_UNIT])
+
+    def test_words_match_from_their_start(self):
+        for number in ('L51', 'L-52', 'Bldg 2 #53'):
+            Unit.objects.create(association=self.association, unit_number=number)
+        self.assertEqual(self.found('l5'), ['L51'])
+        self.assertEqual(self.found('51'), [])
+        self.assertEqual(self.found('5'), ['Bldg 2 #53', 'L-52'])
+
+    def test_missing_fts_table_is_remembered_until_migrate(self):
+        search.forget_fts_tables()
+        self.addCleanup(search.forget_fts_tables)
+        key = (connection.alias, str(connection.settings_dict['NAME']))
+        search._fts_tables[key] = False
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(search.fts_enabled())
+        self.assertEqual(len(queries), 0)
+
+        search.forget_fts_tables()
+        self.assertTrue(search.fts_enabled())
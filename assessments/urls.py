@@ -5,9 +5,15 @@ app_name = 'assessments'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('search/', views.quick_search, name='quick_search'),
+    path('ledger/export/', views.export_ledger, name='export_ledger'),
     path('association/<int:association_id>/', views.association_detail, name='association_detail'),
+    path('association/<int:association_id>/events/', views.association_events, name='association_events'),
     path('assessment/<int:assessment_id>/', views.assessment_detail, name='assessment_detail'),
+    path('assessment/<int:assessment_id>/events/', views.assessment_events, name='assessment_events'),
+    path('assessment/<int:assessment_id>/events/poll/', views.assessment_event_poll, name='assessment_event_poll'),
     path('unit-assessment/<int:unit_assessment_id>/', views.unit_assessment_detail, name='unit_assessment_detail'),
     path('assessment/<int:assessment_id>/pdf/', views.download_assessment_pdf, name='download_assessment_pdf'),
     path('unit-assessment/<int:unit_assessment_id>/pdf/', views.download_unit_statement_pdf, name='download_unit_statement_pdf'),
+    path('unit/<int:unit_id>/statement/pdf/', views.download_consolidated_statement_pdf, name='download_consolidated_statement_pdf'),
 ]
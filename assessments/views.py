@@ -1,9 +1,31 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, FileResponse
+from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, FileResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Sum, Count
-from .models import Association, SpecialAssessment, Unit, UnitAssessment, Payment
-from .reports import generate_assessment_summary_pdf, generate_unit_statement_pdf
+from django.utils.dateparse import parse_date
+from .models import Association, SpecialAssessment, Unit, UnitAssessment, Payment, SearchEntry
+from . import search
+from .consolidated import consolidated_statement
+from .events import POLL_SECONDS, event_stream, events_after, latest_event_id
+from .ledger import LEDGER_FORMATS, ledger_chunks, ledger_queryset
+from .renderers import get_renderer
+from .rollups import assessment_rollup, summary_pdf
+from .streaming import StreamedFileResponse, report_response
 from decimal import Decimal
+from hoa_management.routers import reporting_reads
+
+
+PAYMENTS_PER_PAGE = 25
+
+
+def date_param(request, name='as_of'):
+    """A YYYY-MM-DD query parameter as a date, or None when missing or invalid"""
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
 
 
 def home(request):
@@ -25,58 +47,208 @@ def association_detail(request, association_id):
     })
 
 
+@reporting_reads()
 def assessment_detail(request, assessment_id):
-    """Detail view for a special assessment"""
+    """Detail view for a special assessment, optionally filtered to one payment status"""
     assessment = get_object_or_404(SpecialAssessment, pk=assessment_id)
-    unit_assessments = assessment.unit_assessments.all()
-
-    # Calculate totals
-    total_assessment = sum(ua.total_assessment_amount() for ua in unit_assessments)
-    total_paid = sum(ua.total_paid() for ua in unit_assessments)
-    total_remaining = sum(ua.remaining_balance() for ua in unit_assessments)
-
-    # Status breakdown
-    status_counts = {}
-    for ua in unit_assessments:
-        status = ua.payment_status()
-        status_counts[status] = status_counts.get(status, 0) + 1
+    as_of = date_param(request)
+    status = request.GET.get('status', '')
+    if as_of is None:
+        # Today's totals and unit rows come from the cached rollup that warm_caches precomputes
+        rollup = assessment_rollup(assessment)
+        total_assessment = rollup['total_assessment']
+        total_paid = rollup['total_paid']
+        total_remaining = rollup['total_remaining']
+        total_late_fees = rollup['total_late_fees']
+        # Current statuses are stored, so counts and filtering are indexed queries
+        status_counts = dict(
+            assessment.unit_assessments.order_by().values_list('status').annotate(count=Count('id'))
+        )
+        rows = rollup['rows']
+        listed = [row for row in rows if row['status'] == status] if status else rows
+    else:
+        unit_assessments = assessment.unit_assessments.with_totals(as_of)
+        total_assessment = sum(ua.total_assessment_amount() for ua in unit_assessments)
+        total_paid = sum(ua.total_paid() for ua in unit_assessments)
+        total_remaining = sum(ua.remaining_balance() for ua in unit_assessments)
+        total_late_fees = sum(ua.total_late_fees() for ua in unit_assessments)
+        status_counts = {}
+        for ua in unit_assessments:
+            # Shown in place of the stored status, which is today's
+            ua.status = ua.payment_status()
+            status_counts[ua.status] = status_counts.get(ua.status, 0) + 1
+        listed = [ua for ua in unit_assessments if ua.status == status] if status else unit_assessments
 
     return render(request, 'assessments/assessment_detail.html', {
         'assessment': assessment,
-        'unit_assessments': unit_assessments,
+        'unit_assessments': listed,
         'total_assessment': total_assessment,
         'total_paid': total_paid,
         'total_remaining': total_remaining,
-        'status_counts': status_counts
+        'total_late_fees': total_late_fees,
+        'status_counts': status_counts,
+        'unit_count': sum(status_counts.values()),
+        'status': status,
+        'as_of': as_of,
+        # Streams need ASGI; pages served under WSGI poll for events instead
+        'live_stream': isinstance(request, ASGIRequest),
+        'last_event_id': latest_event_id(special_assessment=assessment) if as_of is None else 0,
+        'poll_milliseconds': POLL_SECONDS * 1000,
     })
 
 
 def unit_assessment_detail(request, unit_assessment_id):
-    """Detail view for a unit assessment"""
-    unit_assessment = get_object_or_404(UnitAssessment, pk=unit_assessment_id)
-    additional_fees = unit_assessment.additional_fees.all()
-    payments = unit_assessment.payments.all()
+    """Detail view for a unit assessment, optionally for a statement period"""
+    as_of = date_param(request)
+    start = date_param(request, 'start')
+    unit_assessment = get_object_or_404(UnitAssessment.objects.with_totals(as_of), pk=unit_assessment_id)
+    additional_fees = unit_assessment.fee_rows().all()
+    payments = unit_assessment.payment_rows().all()
+    if as_of:
+        payments = payments.filter(payment_date__lte=as_of)
+    period = None
+    if start:
+        payments = payments.filter(payment_date__gte=start)
+        period = unit_assessment.period_summary(start, as_of)
+
+    page = Paginator(payments, PAYMENTS_PER_PAGE).get_page(request.GET.get('page'))
+
+    # Keep the date filters on pagination links
+    query = request.GET.copy()
+    query.pop('page', None)
 
     return render(request, 'assessments/unit_assessment_detail.html', {
         'unit_assessment': unit_assessment,
         'additional_fees': additional_fees,
+        'payments': page,
+        'as_of': as_of,
+        'start': start,
+        'period': period,
+        'filter_query': query.urlencode()
+    })
+
+
+def quick_search(request):
+    """Search units, owners and payment references through the search index"""
+    query = request.GET.get('q', '').strip()
+    units = payments = []
+    if query:
+        hits = search.search(query)
+        units = (Unit.objects.filter(pk__in=hits[SearchEntry.KIND_UNIT])
+                 .select_related('association')
+                 .prefetch_related('unit_assessments__special_assessment'))
+        payments = (Payment.objects.filter(pk__in=hits[SearchEntry.KIND_PAYMENT])
+                    .select_related('unit_assessment__unit', 'unit_assessment__special_assessment'))
+
+    return render(request, 'assessments/search_results.html', {
+        'query': query,
+        'units': units,
         'payments': payments
     })
 
 
+@reporting_reads()
 def download_assessment_pdf(request, assessment_id):
     """Generate and download PDF for special assessment"""
     assessment = get_object_or_404(SpecialAssessment, pk=assessment_id)
-    pdf_buffer = generate_assessment_summary_pdf(assessment)
-
-    filename = f"{assessment.association.name}_{assessment.name}.pdf".replace(" ", "_")
-    return FileResponse(pdf_buffer, as_attachment=True, filename=filename)
 
+    as_of = date_param(request)
 
+    filename = f"{assessment.association.name}_{assessment.name}.pdf".replace(" ", "_")
+    if as_of is None:
+        try:
+            cached = open(summary_pdf(assessment), 'rb')
+        except FileNotFoundError:
+            # Replaced by a newer version between rendering and opening
+            pass
+        else:
+            return StreamedFileResponse(cached, as_attachment=True, filename=filename)
+    return report_response(get_renderer('assessment_summary', 'pdf'), assessment, filename=filename, as_of=as_of)
+
+
+@reporting_reads()
 def download_unit_statement_pdf(request, unit_assessment_id):
     """Generate and download PDF statement for a unit"""
-    unit_assessment = get_object_or_404(UnitAssessment, pk=unit_assessment_id)
-    pdf_buffer = generate_unit_statement_pdf(unit_assessment)
+    as_of = date_param(request)
+    start = date_param(request, 'start')
+    unit_assessment = get_object_or_404(UnitAssessment.objects.with_totals(as_of), pk=unit_assessment_id)
 
     filename = f"Unit_{unit_assessment.unit.unit_number}_Statement.pdf"
-    return FileResponse(pdf_buffer, as_attachment=True, filename=filename)
+    return report_response(get_renderer('unit_statement', 'pdf'), unit_assessment, filename=filename, as_of=as_of, start=start)
+
+
+@reporting_reads()
+def download_consolidated_statement_pdf(request, unit_id):
+    """Generate and download one PDF statement covering every active assessment of a unit"""
+    statement = consolidated_statement(unit_id)
+    if statement is None:
+        raise Http404("No unit matches the given query.")
+
+    filename = f"Unit_{statement.unit.unit_number}_Consolidated_Statement.pdf"
+    return report_response(get_renderer('consolidated_statement', 'pdf'), statement, filename=filename)
+
+
+@staff_member_required
+def export_ledger(request):
+    """Stream the payment ledger as CSV or JSON Lines, optionally gzipped"""
+    format = request.GET.get('format', 'csv')
+    if format not in LEDGER_FORMATS:
+        return HttpResponseBadRequest(f"Unsupported format: {format}")
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD")
+    association_id = request.GET.get('association') or None
+    if association_id and not association_id.isdigit():
+        return HttpResponseBadRequest("association must be an ID")
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+
+    content_type, extension = LEDGER_FORMATS[format]
+    filename = f"payment_ledger.{extension}" + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        ledger_chunks(ledger_queryset(start, end, association_id), format=format, compress=compress),
+        content_type='application/gzip' if compress else content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def event_response(request, **filters):
+    """Server-sent event stream of the matching events, resuming after Last-Event-ID"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for the whole stream; 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    response = StreamingHttpResponse(event_stream(last_event_id, **filters), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def assessment_events(request, assessment_id):
+    """Live payment and status events for one special assessment (served under ASGI)"""
+    if not await SpecialAssessment.objects.filter(pk=assessment_id).aexists():
+        raise Http404("No special assessment matches the given query.")
+    return event_response(request, special_assessment_id=assessment_id)
+
+
+def assessment_event_poll(request, assessment_id):
+    """Payment and status events of a special assessment after ?after=<event id>, as JSON"""
+    after = request.GET.get('after', '')
+    if not after.isdigit():
+        return HttpResponseBadRequest("after must be an event ID")
+    events = events_after(int(after), special_assessment_id=assessment_id)
+    return JsonResponse({
+        'events': [{'id': event.pk, 'kind': event.kind, 'data': event.payload} for event in events],
+        'last_event_id': events[-1].pk if events else int(after),
+    })
+
+
+async def association_events(request, association_id):
+    """Live payment and status events for every assessment of an association (served under ASGI)"""
+    if not await Association.objects.filter(pk=association_id).aexists():
+        raise Http404("No association matches the given query.")
+    return event_response(request, association_id=association_id)
@@ -0,0 +1,75 @@
+"""
+Year-end interest and principal paid per unit, for owners' tax records.
+
+Each unit's payments before and during the year come from one grouped query,
+and the interest share of each cumulative total is read off the unit's
+amortization schedule (amortization.interest_schedule), built from its rounded
+monthly installment and shared by units with the same amounts. The year's
+interest is the difference of two cumulative totals, so it is never negative
+and the years add up to the schedule's interest. Lump sum units pay no
+interest.
+"""
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+
+from .amortization import interest_paid
+from .models import UnitAssessment, Payment, ArchivedPayment
+
+
+CENTS = Decimal('0.01')
+
+YearEndRow = namedtuple('YearEndRow', [
+    'unit_assessment', 'paid_before', 'paid', 'interest', 'principal', 'principal_balance',
+])
+
+YearEndSummary = namedtuple('YearEndSummary', ['special_assessment', 'year', 'rows'])
+
+
+def payments_by_year(special_assessment, year):
+    """{unit assessment id: (paid before the year, paid during it)} in one query"""
+    start, end = date(year, 1, 1), date(year, 12, 31)
+    payments = ArchivedPayment if special_assessment.is_archived else Payment
+    rows = (
+        payments.objects.filter(unit_assessment__special_assessment=special_assessment, payment_date__lte=end)
+        .order_by().values('unit_assessment_id')
+        .annotate(
+            before=Sum('amount', filter=Q(payment_date__lt=start)),
+            during=Sum('amount', filter=Q(payment_date__gte=start)),
+        )
+    )
+    zero = Decimal('0.00')
+    return {
+        row['unit_assessment_id']: ((row['before'] or zero).quantize(CENTS), (row['during'] or zero).quantize(CENTS))
+        for row in rows
+    }
+
+
+def split_payments(unit_assessment, paid_before, paid):
+    """(interest, principal) of the payments made during the year"""
+    if unit_assessment.payment_option == UnitAssessment.PAYMENT_OPTION_LUMP:
+        return Decimal('0.00'), paid
+    special_assessment = unit_assessment.special_assessment
+    args = (
+        unit_assessment.total_assessment_amount(),
+        unit_assessment.total_monthly_payment(),
+        special_assessment.interest_rate,
+        special_assessment.loan_period_months,
+    )
+    interest = interest_paid(paid_before + paid, *args) - interest_paid(paid_before, *args)
+    return interest, paid - interest
+
+
+def year_end_summary(special_assessment, year):
+    """Interest and principal paid during a calendar year by every unit of an assessment"""
+    paid = payments_by_year(special_assessment, year)
+    rows = []
+    for ua in special_assessment.unit_assessments.with_totals().order_by('unit__unit_number'):
+        paid_before, paid_during = paid.get(ua.pk, (Decimal('0.00'), Decimal('0.00')))
+        interest, principal = split_payments(ua, paid_before, paid_during)
+        _, principal_before = split_payments(ua, Decimal('0.00'), paid_before)
+        balance = max(ua.total_assessment_amount() - principal_before - principal, Decimal('0.00'))
+        rows.append(YearEndRow(ua, paid_before, paid_during, interest, principal, balance.quantize(CENTS)))
+    return YearEndSummary(special_assessment, year, rows)
@@ -0,0 +1,128 @@
+"""
+Read-replica routing for reports, exports and dashboards.
+
+Only reads made inside reporting_reads() (usable as a context manager or as a
+decorator) go to the "replica" alias; everything else, and every write, stays on
+"default". Reads fall back to "default" when no replica is configured, when it
+cannot be reached, and for READ_YOUR_WRITES_SECONDS after a request from the
+same session wrote to the database. Writes are tracked per unit of work: each
+request in ReadYourWritesMiddleware, and each management command that wraps
+its handle() in unit_of_work().
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+
+REPLICA_ALIAS = 'replica'
+
+# Seconds to wait before retrying a replica that failed its check
+REPLICA_RETRY_SECONDS = 30
+
+# Seconds a passed check is trusted before the replica is queried again
+REPLICA_CHECK_SECONDS = 30
+
+# Run against the replica to check it is reachable and migrated
+REPLICA_CHECK_QUERY = 'SELECT 1 FROM django_migrations LIMIT 1'
+
+SESSION_KEY = '_primary_reads_until'
+
+_reporting = ContextVar('reporting_reads', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+_replica_down_until = 0.0
+_replica_up_until = 0.0
+
+
+@contextmanager
+def reporting_reads():
+    """Send reads inside the block to the replica when one is available"""
+    token = _reporting.set(True)
+    try:
+        yield
+    finally:
+        _reporting.reset(token)
+
+
+@contextmanager
+def unit_of_work():
+    """Track writes afresh inside the block, so earlier work does not pin its reads to default"""
+    token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(token)
+
+
+def reset_replica_check():
+    """Forget the last replica check, e.g. after the replica alias is pointed at another database"""
+    global _replica_down_until, _replica_up_until
+    _replica_down_until = _replica_up_until = 0.0
+
+
+def replica_available():
+    """Whether the replica is configured and answers a query, re-checked periodically"""
+    global _replica_down_until, _replica_up_until
+    if REPLICA_ALIAS not in settings.DATABASES:
+        return False
+    now = time.monotonic()
+    if now < _replica_up_until:
+        return True
+    if now < _replica_down_until:
+        return False
+    try:
+        with connections[REPLICA_ALIAS].cursor() as cursor:
+            cursor.execute(REPLICA_CHECK_QUERY)
+    except DatabaseError:
+        connections[REPLICA_ALIAS].close()
+        _replica_down_until = now + REPLICA_RETRY_SECONDS
+        return False
+    _replica_up_until = now + REPLICA_CHECK_SECONDS
+    return True
+
+
+class ReplicaRouter:
+    """Route reporting reads to the replica and everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        if _reporting.get() and not _pinned_to_primary.get() and not _wrote.get() and replica_available():
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Pin a session's reads to default for a short window after it writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        window = getattr(settings, 'READ_YOUR_WRITES_SECONDS', 10)
+        session = getattr(request, 'session', None)
+        pinned = session is not None and session.get(SESSION_KEY, 0) > time.time()
+
+        pinned_token = _pinned_to_primary.set(pinned)
+        try:
+            with unit_of_work():
+                response = self.get_response(request)
+                if _wrote.get() and session is not None:
+                    session[SESSION_KEY] = time.time() + window
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+        return response
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +48,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "hoa_management.routers.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -81,6 +84,56 @@ DATABASES = {
     }
 }
 
+# SQLite production mode for several gunicorn workers on one database file:
+# WAL journaling, a busy timeout, tuned synchronous/cache pragmas and
+# BEGIN IMMEDIATE for write transactions. Enable with HOA_SQLITE_PRODUCTION=1.
+if os.environ.get("HOA_SQLITE_PRODUCTION"):
+    DATABASES["default"]["ENGINE"] = "hoa_management.sqlite_backend"
+    DATABASES["default"]["OPTIONS"] = {
+        "transaction_mode": "IMMEDIATE",
+        "pragmas": {
+            "journal_mode": "WAL",
+            "busy_timeout": 20000,
+            "synchronous": "NORMAL",
+            "cache_size": -20000,
+        },
+    }
+
+# Optional read-only replica for reports, exports and dashboards. Set
+# HOA_REPLICA_DB to the replica's SQLite file (or replace this block with
+# another backend). Without it, all reads use "default". The file is opened
+# read-only, so a missing replica fails to connect instead of being created.
+if os.environ.get("HOA_REPLICA_DB"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{os.environ['HOA_REPLICA_DB']}?mode=ro",
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["hoa_management.routers.ReplicaRouter"]
+
+# Seconds a session keeps reading from "default" after it writes
+READ_YOUR_WRITES_SECONDS = 10
+
+
+# Cache
+# Shared between web workers and management commands so warm_caches can
+# precompute assessment rollups and PDFs. Set HOA_CACHE_DIR to move it.
+
+CACHE_DIR = os.environ.get("HOA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hoa_management_cache"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": CACHE_DIR,
+        "TIMEOUT": 36 * 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+
+# Cached report files, streamed from disk rather than held in the cache
+REPORT_CACHE_DIR = os.path.join(CACHE_DIR, "reports")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,6 +171,17 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Email
+# https://docs.djangoproject.com/en/4.2/topics/email/
+# Owner statements are mailed through this backend. For testing use
+# "django.core.mail.backends.console.EmailBackend" or a local debugging SMTP
+# server (python -m aiosmtpd -n -l localhost:1025 with EMAIL_PORT = 1025).
+
+EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_HOST = "localhost"
+EMAIL_PORT = 25
+DEFAULT_FROM_EMAIL = "statements@localhost"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 